@@ -0,0 +1,353 @@
+import argparse
+import sqlite3
+import threading
+from collections import defaultdict
+import pandas as pd
+
+# Season of roles whose anime has not been added yet; they move to the real season once it is
+UNKNOWN_SEASON = (0, '')
+
+
+def _int(value):
+    return None if value is None or pd.isna(value) else int(value)
+
+
+def _text(value):
+    return value if isinstance(value, str) and value else None
+
+
+def _cents(score):
+    """Scores are kept in hundredths so adding and removing them never drifts."""
+    return None if score is None or pd.isna(score) else int(round(float(score) * 100))
+
+
+class AggregateStore:
+    def __init__(self, path="aggregates.sqlite"):
+        """Materialized season, voice actor and review aggregates for the dashboards.
+
+        The aggregates are sums and counts updated in place: adding rows again applies only the
+        difference with the facts stored last time, so the store can be updated after every fetch
+        instead of being rebuilt from the CSVs. The slim *_facts tables (no text) are what makes
+        those differences possible.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS anime_facts (
+                anime_id INTEGER PRIMARY KEY,
+                year INTEGER,
+                season TEXT,
+                score_cents INTEGER,
+                genres TEXT
+            );
+            CREATE TABLE IF NOT EXISTS role_facts (
+                anime_id INTEGER,
+                character_id INTEGER,
+                voice_actor_id INTEGER,
+                PRIMARY KEY (anime_id, character_id, voice_actor_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS review_facts (
+                review_id INTEGER PRIMARY KEY,
+                anime_id INTEGER,
+                score INTEGER,
+                tag TEXT
+            );
+            CREATE TABLE IF NOT EXISTS voice_actors (
+                voice_actor_id INTEGER PRIMARY KEY,
+                name TEXT
+            );
+            CREATE TABLE IF NOT EXISTS genre_season_scores (
+                year INTEGER,
+                season TEXT,
+                genre TEXT,
+                anime INTEGER,
+                scored INTEGER,
+                score_cents INTEGER,
+                PRIMARY KEY (year, season, genre)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS va_season_anime (
+                year INTEGER,
+                season TEXT,
+                voice_actor_id INTEGER,
+                anime_id INTEGER,
+                roles INTEGER,
+                PRIMARY KEY (year, season, voice_actor_id, anime_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS va_season_workload (
+                year INTEGER,
+                season TEXT,
+                voice_actor_id INTEGER,
+                roles INTEGER,
+                anime INTEGER,
+                PRIMARY KEY (year, season, voice_actor_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS review_scores (
+                anime_id INTEGER,
+                score INTEGER,
+                reviews INTEGER,
+                PRIMARY KEY (anime_id, score)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS review_tags (
+                anime_id INTEGER,
+                tag TEXT,
+                reviews INTEGER,
+                PRIMARY KEY (anime_id, tag)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS review_totals (
+                anime_id INTEGER PRIMARY KEY,
+                reviews INTEGER,
+                scored INTEGER,
+                score_sum INTEGER
+            );
+        """)
+        self.conn.commit()
+
+    # Function to add deltas to counters, dropping the rows whose first counter falls to zero
+    def _bump(self, table, keys, columns, deltas):
+        rows = [tuple(key) + tuple(values) for key, values in deltas.items() if any(values)]
+        if not rows:
+            return
+        names = keys + columns
+        self.conn.executemany(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+            f"{', '.join(f'{column} = {column} + excluded.{column}' for column in columns)}", rows)
+        self.conn.execute(f"DELETE FROM {table} WHERE {columns[0]} <= 0")
+
+    def _select_in(self, query, ids):
+        """Run a query with an `IN ({})` placeholder for ids, in chunks below SQLite's parameter limit."""
+        ids = list(ids)
+        rows = []
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            rows += self.conn.execute(query.format(', '.join('?' * len(chunk))), chunk).fetchall()
+        return rows
+
+    def _seasons(self, anime_ids):
+        seasons = {anime_id: UNKNOWN_SEASON for anime_id in anime_ids}
+        for anime_id, year, season in self._select_in(
+                "SELECT anime_id, year, season FROM anime_facts WHERE anime_id IN ({})", anime_ids):
+            seasons[anime_id] = (year, season)
+        return seasons
+
+    # Function to apply role count changes, keeping each voice actor's distinct anime count per season exact
+    def _apply_roles(self, deltas):
+        """deltas maps (year, season, voice_actor_id, anime_id) to the change in roles."""
+        deltas = {key: change for key, change in deltas.items() if change}
+        if not deltas:
+            return
+        current = {tuple(row[:4]): row[4] for row in self._select_in(
+            "SELECT year, season, voice_actor_id, anime_id, roles FROM va_season_anime WHERE anime_id IN ({})",
+            {key[3] for key in deltas})}
+        workload = defaultdict(lambda: [0, 0])
+        for key, change in deltas.items():
+            before = current.get(key, 0)
+            after = before + change
+            totals = workload[key[:3]]
+            totals[0] += change
+            totals[1] += (after > 0) - (before > 0)
+        self._bump('va_season_anime', ['year', 'season', 'voice_actor_id', 'anime_id'], ['roles'],
+                   {key: [change] for key, change in deltas.items()})
+        self._bump('va_season_workload', ['year', 'season', 'voice_actor_id'], ['roles', 'anime'], workload)
+
+    # Function to fold the output of extract_anime_info into the season aggregates
+    def add_anime(self, anime_info):
+        """Add or update anime; returns the number of anime whose facts changed."""
+        anime = anime_info.drop_duplicates(subset=['anime_id'], keep='last')
+        genre_deltas = defaultdict(lambda: [0, 0, 0])
+        role_deltas = defaultdict(int)
+        facts = []
+        with self.lock, self.conn:
+            old = {row[0]: tuple(row[1:]) for row in self._select_in(
+                "SELECT anime_id, year, season, score_cents, genres FROM anime_facts WHERE anime_id IN ({})",
+                anime['anime_id'].astype('int64').tolist())}
+            for anime_id, year, season, score, genres in zip(anime['anime_id'], anime['year'], anime['season'],
+                                                             anime['score'], anime['genres']):
+                anime_id = int(anime_id)
+                genres = ', '.join(sorted({g.strip() for g in genres.split(',') if g.strip()})) \
+                    if isinstance(genres, str) else ''
+                new = (_int(year) or UNKNOWN_SEASON[0], _text(season) or UNKNOWN_SEASON[1], _cents(score), genres)
+                previous = old.get(anime_id)
+                if previous == new:
+                    continue
+                for fact, sign in ((previous, -1), (new, 1)):
+                    if fact is None:
+                        continue
+                    for genre in (fact[3].split(', ') if fact[3] else []):
+                        totals = genre_deltas[(fact[0], fact[1], genre)]
+                        totals[0] += sign
+                        totals[1] += sign if fact[2] is not None else 0
+                        totals[2] += sign * (fact[2] or 0)
+                old_season = previous[:2] if previous is not None else UNKNOWN_SEASON
+                if old_season != new[:2]:
+                    # The anime's roles count towards its new season from now on
+                    for voice_actor_id, roles in self.conn.execute(
+                            "SELECT voice_actor_id, COUNT(*) FROM role_facts WHERE anime_id = ? GROUP BY voice_actor_id",
+                            (anime_id,)):
+                        role_deltas[old_season + (voice_actor_id, anime_id)] -= roles
+                        role_deltas[new[:2] + (voice_actor_id, anime_id)] += roles
+                facts.append((anime_id,) + new)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO anime_facts (anime_id, year, season, score_cents, genres) VALUES (?, ?, ?, ?, ?)",
+                facts)
+            self._bump('genre_season_scores', ['year', 'season', 'genre'], ['anime', 'scored', 'score_cents'],
+                       genre_deltas)
+            self._apply_roles(role_deltas)
+        return len(facts)
+
+    # Function to fold extract_character_info and extract_VA_info output into the voice actor workload
+    def add_cast(self, character_info, va_info):
+        """Replace the cast of every anime in character_info; returns the number of roles added or removed."""
+        characters = character_info[['anime_id', 'character_id']].dropna().astype('int64').drop_duplicates()
+        voiced = va_info.dropna(subset=['voice_actor_id'])
+        roles = characters.merge(voiced[['character_id', 'voice_actor_id']].astype('int64'), on='character_id')
+        new = set(roles.itertuples(index=False, name=None))
+        anime_ids = character_info['anime_id'].dropna().astype('int64').unique().tolist()
+        with self.lock, self.conn:
+            old = set(self._select_in(
+                "SELECT anime_id, character_id, voice_actor_id FROM role_facts WHERE anime_id IN ({})", anime_ids))
+            removed, added = old - new, new - old
+            seasons = self._seasons(anime_ids)
+            role_deltas = defaultdict(int)
+            for roles_changed, sign in ((removed, -1), (added, 1)):
+                for anime_id, character_id, voice_actor_id in roles_changed:
+                    role_deltas[seasons[anime_id] + (voice_actor_id, anime_id)] += sign
+            self.conn.executemany("DELETE FROM role_facts WHERE anime_id = ? AND character_id = ? AND voice_actor_id = ?",
+                                  list(removed))
+            self.conn.executemany("INSERT INTO role_facts (anime_id, character_id, voice_actor_id) VALUES (?, ?, ?)",
+                                  list(added))
+            self.conn.executemany(
+                "INSERT INTO voice_actors (voice_actor_id, name) VALUES (?, ?) "
+                "ON CONFLICT (voice_actor_id) DO UPDATE SET name = excluded.name",
+                voiced[['voice_actor_id', 'voice_actor_name']].drop_duplicates('voice_actor_id', keep='last')
+                .astype({'voice_actor_id': 'int64'}).itertuples(index=False, name=None))
+            self._apply_roles(role_deltas)
+        return len(removed) + len(added)
+
+    # Function to fold the output of extract_reviews_info into the review aggregates
+    def add_reviews(self, reviews_info):
+        """Add or update reviews; returns the number of reviews whose facts changed."""
+        reviews = reviews_info.dropna(subset=['review_id']).drop_duplicates(subset=['review_id'], keep='last')
+        score_deltas = defaultdict(lambda: [0])
+        tag_deltas = defaultdict(lambda: [0])
+        total_deltas = defaultdict(lambda: [0, 0, 0])
+        facts = []
+        with self.lock, self.conn:
+            old = {row[0]: tuple(row[1:]) for row in self._select_in(
+                "SELECT review_id, anime_id, score, tag FROM review_facts WHERE review_id IN ({})",
+                reviews['review_id'].astype('int64').tolist())}
+            for review_id, anime_id, score, tag in zip(reviews['review_id'], reviews['anime_id'], reviews['score'],
+                                                       reviews['tags']):
+                review_id = int(review_id)
+                new = (int(anime_id), _int(score), _text(tag))
+                previous = old.get(review_id)
+                if previous == new:
+                    continue
+                for fact, sign in ((previous, -1), (new, 1)):
+                    if fact is None:
+                        continue
+                    fact_anime, fact_score, fact_tag = fact
+                    if fact_score is not None:
+                        score_deltas[(fact_anime, fact_score)][0] += sign
+                    if fact_tag is not None:
+                        tag_deltas[(fact_anime, fact_tag)][0] += sign
+                    totals = total_deltas[(fact_anime,)]
+                    totals[0] += sign
+                    totals[1] += sign if fact_score is not None else 0
+                    totals[2] += sign * (fact_score or 0)
+                facts.append((review_id,) + new)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO review_facts (review_id, anime_id, score, tag) VALUES (?, ?, ?, ?)", facts)
+            self._bump('review_scores', ['anime_id', 'score'], ['reviews'], score_deltas)
+            self._bump('review_tags', ['anime_id', 'tag'], ['reviews'], tag_deltas)
+            self._bump('review_totals', ['anime_id'], ['reviews', 'scored', 'score_sum'], total_deltas)
+        return len(facts)
+
+    def update(self, anime_info=None, character_info=None, va_info=None, reviews_info=None):
+        """Fold whichever extracted frames are given into the aggregates and print what changed."""
+        changed = {}
+        if anime_info is not None:
+            changed['anime'] = self.add_anime(anime_info)
+        if character_info is not None and va_info is not None:
+            changed['roles'] = self.add_cast(character_info, va_info)
+        if reviews_info is not None:
+            changed['reviews'] = self.add_reviews(reviews_info)
+        print("Aggregates updated: " + ", ".join(f"{count} {name} changed" for name, count in changed.items()))
+        return changed
+
+    def _query(self, sql, params, columns):
+        with self.lock:
+            return pd.DataFrame(self.conn.execute(sql, params).fetchall(), columns=columns)
+
+    @staticmethod
+    def _where(**filters):
+        filters = {column: value for column, value in filters.items() if value is not None}
+        where = " AND ".join(f"{column} = ?" for column in filters)
+        return (f" WHERE {where}" if where else ""), list(filters.values())
+
+    def genre_scores(self, year=None, season=None):
+        """Anime count and average score per genre and season."""
+        where, params = self._where(year=year, season=season)
+        data = self._query(f"SELECT year, season, genre, anime, scored, score_cents FROM genre_season_scores{where} "
+                           f"ORDER BY year, season, anime DESC", params,
+                           ['year', 'season', 'genre', 'anime', 'scored', 'score_cents'])
+        data['average_score'] = (data['score_cents'] / 100 / data['scored'].where(data['scored'] > 0)).round(2)
+        return data.drop(columns=['score_cents'])
+
+    def va_workload(self, year=None, season=None, limit=None):
+        """Roles and distinct anime per voice actor and season, busiest first."""
+        where, params = self._where(year=year, season=season)
+        return self._query(
+            f"SELECT w.year, w.season, w.voice_actor_id, v.name, w.roles, w.anime FROM va_season_workload w "
+            f"LEFT JOIN voice_actors v ON v.voice_actor_id = w.voice_actor_id{where.replace('year', 'w.year')} "
+            f"ORDER BY w.roles DESC, w.anime DESC" + (" LIMIT ?" if limit else ""),
+            params + ([limit] if limit else []), ['year', 'season', 'voice_actor_id', 'name', 'roles', 'anime'])
+
+    def score_distribution(self, anime_id=None):
+        """Number of reviews per score for each anime."""
+        where, params = self._where(anime_id=anime_id)
+        return self._query(f"SELECT anime_id, score, reviews FROM review_scores{where} ORDER BY anime_id, score",
+                           params, ['anime_id', 'score', 'reviews'])
+
+    def tag_ratios(self, anime_id=None):
+        """Share of each anime's reviews with each tag (Recommended, Mixed Feelings, Not Recommended)."""
+        where, params = self._where(anime_id=anime_id)
+        data = self._query(
+            f"SELECT t.anime_id, t.tag, t.reviews, r.reviews FROM review_tags t "
+            f"JOIN review_totals r ON r.anime_id = t.anime_id{where.replace('anime_id', 't.anime_id')} "
+            f"ORDER BY t.anime_id, t.tag", params, ['anime_id', 'tag', 'reviews', 'total'])
+        data['ratio'] = (data['reviews'] / data['total']).round(4)
+        return data.drop(columns=['total'])
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update or read the precomputed dashboard aggregates.")
+    parser.add_argument('--store', default="aggregates.sqlite")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', help="fold the CSVs written by main.py into the store (only what changed)")
+    show = commands.add_parser('show')
+    show.add_argument('aggregate', choices=['genre-scores', 'va-workload', 'score-distribution', 'tag-ratios'])
+    show.add_argument('--year', type=int)
+    show.add_argument('--season')
+    show.add_argument('--anime', type=int)
+    show.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    store = AggregateStore(args.store)
+    if args.command == 'build':
+        store.update(pd.read_csv("anime_data.csv"), pd.read_csv("cahracter_information.csv"),
+                     pd.read_csv("voice_actor_information.csv"), pd.read_csv("review_data.csv"))
+    else:
+        results = {
+            'genre-scores': lambda: store.genre_scores(args.year, args.season),
+            'va-workload': lambda: store.va_workload(args.year, args.season, args.limit),
+            'score-distribution': lambda: store.score_distribution(args.anime),
+            'tag-ratios': lambda: store.tag_ratios(args.anime),
+        }[args.aggregate]()
+        print(results.to_string(index=False) if not results.empty else "Nothing stored yet.")
+    store.close()
@@ -0,0 +1,262 @@
+import asyncio
+import time
+import aiohttp
+from jikanpy.exceptions import APIException
+from jikanAnimeFetcher import AnimeFetcher, api_error, remaining_pages
+from retryPolicy import RetryPolicy
+from reviewStore import take_reviews
+from checkpoint import airing_ids
+
+TRANSIENT_ERRORS = (OSError, aiohttp.ClientError, asyncio.TimeoutError)
+
+class AsyncAnimeFetcher(AnimeFetcher):
+    def __init__(self, year, season, rate_limiter=None, max_connections=3, base_url=None, cache=None,
+                 checkpoint=None, retry_policy=None, dead_letters=None, review_limits=None, review_store=None,
+                 metrics=None, archive=None, replay=None, coalescer=None):
+        # aiohttp's connection errors are not OSErrors, so they are added to the transient errors
+        if retry_policy is None:
+            retry_policy = RetryPolicy(transient_errors=TRANSIENT_ERRORS)
+        # Reuse the synchronous fetcher for configuration and the extract_* methods
+        super().__init__(year, season, rate_limiter=rate_limiter, max_workers=max_connections,
+                         base_url=base_url, cache=cache, checkpoint=checkpoint,
+                         retry_policy=retry_policy, dead_letters=dead_letters,
+                         review_limits=review_limits, review_store=review_store, metrics=metrics,
+                         archive=archive, replay=replay, coalescer=coalescer)
+        self.max_connections = max_connections
+        self.session = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # Function to open the single pooled keep-alive HTTP session used for every request
+    async def open(self):
+        """Create the shared aiohttp session; must be called from inside the event loop."""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.semaphore = asyncio.Semaphore(self.max_connections)
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # Function to request an endpoint, sharing the call with identical requests in flight or already answered
+    async def _request(self, endpoint, params=None):
+        """Request an endpoint such as 'anime/1/characters' and return the decoded JSON."""
+        return await self.coalescer.call_async(endpoint, params, lambda: self._request_with_retries(endpoint, params))
+
+    # Function to send a request, retrying 429s, 5xx and connection errors with backoff
+    async def _request_with_retries(self, endpoint, params=None):
+        if self.replay is not None:
+            # Replays skip the rate limit: nothing goes over the network
+            return self.replay.replay(endpoint, params)
+        attempt = 1
+        while True:
+            try:
+                return await self._send(endpoint, params)
+            except Exception as e:
+                if not self.retry_policy.is_retryable(e):
+                    raise
+                self.circuit_breaker.record_failure(e)
+                if attempt >= self.retry_policy.max_attempts:
+                    raise
+                delay = self.retry_policy.delay(attempt, e)
+                print(f"Retrying {endpoint} in {delay:.1f}s (attempt {attempt} failed: {e})")
+                self.retry_policy.record_retry()
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    # Function to send one GET request to the Jikan API within the rate budget
+    async def _send(self, endpoint, params=None):
+        """Send a single request, answered from the cache when possible."""
+        entry = self.cache.lookup(endpoint, params) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            # Archived like a network response, so a replay of this run has every response it used
+            if self.archive is not None:
+                self.archive.record(endpoint, params, entry.payload)
+            return entry.payload
+        headers = self.cache.conditional_headers(entry) if entry is not None else None
+        await self.open()
+        async with self.semaphore:
+            await self.rate_limiter.acquire_async()
+            url = f"{self.jikan.base}/{endpoint}"
+            start = time.perf_counter()
+            async with self.session.get(url, params=params, headers=headers) as response:
+                if response.status == 304 and entry is not None:
+                    self.metrics.observe_request(endpoint, response.status, time.perf_counter() - start)
+                    self.cache.revalidate(endpoint, params, response.headers)
+                    self.circuit_breaker.record_success()
+                    if self.archive is not None:
+                        self.archive.record(endpoint, params, entry.payload)
+                    return entry.payload
+                try:
+                    payload = await response.json(content_type=None)
+                except ValueError:
+                    payload = {'error': await response.text()}
+                self.metrics.observe_request(endpoint, response.status, time.perf_counter() - start)
+                if response.status >= 400:
+                    raise api_error(response.status, payload, endpoint, response.headers)
+                self.circuit_breaker.record_success()
+                if self.cache is not None:
+                    self.cache.store(endpoint, params, payload, response.headers)
+                if self.archive is not None:
+                    self.archive.record(endpoint, params, payload)
+                return payload
+
+    # Function to fetch one season page, dead-lettering it if it still fails after every retry
+    async def _season_page_or_none(self, year, season, page):
+        try:
+            anime_data = await self._request(f"seasons/{year}/{season}", params={'page': page})
+        except (APIException, *TRANSIENT_ERRORS) as e:
+            # Retries are exhausted; keep the page so redrive_dead_letters can fetch it again
+            print(f"Error fetching data from page {page} of {year} {season}: {e}")
+            self.dead_letters.add('seasons', (year, season, page), e)
+            return None
+        self.dead_letters.discard('seasons', (year, season, page))
+        if anime_data['data']:
+            print(f"Fetched data from page {page} of {year} {season}")
+        return anime_data
+
+    # Function to fetch every page of one season
+    async def _fetch_season(self, year, season, first_page=1, last_page=None):
+        """Fetch all anime records of a season: the first page, then the pages it announces concurrently."""
+        page = first_page
+        all_anime_data = []
+        while last_page is None or page <= last_page:
+            anime_data = await self._season_page_or_none(year, season, page)
+            if anime_data is None or not anime_data['data']:
+                break  # Stop if the page failed or there are no more anime data
+            all_anime_data.extend(anime_data['data'])
+            pages = remaining_pages(anime_data, page)
+            if pages is None:
+                page += 1  # No pagination metadata, move to the next page
+                continue
+            if last_page is not None:
+                pages = [p for p in pages if p <= last_page]
+            for anime_data in await asyncio.gather(*(self._season_page_or_none(year, season, p) for p in pages)):
+                if anime_data is not None:
+                    all_anime_data.extend(anime_data['data'])
+            break
+        return all_anime_data
+
+    async def fetch_anime_data_per_season(self):
+        """Fetch anime data for a specific season and year from the Jikan API."""
+        all_anime_data = await self._fetch_season(self.year, self.season)
+        print(f"Total anime data fetched: {len(all_anime_data)}")
+        self.anime_data = {'data': all_anime_data}
+
+    async def fetch_anime_data_multiple_seasons(self, years, seasons):
+        """Fetch anime data for multiple years and seasons concurrently."""
+        targets = [(y, s) for y in years for s in seasons]
+        season_data = await asyncio.gather(*(self._fetch_season(y, s) for y, s in targets))
+        # Extract all seasons in one pass, in the same order as the synchronous fetcher
+        self.anime_data = {'data': [anime for data in season_data for anime in data]}
+        all_anime_data = self.extract_anime_info()
+        all_anime_data = self._finalize_anime_data(all_anime_data)
+        self.anime_data = all_anime_data
+        print("All season data fetched.")
+        print("total data fetched: ", len(self.anime_data))
+        return all_anime_data
+
+    async def fecth_character_data(self, mal_id):
+        """Fetch character data for a specific anime using the Jikan API."""
+        try:
+            character_data = await self._request(f"anime/{mal_id}/characters")
+        except (APIException, *TRANSIENT_ERRORS) as e:
+            print(f"Error fetching character data for {mal_id}: {e}")
+            self.dead_letters.add('characters', mal_id, e)
+            return None
+        self.dead_letters.discard('characters', mal_id)
+        return character_data['data']
+
+    async def fetch_reviews_data(self, mal_id):
+        """Fetch reviews data for a specific anime using the Jikan API, page by page within self.review_limits."""
+        reviews = []
+        page = 1
+        try:
+            while True:
+                reviews_data = await self._request(f"anime/{mal_id}/reviews",
+                                                   params={'page': page} if page > 1 else None)
+                if not take_reviews(reviews, reviews_data, page, self.review_limits, self.review_store):
+                    break
+                page += 1
+        except (APIException, *TRANSIENT_ERRORS) as e:
+            # A partly fetched anime is dropped as a whole, re-driving it starts from page 1
+            print(f"Error fetching reviews data for {mal_id}: {e}")
+            self.dead_letters.add('reviews', mal_id, e)
+            return None
+        self.dead_letters.discard('reviews', mal_id)
+        return self._with_journaled_reviews(mal_id, reviews)
+
+    # Function to run fetch_one for every id concurrently, keeping the input order
+    async def _fetch_resource(self, resource, fetch_one, mal_ids, refresh_ids=None):
+        mal_ids = list(mal_ids)
+        pending = mal_ids
+        if self.checkpoint is not None:
+            pending = self.checkpoint.pending(resource, mal_ids, refresh_ids)
+            print(f"Checkpoint: {len(mal_ids) - len(pending)} of {len(mal_ids)} anime already have {resource} data")
+        data_fetched = 0
+
+        async def fetch_with_progress(mal_id):
+            nonlocal data_fetched
+            records = await fetch_one(mal_id)
+            data_fetched += 1
+            print(f"Fetched {resource} data {data_fetched} out of {len(pending)}")
+            if self.checkpoint is not None and records is not None:
+                self.checkpoint.record(resource, mal_id, records)
+            return records
+
+        results = await asyncio.gather(*(fetch_with_progress(mal_id) for mal_id in pending))
+        if self.checkpoint is not None:
+            return self.checkpoint.results(resource, mal_ids)
+        return list(zip(pending, results))
+
+    async def fetch_all_character_data(self, mal_ids, refresh_ids=None):
+        """Fetch character data for multiple anime concurrently."""
+        results = await self._fetch_resource('characters', self.fecth_character_data, mal_ids, refresh_ids)
+        self.character_data = self._collect_resource(results, 'mal_id')
+        return self.character_data
+
+    async def fetch_all_reviews_data(self, mal_ids, refresh_ids=None):
+        """Fetch reviews data for multiple anime concurrently."""
+        results = await self._fetch_resource('reviews', self.fetch_reviews_data, mal_ids, refresh_ids)
+        self.reviews_data = self._collect_resource(results, 'anime_id')
+        return self.reviews_data
+
+    # Function to retry everything in the dead-letter list
+    async def redrive_dead_letters(self):
+        """Coroutine version of AnimeFetcher.redrive_dead_letters."""
+        async with self:
+            # Only a failed first page leaves the rest of the season unknown
+            season_data = await asyncio.gather(*(self._fetch_season(year, season, first_page=page,
+                                                                    last_page=None if page == 1 else page)
+                                                 for year, season, page in self.dead_letters.ids('seasons')))
+            records = [anime for data in season_data for anime in data]
+            character_ids = self.dead_letters.ids('characters')
+            review_ids = self.dead_letters.ids('reviews')
+            characters, reviews = await asyncio.gather(
+                self._fetch_resource('characters', self.fecth_character_data, character_ids, character_ids),
+                self._fetch_resource('reviews', self.fetch_reviews_data, review_ids, review_ids))
+        recovered = {'anime': self.extract_anime_info({'data': records})}
+        if records:
+            recovered['anime'] = self._finalize_anime_data(recovered['anime'])
+        recovered['characters'] = self._collect_resource(characters, 'mal_id')
+        recovered['reviews'] = self._collect_resource(reviews, 'anime_id')
+        return recovered
+
+    # Function to run the whole fetch (seasons, then characters and reviews together) in one session
+    async def fetch_all(self, years, seasons, incremental=False):
+        """Fetch seasons, then characters and reviews of every anime concurrently; returns the anime DataFrame."""
+        async with self:
+            all_anime_data = await self.fetch_anime_data_multiple_seasons(years, seasons)
+            refresh_ids = airing_ids(all_anime_data) if incremental else None
+            await asyncio.gather(self.fetch_all_character_data(all_anime_data['anime_id'], refresh_ids),
+                                 self.fetch_all_reviews_data(all_anime_data['anime_id'], refresh_ids))
+        return all_anime_data
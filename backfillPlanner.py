@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from jikanpy.exceptions import APIException
+import checkpoint
+from jikanAnimeFetcher import remaining_pages
+from progress import ProgressReporter
+
+SEASONS = ('winter', 'spring', 'summer', 'fall')
+
+
+class BackfillPlanner:
+    def __init__(self, fetcher, years, seasons=SEASONS, resources=('characters', 'reviews'), max_workers=None):
+        """Plan and run a multi-season backfill on a worker pool sharing the fetcher's rate limiter.
+
+        years can be any iterable such as range(2015, 2025). The fetcher's year/season are never
+        touched: every task carries its own (year, season, page), so tasks can run in any order.
+        """
+        self.fetcher = fetcher
+        self.years = list(years)
+        self.seasons = list(seasons)
+        self.resources = list(resources)
+        # More workers than the rate budget only adds threads waiting on the limiter
+        self.max_workers = max_workers or fetcher.scheduler.max_workers
+        self.fetch_one = {
+            'characters': fetcher.fecth_character_data,
+            'reviews': fetcher.fetch_reviews_data,
+        }
+        self.duplicates = 0
+
+    # Function to list the first page of every season; the pages it announces are planned when it comes back
+    def plan_seasons(self):
+        return [(year, season, 1) for year in self.years for season in self.seasons]
+
+    # Function to list the (resource, mal_id) tasks still to fetch for the deduplicated anime
+    def plan_resources(self, mal_ids, refresh_ids=None):
+        tasks = []
+        for resource in self.resources:
+            pending = list(mal_ids)
+            if self.fetcher.checkpoint is not None:
+                pending = self.fetcher.checkpoint.pending(resource, pending, refresh_ids)
+                print(f"Checkpoint: {len(mal_ids) - len(pending)} of {len(mal_ids)} anime already have {resource} data")
+            tasks.extend((resource, mal_id) for mal_id in pending)
+        return tasks
+
+    # Function to run tasks on the pool; work(task) returns the result and any follow-up tasks
+    def _run_pool(self, phase, tasks, work):
+        progress = ProgressReporter(phase, len(tasks))
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {executor.submit(work, task): task for task in tasks}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    result, follow_ups = future.result()
+                    results[task] = result
+                    progress.add_total(len(follow_ups))
+                    for follow_up in follow_ups:
+                        running[executor.submit(work, follow_up)] = follow_up
+                    progress.update()
+        progress.finish()
+        return results
+
+    # Function to fetch one season page; the first page plans all the others from its pagination
+    def _season_task(self, task):
+        year, season, page = task
+        try:
+            response = self.fetcher.fetch_season_page(year, season, page)
+            records = response['data']
+        except (APIException, OSError) as e:
+            # Retries are exhausted; the page is kept for fetcher.redrive_dead_letters
+            print(f"Error fetching data from {year} {season} page {page}: {e}")
+            self.fetcher.dead_letters.add('seasons', (year, season, page), e)
+            return [], []
+        self.fetcher.dead_letters.discard('seasons', (year, season, page))
+        if not records:
+            return [], []
+        pages = remaining_pages(response, page)
+        if pages is None:
+            # No pagination metadata: walk the season one page at a time until an empty page
+            return records, [(year, season, page + 1)]
+        return records, [(year, season, p) for p in pages] if page == 1 else []
+
+    # Function to fetch one sub-resource of one anime and journal it as soon as it arrives
+    def _resource_task(self, task):
+        resource, mal_id = task
+        records = self.fetch_one[resource](mal_id)
+        if self.fetcher.checkpoint is not None and records is not None:
+            self.fetcher.checkpoint.record(resource, mal_id, records)
+        return records, []
+
+    # Function to keep the first record of anime listed in several seasons
+    def deduplicate(self, records):
+        """Drop continuing shows seen in an earlier season of the plan."""
+        seen = set()
+        unique = []
+        for record in records:
+            if record['mal_id'] not in seen:
+                seen.add(record['mal_id'])
+                unique.append(record)
+        self.duplicates = len(records) - len(unique)
+        return unique
+
+    def run_seasons(self):
+        """Fetch every page of every season and return the deduplicated anime DataFrame."""
+        pages = self._run_pool("seasons", self.plan_seasons(), self._season_task)
+        # Pages finish in any order; rebuild plan order so the first season an anime airs in wins
+        year_order = {year: i for i, year in enumerate(self.years)}
+        season_order = {season: i for i, season in enumerate(self.seasons)}
+        records = []
+        for year, season, page in sorted(pages, key=lambda t: (year_order[t[0]], season_order[t[1]], t[2])):
+            records.extend(pages[(year, season, page)])
+        records = self.deduplicate(records)
+        print(f"Total anime data fetched: {len(records)} ({self.duplicates} continuing shows listed twice)")
+        anime_df = self.fetcher.extract_anime_info({'data': records})
+        if not anime_df.empty:
+            anime_df = self.fetcher._finalize_anime_data(anime_df)
+        self.fetcher.anime_data = anime_df
+        return anime_df
+
+    def run_resources(self, mal_ids, refresh_ids=None):
+        """Fetch characters and reviews of every anime on one pool; returns {resource: raw DataFrame}."""
+        mal_ids = [int(mal_id) for mal_id in mal_ids]
+        fetched = self._run_pool("characters/reviews", self.plan_resources(mal_ids, refresh_ids), self._resource_task)
+        frames = {}
+        for resource in self.resources:
+            if self.fetcher.checkpoint is not None:
+                results = self.fetcher.checkpoint.results(resource, mal_ids)
+            else:
+                results = [(mal_id, fetched.get((resource, mal_id))) for mal_id in mal_ids]
+            id_column = 'mal_id' if resource == 'characters' else 'anime_id'
+            frames[resource] = self.fetcher._collect_resource(results, id_column)
+        self.fetcher.character_data = frames.get('characters')
+        self.fetcher.reviews_data = frames.get('reviews')
+        return frames
+
+    # Function to run the whole backfill, phase by phase
+    def run(self, incremental=False):
+        """Run the season phase then the sub-resource phase; returns the anime DataFrame.
+
+        The raw character and review data are left on the fetcher for its extract_* methods.
+        """
+        anime_df = self.run_seasons()
+        if anime_df.empty or not self.resources:
+            return anime_df
+        refresh_ids = checkpoint.airing_ids(anime_df) if incremental else None
+        self.run_resources(anime_df['anime_id'], refresh_ids)
+        return anime_df
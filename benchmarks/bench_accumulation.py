@@ -0,0 +1,87 @@
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jikanAnimeFetcher import AnimeFetcher
+
+# Compares the old pd.concat-per-anime accumulation with AnimeFetcher._collect_resource
+# on synthetic character and review payloads shaped like the Jikan responses.
+
+
+def make_characters(mal_id, count=5):
+    return [{
+        'character': {'mal_id': mal_id * 10 + i, 'name': f"Character {mal_id * 10 + i}"},
+        'role': 'Main' if i == 0 else 'Supporting',
+        'favorites': i,
+        'voice_actors': [{'person': {'mal_id': 500 + i, 'name': f"Actor {500 + i}"}, 'language': 'Japanese'}],
+    } for i in range(count)]
+
+
+def make_reviews(mal_id, count=3):
+    return [{
+        'mal_id': mal_id * 100 + i, 'score': 8, 'is_spoiler': False, 'is_preliminary': False,
+        'episodes_watched': None, 'tags': ['Recommended'], 'review': "Lorem ipsum " * 20,
+    } for i in range(count)]
+
+
+# The accumulation loop as it was before _collect_resource buffered records in a list
+def legacy_collect(results, id_column):
+    all_data = pd.DataFrame()
+    for mal_id, records in results:
+        if records is not None:
+            resource_df = pd.DataFrame(records)
+            resource_df[id_column] = mal_id
+            all_data = pd.concat([all_data, resource_df], ignore_index=True)
+    return all_data
+
+
+def measure(fn, *args):
+    """Run fn in a forked child and return (seconds, peak RSS growth in MiB, result)."""
+    # A fresh child per run keeps ru_maxrss meaningful and avoids tracemalloc's large overhead
+    parent, child = multiprocessing.Pipe(duplex=False)
+
+    def run():
+        gc.collect()
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+        child.send((elapsed, peak, result))
+
+    process = multiprocessing.get_context('fork').Process(target=run)
+    process.start()
+    elapsed, peak, result = parent.recv()
+    process.join()
+    return elapsed, peak, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DataFrame accumulation in the fetch loops.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--legacy-max', type=int, default=10000,
+                        help="skip the quadratic legacy path above this many anime (10k takes minutes)")
+    args = parser.parse_args()
+
+    fetcher = AnimeFetcher(None, None)
+    print(f"{'resource':<11}{'anime':>8}{'legacy s':>11}{'legacy MiB':>12}{'new s':>9}{'new MiB':>9}{'speedup':>9}")
+    for name, make, id_column in [('characters', make_characters, 'mal_id'), ('reviews', make_reviews, 'anime_id')]:
+        for size in args.sizes:
+            results = [(mal_id, make(mal_id)) for mal_id in range(1, size + 1)]
+            new_s, new_mib, new_df = measure(fetcher._collect_resource, results, id_column)
+            if size <= args.legacy_max:
+                old_s, old_mib, old_df = measure(legacy_collect, results, id_column)
+                assert old_df.equals(new_df[old_df.columns])
+                legacy = f"{old_s:>11.2f}{old_mib:>12.1f}"
+                speedup = f"{old_s / new_s:>8.1f}x"
+            else:
+                legacy = f"{'skipped':>11}{'-':>12}"
+                speedup = f"{'-':>9}"
+            print(f"{name:<11}{size:>8}{legacy}{new_s:>9.2f}{new_mib:>9.1f}{speedup}")
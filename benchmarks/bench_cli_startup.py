@@ -0,0 +1,59 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Cold-start time of every cli.py subcommand: a fresh interpreter that parses the arguments, imports
+# what the subcommand needs and sets it up (--startup-only), compared with the imports main.py used
+# to do up front for every run.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPO_DIR, "cli.py")
+
+# What main.py imported before any argument was looked at
+EAGER_IMPORTS = ("import jikanAnimeFetcher, asyncAnimeFetcher, responseCache, checkpoint, retryPolicy, reviewStore, "
+                 "metrics, payloadArchive, changeDetection, searchIndex, similarityEngine, aggregateStore, sinks, "
+                 "streamingPipeline, backfillPlanner, dbConnection, argparse, asyncio, json, os, pandas; "
+                 "from jikanpy import Jikan; Jikan()")
+
+COMMANDS = {
+    'help': [CLI, '--help'],
+    'seasons': [CLI, 'seasons', '--startup-only'],
+    'characters': [CLI, 'characters', '--startup-only'],
+    'reviews': [CLI, 'reviews', '--startup-only'],
+    'fetch': [CLI, 'fetch', '--startup-only'],
+    'fetch --async': [CLI, 'fetch', '--async', '--startup-only'],
+    'redrive': [CLI, 'redrive', '--startup-only'],
+    'load-db': [CLI, 'load-db', '--startup-only'],
+    'export': [CLI, 'export', '--startup-only'],
+    'eager main.py (before)': ['-c', f"import sys; sys.path.insert(0, {REPO_DIR!r}); {EAGER_IMPORTS}"],
+}
+
+
+def cold_start(arguments, directory):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + arguments, cwd=directory, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(arguments)} failed:\n{result.stderr}")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold-start time of each cli.py subcommand.")
+    parser.add_argument('--repeat', type=int, default=7, help="fresh interpreters started per subcommand")
+    parser.add_argument('--commands', nargs='+', default=list(COMMANDS), choices=list(COMMANDS))
+    args = parser.parse_args()
+
+    # An empty working directory: no pipeline.toml, and the caches/journals set up by the fetch
+    # subcommands are created there instead of next to the real ones
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = cold_start(['-c', 'pass'], directory)
+        print(f"Bare interpreter: {baseline * 1000:.0f} ms")
+        print(f"{'command':<24}{'min ms':>8}{'median ms':>11}")
+        for command in args.commands:
+            times = [cold_start(COMMANDS[command], directory) for _ in range(args.repeat)]
+            print(f"{command:<24}{min(times) * 1000:>8.0f}{statistics.median(times) * 1000:>11.0f}")
@@ -0,0 +1,80 @@
+import argparse
+import io
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dimensionTables import CastTables
+
+# Compares the memory of the flat character/VA frames with CastTables, using the CSVs of the last run
+# as the baseline, and checks that the tables give back byte-identical CSV files.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_frames(directory):
+    """The frames as extract_character_info/extract_VA_info build them: strings as Python objects."""
+    character_info = pd.read_csv(os.path.join(directory, "cahracter_information.csv"),
+                                 dtype={'name': object, 'role': object})
+    va_info = pd.read_csv(os.path.join(directory, "voice_actor_information.csv"),
+                          dtype={'voice_actor_name': object, 'voice_actor_language': object})
+    va_info['voice_actor_id'] = va_info['voice_actor_id'].astype('Int64')
+    return character_info, va_info
+
+
+# Function to stand in for a longer run: the same cast shows up again under other anime ids
+def scale_frames(character_info, va_info, scale):
+    if scale == 1:
+        return character_info, va_info
+    offset = int(character_info['anime_id'].max()) + 1
+    character_info = pd.concat([character_info.assign(anime_id=character_info['anime_id'] + i * offset)
+                                for i in range(scale)], ignore_index=True)
+    va_info = pd.concat([va_info] * scale, ignore_index=True)
+    return character_info, va_info
+
+
+def to_csv(data):
+    buffer = io.StringIO()
+    data.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def mib(size):
+    return size / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of the flat cast frames against CastTables.")
+    parser.add_argument('--data', default=REPO_DIR, help="directory with the character and VA CSVs")
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 50],
+                        help="copies of the character rows under new anime ids")
+    args = parser.parse_args()
+
+    character_info, va_info = load_frames(args.data)
+    # Fetched frames have integer favorites; the CSV of a run with missing favorites has floats
+    variants = {
+        'float favorites': character_info.assign(favorites=character_info['favorites'].astype('float64')),
+        'int favorites': character_info.assign(favorites=character_info['favorites'].fillna(0).astype('int64')),
+    }
+    for label, characters in variants.items():
+        tables = CastTables.from_extracted(characters, va_info)
+        identical = to_csv(tables.to_character_info()) == to_csv(characters)
+        print(f"Round trip with {label}: {'identical' if identical else 'DIFFERENT'}")
+        if not identical:
+            sys.exit(1)
+    print(f"{'scale':>6}{'rows':>10}{'flat MiB':>10}{'tables MiB':>12}{'ratio':>8}  round trip")
+    for scale in args.scale:
+        characters, voice_actors = scale_frames(character_info, va_info, scale)
+        flat = characters.memory_usage(deep=True).sum() + voice_actors.memory_usage(deep=True).sum()
+        tables = CastTables.from_extracted(characters, voice_actors)
+        compact = sum(tables.memory_usage().values())
+        identical = (to_csv(tables.to_character_info()) == to_csv(characters)
+                     and to_csv(tables.to_va_info()) == to_csv(voice_actors))
+        print(f"{scale:>6}{len(characters) + len(voice_actors):>10}{mib(flat):>10.2f}{mib(compact):>12.2f}"
+              f"{flat / compact:>8.1f}  {'identical' if identical else 'DIFFERENT'}")
+        if not identical:
+            sys.exit(1)
+    for table, size in tables.memory_usage().items():
+        print(f"  {table}: {len(getattr(tables, table))} rows, {mib(size):.2f} MiB")
@@ -0,0 +1,145 @@
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jikanAnimeFetcher import AnimeFetcher
+
+# Compares the single-pass extract_* methods with the per-row lambda versions they replaced,
+# on synthetic Jikan payloads, and checks that both write byte-identical CSV files.
+
+
+def make_anime(mal_id):
+    return {
+        'mal_id': mal_id, 'title': f"Anime {mal_id}", 'title_english': None if mal_id % 3 else f"Anime {mal_id} EN",
+        'synopsis': "Lorem ipsum dolor sit amet. " * 10,
+        'genres': [{'name': g} for g in random.sample(['Action', 'Drama', 'Comedy', 'Romance', 'Fantasy'], 2)],
+        'status': 'Finished Airing', 'score': None if mal_id % 7 == 0 else 7.25, 'scored_by': 1000,
+        'type': 'TV', 'source': 'Manga', 'episodes': None if mal_id % 5 == 0 else 12, 'popularity': mal_id,
+        'members': 5000, 'rank': mal_id, 'favorites': 10, 'season': 'summer', 'year': 2024,
+    }
+
+
+def make_characters(mal_id, count=8):
+    # Every fourth character has no voice actor; the first one always has one, because the
+    # legacy extract_VA_info fails when the first character of the frame has none
+    characters = []
+    for i in range(count):
+        character_id = mal_id * 10 + i
+        actors = [{'person': {'mal_id': 500 + (character_id + j) % 300, 'name': f"Actor {(character_id + j) % 300}"},
+                   'language': ['Japanese', 'English', 'German'][j]} for j in range((i + 1) % 4)]
+        characters.append({'character': {'mal_id': character_id, 'name': f"Character {character_id}"},
+                           'role': 'Main' if i == 0 else 'Supporting', 'favorites': i, 'voice_actors': actors})
+    return characters
+
+
+def make_reviews(mal_id, count=3):
+    return [{
+        'mal_id': mal_id * 100 + i, 'score': 8, 'is_spoiler': i == 1, 'is_preliminary': False,
+        'episodes_watched': None, 'tags': ['Recommended'] if i else [], 'review': "Lorem ipsum " * 20,
+    } for i in range(count)]
+
+
+# The extraction code as it was before the single-pass rewrite
+def legacy_anime(anime_data):
+    anime_list = []
+    for anime in anime_data['data']:
+        genres = ', '.join([genre['name'] for genre in anime['genres']])
+        anime_list.append({
+            'anime_id': anime['mal_id'], 'title': anime['title'], 'title_english': anime['title_english'],
+            'synopsis': anime['synopsis'], 'genres': genres, 'status': anime['status'], 'score': anime['score'],
+            'scored_by': anime['scored_by'], 'type': anime['type'], 'source': anime['source'],
+            'episodes': anime['episodes'], 'popularity': anime['popularity'], 'members': anime['members'],
+            'rank': anime['rank'], 'favorites': anime['favorites'], 'season': anime['season'], 'year': anime['year'],
+        })
+    return pd.DataFrame(anime_list)
+
+
+def legacy_reviews(reviews_data):
+    return pd.DataFrame({
+        'anime_id': reviews_data['anime_id'], 'review_id': reviews_data['mal_id'], 'score': reviews_data['score'],
+        'is_spoiler': reviews_data['is_spoiler'], 'is_preliminary': reviews_data['is_preliminary'],
+        'episodes_watched': reviews_data['episodes_watched'],
+        'tags': reviews_data['tags'].apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else None),
+        'review_text': reviews_data['review'],
+    })
+
+
+def legacy_characters(character_data):
+    return pd.DataFrame({
+        'anime_id': character_data['mal_id'],
+        'character_id': character_data['character'].apply(lambda x: x['mal_id'] if isinstance(x, dict) and 'mal_id' in x else None),
+        'name': character_data['character'].apply(lambda x: x['name'] if isinstance(x, dict) and 'name' in x else None),
+        'role': character_data['role'],
+        'favorites': character_data['favorites'],
+    })
+
+
+def legacy_voice_actors(character_data):
+    VA_df = pd.DataFrame({
+        'character_id': character_data['character'].apply(lambda x: x['mal_id'] if isinstance(x, dict) and 'mal_id' in x else None),
+        'voice_actor_info': character_data['voice_actors'].apply(
+            lambda x: [(actor['person']['mal_id'], actor['person']['name'], actor['language'])
+                       for actor in x if isinstance(actor, dict) and 'person' in actor and 'mal_id' in actor['person'] and 'language' in actor]
+            if isinstance(x, list) else []),
+    })
+    VA_df = VA_df.explode('voice_actor_info')
+    VA_df[['voice_actor_id', 'voice_actor_name', 'voice_actor_language']] = pd.DataFrame(
+        VA_df['voice_actor_info'].tolist(), index=VA_df.index)
+    VA_df.drop(columns=['voice_actor_info'], inplace=True)
+    VA_df['voice_actor_id'] = VA_df['voice_actor_id'].astype('Int64')
+    VA_df.reset_index(drop=True, inplace=True)
+    return VA_df[['character_id', 'voice_actor_id', 'voice_actor_name', 'voice_actor_language']]
+
+
+def to_csv_text(data):
+    buffer = io.StringIO()
+    data.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def measure(fn, arg, repeat):
+    """Return (best seconds, peak MiB allocated, result)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return best, peak, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the extract_* methods against the legacy versions.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    fetcher = AnimeFetcher(None, None)
+    print(f"{'extractor':<14}{'anime':>7}{'legacy s':>10}{'legacy MiB':>12}{'new s':>9}{'new MiB':>9}{'speedup':>9}")
+    for size in args.sizes:
+        mal_ids = range(1, size + 1)
+        anime_data = {'data': [make_anime(mal_id) for mal_id in mal_ids]}
+        character_data = fetcher._collect_resource([(m, make_characters(m)) for m in mal_ids], 'mal_id')
+        reviews_data = fetcher._collect_resource([(m, make_reviews(m)) for m in mal_ids], 'anime_id')
+        cases = [
+            ('anime', legacy_anime, fetcher.extract_anime_info, anime_data),
+            ('characters', legacy_characters, fetcher.extract_character_info, character_data),
+            ('voice_actors', legacy_voice_actors, fetcher.extract_VA_info, character_data),
+            ('reviews', legacy_reviews, fetcher.extract_reviews_info, reviews_data),
+        ]
+        for name, legacy, current, payload in cases:
+            old_s, old_mib, old_df = measure(legacy, payload, args.repeat)
+            new_s, new_mib, new_df = measure(current, payload, args.repeat)
+            assert to_csv_text(old_df) == to_csv_text(new_df), f"{name} output differs"
+            print(f"{name:<14}{size:>7}{old_s:>10.3f}{old_mib:>12.1f}{new_s:>9.3f}{new_mib:>9.1f}{old_s / new_s:>8.1f}x")
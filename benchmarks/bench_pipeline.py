@@ -0,0 +1,164 @@
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jikanAnimeFetcher import AnimeFetcher
+from metrics import Metrics
+from rateLimiter import RateLimiter
+from retryPolicy import RetryPolicy
+from stubJikanServer import start_stub_server, CsvFixtures, SyntheticFixtures, SEASON_NAMES
+
+# End-to-end benchmark of the fetch paths against the local fake Jikan server, so no network is needed.
+# Each path runs in a forked child and reports throughput, exact request latency percentiles and peak RSS.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_FILES = ("anime_data.csv", "cahracter_information.csv", "voice_actor_information.csv", "review_data.csv")
+
+
+def make_fetcher(base_url, args):
+    """A fetcher whose limiter matches the server's quotas, with samples kept for the percentiles."""
+    return AnimeFetcher(None, None, base_url=base_url, max_workers=args.workers,
+                        rate_limiter=RateLimiter(args.per_second, args.per_minute),
+                        retry_policy=RetryPolicy(base_delay=0.05), metrics=Metrics(keep_samples=True))
+
+
+def target_seasons(count):
+    """The first `count` seasons going back from summer 2024 (the season of the CSV fixtures)."""
+    targets = []
+    year, index = 2024, SEASON_NAMES.index('summer')
+    for _ in range(count):
+        targets.append((year, SEASON_NAMES[index]))
+        year, index = (year, index - 1) if index > 0 else (year - 1, 3)
+    return targets
+
+
+def season_path(fetcher, seasons, anime_ids):
+    records = 0
+    for year, season in seasons:
+        records += len(fetcher.fetch_anime_data_multiple_seasons([year], [season]))
+    return records
+
+
+def characters_path(fetcher, seasons, anime_ids):
+    fetcher.fetch_all_character_data(anime_ids)
+    return len(fetcher.extract_character_info()) + len(fetcher.extract_VA_info())
+
+
+def reviews_path(fetcher, seasons, anime_ids):
+    fetcher.fetch_all_reviews_data(anime_ids)
+    return len(fetcher.extract_reviews_info())
+
+
+def db_load_path(fetcher, seasons, anime_ids):
+    # Needs a PostgreSQL server configured through the DB_* environment variables
+    import dbConnection
+    anime = fetcher.fetch_anime_data_multiple_seasons([year for year, _ in seasons[:1]], [seasons[0][1]])
+    fetcher.fetch_all_character_data(anime['anime_id'])
+    fetcher.fetch_all_reviews_data(anime['anime_id'])
+    frames = (anime, fetcher.extract_character_info(), fetcher.extract_VA_info(), fetcher.extract_reviews_info())
+    # Only the load itself is timed
+    fetcher.metrics.phase_seconds['db_write'] = 0.0
+    start = time.perf_counter()
+    with dbConnection.DBConnection(metrics=fetcher.metrics) as db_conn:
+        if not (db_conn.create_schema("bench_anime_data") and db_conn.load_all(*frames, anime_table="bench_anime_data")):
+            raise RuntimeError("the database load failed, see the errors above")
+    fetcher.metrics.add_time('db_load_wall', time.perf_counter() - start)
+    return sum(len(frame) for frame in frames)
+
+
+PATHS = {
+    'season': season_path,
+    'characters': characters_path,
+    'reviews': reviews_path,
+    'db-load': db_load_path,
+}
+
+
+def measure(path, base_url, args, seasons, anime_ids):
+    """Run one path in a forked child and return its summary."""
+    # A fresh child per path keeps ru_maxrss meaningful
+    parent, child = multiprocessing.Pipe(duplex=False)
+
+    def run():
+        fetcher = make_fetcher(base_url, args)
+        gc.collect()
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        records = PATHS[path](fetcher, seasons, anime_ids)
+        elapsed = time.perf_counter() - start
+        peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+        data = fetcher.metrics.to_dict()
+        statuses = {}
+        for counts in data['requests'].values():
+            for status, count in counts.items():
+                statuses[status] = statuses.get(status, 0) + count
+        samples = sorted(sample for histogram in fetcher.metrics.latency.values() for sample in histogram.samples)
+        child.send({
+            'seconds': elapsed, 'records': records, 'peak_mib': peak,
+            'requests': sum(statuses.values()), 'errors': sum(c for s, c in statuses.items() if int(s) >= 400),
+            'retries': fetcher.retry_policy.retries, 'dead_letters': len(fetcher.dead_letters),
+            'latencies': samples, 'db_rows': data['rows_written'],
+        })
+
+    process = multiprocessing.get_context('fork').Process(target=run)
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    return samples[min(int(q * len(samples)), len(samples) - 1)] * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fetch paths against a local fake Jikan server.")
+    parser.add_argument('--paths', nargs='+', default=['season', 'characters', 'reviews'], choices=list(PATHS),
+                        help="db-load also needs a PostgreSQL server configured through DB_* variables")
+    parser.add_argument('--fixtures', default=REPO_DIR,
+                        help="directory with the CSVs to serve; synthetic records are served if they are missing")
+    parser.add_argument('--seasons', type=int, default=4, help="number of seasons fetched by the season path")
+    parser.add_argument('--anime', type=int, default=None,
+                        help="limit the character/review paths to this many anime")
+    parser.add_argument('--latency', type=float, default=0.02, help="server latency per request, in seconds")
+    parser.add_argument('--latency-jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument('--per-second', type=int, default=1000,
+                        help="quota of both the server and the client limiter (Jikan: 3)")
+    parser.add_argument('--per-minute', type=int, default=100000, help="per-minute quota (Jikan: 60)")
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    if all(os.path.exists(os.path.join(args.fixtures, name)) for name in FIXTURE_FILES):
+        fixtures = CsvFixtures(args.fixtures)
+        print(f"Serving the CSV fixtures of {args.fixtures}")
+    else:
+        fixtures = SyntheticFixtures(anime_per_season=250, characters_per_anime=8, reviews_per_anime=10)
+        print("CSV fixtures not found, serving synthetic records")
+    server, base_url = start_stub_server(per_second=args.per_second, per_minute=args.per_minute,
+                                         latency=args.latency, latency_jitter=args.latency_jitter,
+                                         error_rate=args.error_rate, fixtures=fixtures)
+    seasons = target_seasons(args.seasons)
+    anime_ids = [anime['mal_id'] for anime in fixtures.season(*seasons[0])]
+    anime_ids = list(dict.fromkeys(anime_ids))[:args.anime]
+
+    print(f"{'path':<12}{'requests':>9}{'records':>9}{'seconds':>9}{'req/s':>8}{'rec/s':>9}"
+          f"{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'peak MiB':>10}{'errors':>8}{'retries':>8}{'dead':>6}")
+    for path in args.paths:
+        result = measure(path, base_url, args, seasons, anime_ids)
+        seconds = result['seconds']
+        samples = result['latencies']
+        print(f"{path:<12}{result['requests']:>9}{result['records']:>9}{seconds:>9.2f}"
+              f"{result['requests'] / seconds:>8.1f}{result['records'] / seconds:>9.0f}"
+              f"{percentile(samples, 0.5):>8.1f}{percentile(samples, 0.95):>8.1f}{percentile(samples, 0.99):>8.1f}"
+              f"{result['peak_mib']:>10.1f}{result['errors']:>8}{result['retries']:>8}{result['dead_letters']:>6}")
+        for table, written in result['db_rows'].items():
+            print(f"  {table}: {written['rows']} rows at {written['rows_per_second']} rows/s")
+    server.shutdown()
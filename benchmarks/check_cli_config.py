@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cli
+
+# Checks that a run config's settings reach the subcommands they are meant for and no others:
+# the subcommands are built from the same option groups, so a setting leaking through a shared
+# argparse Action would silently change e.g. `fetch` (and main.py) after a [command.characters] edit.
+
+CONFIG = {
+    'years': [2023],
+    'command': {
+        'characters': {'incremental': True, 'max-reviews': 5},
+        'fetch': {'chunk_size': 7},
+    },
+}
+
+
+def parse(argv, config_path=None):
+    parser, subparsers = cli.build_parser()
+    if config_path is not None:
+        cli.apply_config(parser, subparsers, config_path)
+    return parser.parse_args(argv)
+
+
+def check(condition, message, failures):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+if __name__ == "__main__":
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pipeline.json")
+        with open(path, 'w') as file:
+            json.dump(CONFIG, file)
+        for command in ('fetch', 'seasons', 'reviews', 'redrive'):
+            plain = vars(parse([command]))
+            configured = vars(parse([command], path))
+            changed = {key for key in plain if plain[key] != configured[key]}
+            expected = {'years'} | ({'chunk_size'} if command == 'fetch' else set())
+            check(changed == expected, f"{command}: config changes {sorted(changed)}, expected {sorted(expected)}",
+                  failures)
+        args = parse(['characters'], path)
+        check(args.incremental and args.max_reviews == 5 and args.years == [2023],
+              "characters: its own section and the shared settings apply", failures)
+        check(parse(['characters', '--max-reviews', '9'], path).max_reviews == 9,
+              "characters: a flag overrides the config", failures)
+        # Parsing one subcommand must not leave anything behind for the next parser either
+        check(not parse(['fetch'], path).incremental, "fetch after characters: not incremental", failures)
+    if failures:
+        sys.exit(f"{len(failures)} check(s) failed.")
+    print("All config checks passed.")
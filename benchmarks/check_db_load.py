@@ -0,0 +1,164 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# End-to-end check of DBConnection.load_all/bulk_upsert against a real PostgreSQL server, using the CSVs
+# written by main.py. With --docker a throwaway postgres container is started; otherwise the DB_*
+# environment variables (or .env) are used. Everything is created in a scratch schema that is dropped
+# afterwards, so the tables of the configured database are never touched.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = "db_load_check"
+ANIME_TABLE = "anime_data"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_container(image):
+    """Start a postgres container and point the DB_* variables at it; returns the container name."""
+    name = f"db-load-check-{uuid.uuid4().hex[:8]}"
+    port = free_port()
+    subprocess.run(['docker', 'run', '-d', '--rm', '--name', name, '-e', 'POSTGRES_PASSWORD=check',
+                    '-p', f"127.0.0.1:{port}:5432", image], check=True, capture_output=True)
+    os.environ.update(DB_NAME='postgres', DB_USER='postgres', DB_PASSWORD='check', DB_HOST='127.0.0.1',
+                      DB_PORT=str(port))
+    return name
+
+
+def connect(timeout=60):
+    """Open a standalone connection, waiting for a server that is still starting up."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = psycopg2.connect(dbname=os.getenv('DB_NAME'), user=os.getenv('DB_USER'),
+                                    password=os.getenv('DB_PASSWORD'), host=os.getenv('DB_HOST'),
+                                    port=os.getenv('DB_PORT'))
+            conn.autocommit = True
+            return conn
+        except psycopg2.OperationalError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def read_frames(directory):
+    return [pd.read_csv(os.path.join(directory, name)) for name in
+            ("anime_data.csv", "cahracter_information.csv", "voice_actor_information.csv", "review_data.csv")]
+
+
+def expected_counts(anime, characters, voice_actors, reviews):
+    """Rows each table should hold after load_all: one per key, like the loaders deduplicate them."""
+    characters = characters.dropna(subset=['anime_id', 'character_id'])
+    voice_actors = voice_actors.dropna(subset=['character_id', 'voice_actor_id'])
+    return {
+        ANIME_TABLE: anime['anime_id'].nunique(),
+        'characters': characters['character_id'].nunique(),
+        'anime_characters': len(characters.drop_duplicates(['anime_id', 'character_id'])),
+        'voice_actors': voice_actors['voice_actor_id'].nunique(),
+        'character_voice_actors': len(voice_actors.drop_duplicates(['character_id', 'voice_actor_id'])),
+        'reviews': reviews['review_id'].dropna().nunique(),
+    }
+
+
+def table_counts(conn, tables):
+    counts = {}
+    with conn.cursor() as cur:
+        for table in tables:
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cur.fetchone()[0]
+    return counts
+
+
+def check(condition, message, failures):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def run_checks(directory):
+    """Load the CSVs twice, then one anime with a changed value; returns the failed checks."""
+    import dbConnection
+    anime, characters, voice_actors, reviews = read_frames(directory)
+    failures = []
+    conn = connect()
+    try:
+        with dbConnection.DBConnection() as db_conn:
+            check(db_conn.create_schema(ANIME_TABLE), "create_schema", failures)
+            check(db_conn.load_all(anime, characters, voice_actors, reviews, anime_table=ANIME_TABLE),
+                  "first load_all succeeds", failures)
+            expected = expected_counts(anime, characters, voice_actors, reviews)
+            counts = table_counts(conn, expected)
+            for table, count in expected.items():
+                check(counts[table] == count, f"{table}: {counts[table]} rows, expected {count}", failures)
+
+            # Loading the same data again rewrites nothing: ON CONFLICT only updates rows that changed
+            merged = db_conn.insert_data(ANIME_TABLE, anime, bulk=True)
+            check(merged == 0, f"reloading unchanged anime merges 0 rows (merged {merged})", failures)
+            check(db_conn.load_all(anime, characters, voice_actors, reviews, anime_table=ANIME_TABLE),
+                  "second load_all succeeds", failures)
+            check(table_counts(conn, expected) == counts, "second load_all adds no rows", failures)
+
+            # A changed value is updated in place
+            changed = anime.drop_duplicates('anime_id', keep='last').head(1).copy()
+            mal_id = int(changed['anime_id'].iloc[0])
+            changed['members'] = 123456789
+            merged = db_conn.insert_data(ANIME_TABLE, changed, bulk=True)
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT members FROM {ANIME_TABLE} WHERE mal_id = %s", (mal_id,))
+                members = cur.fetchone()[0]
+            check(merged == 1 and members == 123456789, f"changed anime {mal_id} is updated (merged {merged})",
+                  failures)
+
+            # Ids pandas widened to float because of nulls are stored as integers, not rejected
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM reviews WHERE episodes_watched IS NOT NULL")
+                stored = cur.fetchone()[0]
+            check(stored == reviews.dropna(subset=['review_id']).drop_duplicates('review_id', keep='last')
+                  ['episodes_watched'].notna().sum(), "nullable integer columns round-trip", failures)
+    finally:
+        conn.close()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check DBConnection.load_all against a real PostgreSQL server.")
+    parser.add_argument('--docker', action='store_true', help="start a throwaway postgres container for the check")
+    parser.add_argument('--image', default="postgres:16", help="image used with --docker")
+    parser.add_argument('--data-dir', default=REPO_DIR, help="directory holding the CSVs written by main.py")
+    args = parser.parse_args()
+
+    load_dotenv()
+    container = start_container(args.image) if args.docker else None
+    try:
+        # A fresh container takes a few seconds to accept connections
+        admin = connect(timeout=60 if container is not None else 0)
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        # Every pooled connection of DBConnection resolves the unqualified table names in the scratch schema
+        os.environ['PGOPTIONS'] = f"-c search_path={SCHEMA}"
+        try:
+            failures = run_checks(args.data_dir)
+        finally:
+            with admin.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            admin.close()
+    finally:
+        if container is not None:
+            subprocess.run(['docker', 'stop', container], capture_output=True)
+    if failures:
+        sys.exit(f"{len(failures)} check(s) failed.")
+    print("All database load checks passed.")
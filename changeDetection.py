@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+import pandas as pd
+
+# Columns identifying a row of each extracted dataset; every other column is content
+KEYS = {
+    'anime': ['anime_id'],
+    'characters': ['anime_id', 'character_id'],
+    'voice_actors': ['character_id', 'voice_actor_id'],
+    'reviews': ['review_id'],
+}
+
+# Numeric columns that really are floats; every other numeric column holds integers, even when nulls made
+# pandas widen it to float. Decided per dataset, not per frame, so a chunk whose scores happen to be whole
+# numbers hashes them like every other chunk (8.0, not 8)
+FLOAT_COLUMNS = {
+    'anime': {'score'},
+    'reviews': {'score'},
+}
+
+# Stands in for nulls in the canonical form; '' maps to it as well, since a CSV cannot tell them apart
+NULL = '\x00'
+
+
+# Function to give a frame the same text form whether it was just extracted or read back from a CSV
+def _canonical(data, float_columns=()):
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_bool_dtype(values) or values.dtype == object and values.dropna().map(type).eq(bool).all():
+            values = values.map(lambda v: NULL if pd.isna(v) else str(bool(v)))
+        elif column in float_columns:
+            values = pd.to_numeric(values, errors='coerce').astype('float64').astype('string').fillna(NULL)
+        elif pd.api.types.is_numeric_dtype(values):
+            numbers = values.dropna()
+            # Ids that pandas widened to float because of nulls hash like the integers they are
+            if pd.api.types.is_float_dtype(values) and (numbers == numbers.round()).all():
+                values = values.astype('Int64')
+            values = values.astype('string').fillna(NULL)
+        else:
+            values = values.astype(object).where(values.notna(), None)
+            values = values.map(lambda v: NULL if v is None or v == '' else str(v))
+        columns[column] = values.astype(str)
+    return pd.DataFrame(columns, index=data.index)
+
+
+# Function to hash each row of some columns into a signed 64-bit integer SQLite can store
+def row_hashes(data, columns, float_columns=()):
+    """Return one int64 hash per row of data[columns]; float_columns are always hashed as floats."""
+    if data.empty:
+        return pd.Series([], dtype='int64')
+    hashes = pd.util.hash_pandas_object(_canonical(data[columns], float_columns), index=False, categorize=False)
+    return pd.Series(hashes.to_numpy().view('int64'), index=data.index)
+
+
+class Delta:
+    def __init__(self, dataset, changes, key_hashes, content_hashes, unchanged):
+        """What changed in one dataset since the hashes were last committed."""
+        self.dataset = dataset
+        # Changed rows only, with a 'change' column holding 'insert' or 'update'
+        self.changes = changes
+        self.key_hashes = key_hashes
+        self.content_hashes = content_hashes
+        self.inserted = int((changes['change'] == 'insert').sum()) if not changes.empty else 0
+        self.updated = len(changes) - self.inserted
+        self.unchanged = unchanged
+
+    def rows(self):
+        """The changed rows without the 'change' column, ready for a sink or DBConnection."""
+        return self.changes.drop(columns=['change'])
+
+    def counts(self):
+        return {'inserted': self.inserted, 'updated': self.updated, 'unchanged': self.unchanged}
+
+    def report(self):
+        print(f"{self.dataset}: {self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged")
+
+
+class ChangeDetector:
+    def __init__(self, path="change_index.sqlite"):
+        """Local index of the content hash last seen for every row key of every dataset."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS row_hashes (
+                dataset TEXT,
+                key_hash INTEGER,
+                content_hash INTEGER,
+                PRIMARY KEY (dataset, key_hash)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def _known(self, dataset, key_hashes):
+        """Return {key_hash: content_hash} for the keys already in the index."""
+        known = {}
+        keys = list(dict.fromkeys(key_hashes.tolist()))
+        # Stay below SQLite's limit on bound parameters
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            rows = self.conn.execute(
+                f"SELECT key_hash, content_hash FROM row_hashes WHERE dataset = ? "
+                f"AND key_hash IN ({', '.join('?' * len(chunk))})", [dataset] + chunk)
+            known.update(rows.fetchall())
+        return known
+
+    # Function to compare extracted rows with the hashes seen last time
+    def diff(self, dataset, data):
+        """Return the Delta of data against the index; call commit(delta) once the changes are stored."""
+        key_columns = KEYS[dataset]
+        # The same key twice in one frame (an anime listed in two seasons): the last copy wins
+        data = data.drop_duplicates(subset=key_columns, keep='last')
+        content_columns = [c for c in data.columns if c not in key_columns]
+        key_hashes = row_hashes(data, key_columns)
+        content_hashes = row_hashes(data, content_columns, FLOAT_COLUMNS.get(dataset, ()))
+        with self.lock:
+            known = self._known(dataset, key_hashes)
+        previous = key_hashes.map(known)
+        change = pd.Series('update', index=data.index)
+        change[previous.isna()] = 'insert'
+        changed = previous.isna() | (previous != content_hashes)
+        changes = data[changed].assign(change=change[changed])
+        return Delta(dataset, changes, key_hashes[changed], content_hashes[changed], int((~changed).sum()))
+
+    def commit(self, delta):
+        """Record the hashes of a delta's rows as seen."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO row_hashes (dataset, key_hash, content_hash) VALUES (?, ?, ?) "
+                "ON CONFLICT (dataset, key_hash) DO UPDATE SET content_hash = excluded.content_hash",
+                zip([delta.dataset] * len(delta.key_hashes), delta.key_hashes.tolist(), delta.content_hashes.tolist()))
+            self.conn.commit()
+
+    def apply(self, dataset, data):
+        """diff and commit in one go, for outputs that cannot fail half way."""
+        delta = self.diff(dataset, data)
+        self.commit(delta)
+        return delta
+
+    def reset(self, dataset=None):
+        """Forget the hashes of one dataset, or of all of them, so everything counts as inserted."""
+        with self.lock:
+            if dataset is None:
+                self.conn.execute("DELETE FROM row_hashes")
+            else:
+                self.conn.execute("DELETE FROM row_hashes WHERE dataset = ?", (dataset,))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ChangeSink:
+    def __init__(self, detector, dataset, sink, defer_commit=False):
+        """Sink for streamingPipeline.run_streaming that forwards only new or changed rows.
+
+        With defer_commit the hashes of the chunks are only recorded by commit(), e.g. once the changes
+        have also been loaded into the database.
+        """
+        self.detector = detector
+        self.dataset = dataset
+        self.sink = sink
+        self.defer_commit = defer_commit
+        # Hashes of the chunks written but not committed yet, without their rows
+        self.deferred = []
+        self.totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    def write(self, data):
+        if data.empty:
+            return
+        delta = self.detector.diff(self.dataset, data)
+        if not delta.changes.empty:
+            self.sink.write(delta.changes)
+        if self.defer_commit:
+            self.deferred.append(Delta(self.dataset, delta.changes.iloc[:0], delta.key_hashes,
+                                       delta.content_hashes, delta.unchanged))
+        else:
+            # The chunk reached the sink, its hashes can be recorded
+            self.detector.commit(delta)
+        for name, count in delta.counts().items():
+            self.totals[name] += count
+
+    def commit(self):
+        """Record the hashes of every chunk written since the last commit."""
+        for delta in self.deferred:
+            self.detector.commit(delta)
+        self.deferred = []
+
+    def close(self):
+        self.sink.close()
+        print(f"{self.dataset}: {self.totals['inserted']} inserted, {self.totals['updated']} updated, "
+              f"{self.totals['unchanged']} unchanged")
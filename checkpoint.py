@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+
+AIRING_STATUS = 'Currently Airing'
+
+
+class CheckpointJournal:
+    def __init__(self, directory="checkpoints"):
+        """Append-only journal of fetched per-anime results, one JSON line per anime and resource type."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        # resource -> {mal_id: byte offset of its latest line}; the records stay on disk until asked for
+        self.offsets = {}
+
+    def _path(self, resource):
+        return os.path.join(self.directory, f"{resource}.jsonl")
+
+    def _finished_path(self, resource):
+        return os.path.join(self.directory, f"{resource}.finished")
+
+    # Function to index the journal of one resource type (later lines win)
+    def _load(self, resource):
+        if resource in self.offsets:
+            return self.offsets[resource]
+        offsets = {}
+        path = self._path(resource)
+        if os.path.exists(path):
+            with open(path, 'rb+') as file:
+                offset = file.tell()
+                for line in iter(file.readline, b''):
+                    if not line.endswith(b'\n'):
+                        # A line cut short by a crash: drop it so the next append starts on a clean line
+                        file.truncate(offset)
+                        break
+                    try:
+                        entry = json.loads(line)
+                        offsets[entry['mal_id']] = offset
+                    except ValueError:
+                        pass
+                    offset = file.tell()
+        self.offsets[resource] = offsets
+        return offsets
+
+    def completed(self, resource):
+        """Return the set of mal_ids whose data has been fully fetched for this resource."""
+        with self.lock:
+            return set(self._load(resource))
+
+    # Function to work out which ids still have to be fetched
+    def pending(self, resource, mal_ids, refresh_ids=None):
+        """Return the ids of mal_ids that are not journaled yet, plus any in refresh_ids.
+
+        Journaled ids are only skipped to resume an interrupted run, or in incremental mode (refresh_ids
+        given). A full run after a finished one starts from an empty journal and fetches everything again.
+        """
+        if refresh_ids is None and os.path.exists(self._finished_path(resource)):
+            self.reset(resource)
+        done = self.completed(resource)
+        refresh = set(refresh_ids) if refresh_ids is not None else set()
+        return [mal_id for mal_id in mal_ids if mal_id not in done or mal_id in refresh]
+
+    # Function to persist the result of one anime as soon as it arrives
+    def record(self, resource, mal_id, records):
+        """Append the records of one anime to the journal and mark it as fetched."""
+        mal_id = int(mal_id)
+        line = (json.dumps({'mal_id': mal_id, 'records': records}) + "\n").encode('utf-8')
+        with self.lock:
+            offsets = self._load(resource)
+            # The journal now belongs to a run in progress again
+            if os.path.exists(self._finished_path(resource)):
+                os.remove(self._finished_path(resource))
+            with open(self._path(resource), 'ab') as file:
+                offset = file.tell()
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            offsets[mal_id] = offset
+
+    def results(self, resource, mal_ids):
+        """Return (mal_id, records) pairs for every journaled id in mal_ids, in that order."""
+        with self.lock:
+            offsets = self._load(resource)
+            results = []
+            if not offsets:
+                return results
+            with open(self._path(resource), 'rb') as file:
+                for mal_id in mal_ids:
+                    if mal_id in offsets:
+                        file.seek(offsets[mal_id])
+                        results.append((mal_id, json.loads(file.readline())['records']))
+            return results
+
+    # Function to rewrite a journal keeping only the latest line of every anime
+    def compact(self, resource):
+        """Drop superseded lines left behind by refreshed anime."""
+        with self.lock:
+            offsets = self._load(resource)
+            path = self._path(resource)
+            tmp_path = path + ".tmp"
+            new_offsets = {}
+            with open(path, 'rb') as source, open(tmp_path, 'wb') as target:
+                for mal_id, offset in offsets.items():
+                    source.seek(offset)
+                    new_offsets[mal_id] = target.tell()
+                    target.write(source.readline())
+            os.replace(tmp_path, path)
+            self.offsets[resource] = new_offsets
+
+    # Function to close the journals of a run whose outputs have been written
+    def finish(self):
+        """Compact the journal of every resource used by this run and mark the run as finished."""
+        for resource in list(self.offsets):
+            if not os.path.exists(self._path(resource)):
+                continue
+            self.compact(resource)
+            with open(self._finished_path(resource), 'w'):
+                pass
+
+    def reset(self, resource):
+        """Forget everything journaled for a resource type."""
+        with self.lock:
+            for path in (self._path(resource), self._finished_path(resource)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.offsets.pop(resource, None)
+
+
+# Function to pick the anime whose data can change between runs
+def airing_ids(anime_df):
+    """Return the anime_ids of extract_anime_info output that are still airing."""
+    if anime_df is None or anime_df.empty:
+        return []
+    return [int(mal_id) for mal_id in anime_df.loc[anime_df['status'] == AIRING_STATUS, 'anime_id']]
@@ -0,0 +1,564 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+# Only the standard library is imported here. pandas, jikanpy, psycopg2 and pyarrow cost about a
+# second to import, so every subcommand imports what it needs when it runs (`--help` needs none).
+
+DEFAULT_CONFIG = "pipeline.toml"
+SEASON_OF_MONTH = ['winter'] * 3 + ['spring'] * 3 + ['summer'] * 3 + ['fall'] * 3
+
+OUTPUTS = {
+    'anime': "anime_data.csv",
+    'characters': "cahracter_information.csv",
+    'voice_actors': "voice_actor_information.csv",
+    'reviews': "review_data.csv",
+}
+
+
+# Function to read the run config, TOML or JSON depending on the file extension
+def load_config(path):
+    """Return {setting: value}; top-level settings apply to every subcommand, [command.<name>] tables to one."""
+    if path.endswith('.json'):
+        with open(path) as file:
+            return json.load(file)
+    import tomllib
+    with open(path, 'rb') as file:
+        return tomllib.load(file)
+
+
+def current_season():
+    today = date.today()
+    return today.year, SEASON_OF_MONTH[today.month - 1]
+
+
+# Function to build the fetcher and the cache, journal, stores and metrics it reports on
+def make_fetcher(args, use_async=False):
+    import checkpoint
+    import metrics
+    import payloadArchive
+    import responseCache
+    import retryPolicy
+    import reviewStore
+    archive = payloadArchive.PayloadArchive(args.archive) if args.archive else None
+    replay = payloadArchive.PayloadArchive(args.replay) if args.replay else None
+    if replay is not None:
+        # A replay re-extracts everything archived: no cache, no journal to skip anime, nothing to re-drive
+        cache = None
+        journal = None
+        dead_letters = retryPolicy.DeadLetters()
+    else:
+        cache = responseCache.ResponseCache("jikan_cache.sqlite") if args.use_cache else None
+        journal = checkpoint.CheckpointJournal(args.checkpoint_dir)
+        # Pages and anime that still failed after every retry, kept next to the journal for a later re-drive
+        dead_letters = retryPolicy.DeadLetters(os.path.join(args.checkpoint_dir, "dead_letters.json"))
+    # Review bodies are kept on disk and only read back when the review CSV is written
+    review_store = reviewStore.ReviewTextStore("review_text.store")
+    review_limits = reviewStore.ReviewLimits(args.review_pages, args.max_reviews, args.reviews_since)
+    # One set of metrics for the fetcher and the database, to see where the wall-clock time goes
+    run_metrics = metrics.Metrics()
+    if args.metrics_port is not None:
+        run_metrics.serve(args.metrics_port, args.metrics_host)
+    if use_async:
+        import asyncAnimeFetcher
+        fetcher_class = asyncAnimeFetcher.AsyncAnimeFetcher
+    else:
+        import jikanAnimeFetcher
+        fetcher_class = jikanAnimeFetcher.AnimeFetcher
+    return fetcher_class(args.years, args.seasons, base_url=args.base_url, cache=cache, checkpoint=journal, dead_letters=dead_letters,
+                         review_limits=review_limits, review_store=review_store, metrics=run_metrics,
+                         archive=archive, replay=replay)
+
+
+# Function to print what the fetch used and close everything make_fetcher opened
+def finish_fetch(af):
+    # Show how much of the API budget the run actually used
+    af.rate_limiter.report()
+    af.coalescer.report()
+    af.dead_letters.report()
+    if af.checkpoint is not None:
+        # The outputs are written: a later full run starts over, an incremental one reuses the journal
+        af.checkpoint.finish()
+    af.review_store.close()
+    for payloads in (af.archive, af.replay):
+        if payloads is not None:
+            payloads.report()
+            payloads.close()
+    if af.cache is not None:
+        af.cache.report()
+
+
+def finish_metrics(args, run_metrics):
+    run_metrics.report()
+    run_metrics.dump_json(args.metrics_json)
+    run_metrics.close()
+
+
+# Function to write an output CSV, keeping the rows of the existing file that this run did not fetch again
+def save_merged(af, name, frame, key):
+    """Rows of OUTPUTS[name] whose key is in frame are replaced by frame's rows, the others are kept.
+
+    Returns the merged DataFrame.
+    """
+    import pandas as pd
+    filename = OUTPUTS[name]
+    if os.path.exists(filename) and not frame.empty:
+        existing = pd.read_csv(filename)
+        frame = pd.concat([existing[~existing[key].isin(frame[key])], frame], ignore_index=True)
+    af.save_to_csv(filename, frame)
+    return frame
+
+
+# Function to write the review CSV of a run
+def save_reviews(args, af, partial=False):
+    """With --reviews-since only newer reviews were fetched, so they are merged into the CSV by review_id;
+    a partial run replaces the reviews of the anime it fetched and keeps the others."""
+    reviews = af.extract_reviews_info()
+    if args.reviews_since:
+        return save_merged(af, 'reviews', reviews, 'review_id')
+    if partial:
+        return save_merged(af, 'reviews', reviews, 'anime_id')
+    af.save_to_csv(OUTPUTS['reviews'], reviews)
+    return reviews
+
+
+# Function to read the anime ids the characters/reviews subcommands work on
+def target_anime(args):
+    """Return (anime ids, ids to re-fetch even if journaled) from --ids or every anime of the anime CSV."""
+    import pandas as pd
+    import checkpoint
+    if args.ids:
+        return args.ids, args.ids if args.incremental else None
+    # Every anime: many have no season or year (continuing shows, specials), filtering on them would drop those
+    anime = pd.read_csv(args.anime_csv)
+    # In incremental mode anime that are still airing are re-fetched even if journaled
+    return anime['anime_id'].drop_duplicates().tolist(), checkpoint.airing_ids(anime) if args.incremental else None
+
+
+def cmd_seasons(args):
+    """Fetch the anime of the configured seasons into anime_data.csv."""
+    import backfillPlanner
+    af = make_fetcher(args)
+    if args.startup_only:
+        return
+    if args.backfill:
+        all_anime_data = backfillPlanner.BackfillPlanner(af, args.years, args.seasons).run_seasons()
+    else:
+        all_anime_data = af.fetch_anime_data_multiple_seasons(years=args.years, seasons=args.seasons)
+    # Anime of the other seasons already in the CSV are kept
+    all_anime_data = save_merged(af, 'anime', all_anime_data, 'anime_id')
+    if args.parquet:
+        af.save_to_parquet('anime', all_anime_data)
+    finish_fetch(af)
+    finish_metrics(args, af.metrics)
+
+
+def cmd_characters(args):
+    """Fetch the characters and voice actors of the anime in anime_data.csv (or --ids)."""
+    af = make_fetcher(args)
+    if args.startup_only:
+        return
+    mal_ids, refresh_ids = target_anime(args)
+    af.fetch_all_character_data(mal_ids, refresh_ids)
+    # Only the anime (and their characters) fetched now are replaced, e.g. with --ids
+    characters = save_merged(af, 'characters', af.extract_character_info(), 'anime_id')
+    voice_actors = save_merged(af, 'voice_actors', af.extract_VA_info(), 'character_id')
+    if args.parquet:
+        af.save_to_parquet('characters', characters)
+        af.save_to_parquet('voice_actors', voice_actors)
+    finish_fetch(af)
+    finish_metrics(args, af.metrics)
+
+
+def cmd_reviews(args):
+    """Fetch the reviews of the anime in anime_data.csv (or --ids)."""
+    af = make_fetcher(args)
+    if args.startup_only:
+        return
+    mal_ids, refresh_ids = target_anime(args)
+    af.fetch_all_reviews_data(mal_ids, refresh_ids)
+    reviews = save_reviews(args, af, partial=True)
+    if args.parquet:
+        af.save_to_parquet('reviews', reviews)
+    finish_fetch(af)
+    finish_metrics(args, af.metrics)
+
+
+def cmd_redrive(args):
+    """Fetch the dead-lettered season pages, characters and reviews again and merge them into the CSVs."""
+    af = make_fetcher(args, use_async=args.use_async)
+    # The metrics (and a --metrics-port server) are closed however the run ends
+    try:
+        if args.startup_only:
+            return
+        if len(af.dead_letters) == 0:
+            print("No dead letters to re-drive.")
+            finish_fetch(af)
+            return
+        if args.use_async:
+            import asyncio
+            recovered = asyncio.run(af.redrive_dead_letters())
+        else:
+            recovered = af.redrive_dead_letters()
+        # Only what was recovered replaces rows of the CSVs; anything failing again stays dead-lettered
+        outputs = {
+            'anime': save_merged(af, 'anime', recovered['anime'], 'anime_id'),
+            'characters': save_merged(af, 'characters', af.extract_character_info(recovered['characters']),
+                                      'anime_id'),
+            'voice_actors': save_merged(af, 'voice_actors', af.extract_VA_info(recovered['characters']),
+                                        'character_id'),
+            'reviews': save_merged(af, 'reviews', af.extract_reviews_info(recovered['reviews']),
+                                   'review_id' if args.reviews_since else 'anime_id'),
+        }
+        if args.parquet:
+            for name, data in outputs.items():
+                af.save_to_parquet(name, data)
+        finish_fetch(af)
+    finally:
+        finish_metrics(args, af.metrics)
+
+
+# Function to update the outputs derived from the CSVs: search index, aggregates, similar anime
+def export_outputs(args):
+    import pandas as pd
+    if args.search_index:
+        import searchIndex
+        # Only documents whose text or filter fields changed are re-indexed
+        index = searchIndex.SearchIndex(args.search_index)
+        index.add_anime(pd.read_csv(OUTPUTS['anime']))
+        for chunk in pd.read_csv(OUTPUTS['reviews'], chunksize=5000):
+            index.add_reviews(chunk)
+        index.close()
+    if args.aggregates:
+        import aggregateStore
+        # Read by the dashboards (see aggregateStore.py show) instead of the CSVs
+        store = aggregateStore.AggregateStore(args.aggregates)
+        store.update(*(pd.read_csv(OUTPUTS[name]) for name in ('anime', 'characters', 'voice_actors', 'reviews')))
+        store.close()
+    if args.similar:
+        import similarityEngine
+        # Lists are cached in similarity_cache.npz; only those the new or changed anime affect are recomputed
+        engine = similarityEngine.SimilarityEngine(k=10, cache_path="similarity_cache.npz")
+        engine.fit(pd.read_csv(OUTPUTS['anime']), pd.read_csv(OUTPUTS['characters']),
+                   pd.read_csv(OUTPUTS['voice_actors']))
+        engine.to_frame().to_csv("similar_anime.csv", index=False)
+        print("Similar anime have been saved to similar_anime.csv.")
+
+
+def changes_file(filename):
+    return filename.replace(".csv", "_changes.csv")
+
+
+# Function to upsert the CSVs into the database, only the rows changed since the last run with --delta
+def load_outputs(args, run_metrics, change_sinks=None):
+    """Return whether the database load (if any) succeeded; change hashes are only recorded if it did.
+
+    change_sinks are the changeDetection.ChangeSinks of a --stream --delta run: they already wrote the
+    changed rows to the *_changes.csv files, which are loaded instead of diffing the CSVs again.
+    """
+    import pandas as pd
+    deltas = {}
+    detector = None
+    if change_sinks is not None:
+        frames = {}
+        for name, filename in OUTPUTS.items():
+            # No changes file: nothing changed, an empty frame with the CSV's columns is loaded
+            path = changes_file(filename)
+            frames[name] = (pd.read_csv(path).drop(columns=['change']) if os.path.exists(path)
+                            else pd.read_csv(filename, nrows=0))
+    else:
+        frames = {name: pd.read_csv(filename) for name, filename in OUTPUTS.items()}
+    if args.delta and change_sinks is None:
+        import changeDetection
+        # Only rows whose content hash differs from the last run go further
+        detector = changeDetection.ChangeDetector("change_index.sqlite")
+        for name, filename in OUTPUTS.items():
+            deltas[name] = detector.diff(name, frames[name])
+            deltas[name].report()
+            deltas[name].changes.to_csv(changes_file(filename), index=False)
+            frames[name] = deltas[name].rows()
+
+    loaded = True
+    if args.load_db:
+        import dbConnection
+        # Initialize the DB connection class
+        with dbConnection.DBConnection(metrics=run_metrics) as db_conn:
+
+            # Create the anime table and the character, voice actor and review tables,
+            # then insert new rows and update changed ones, parents before the tables referencing them
+            loaded = (db_conn.create_schema("anime_data") and
+                      db_conn.load_all(frames['anime'], frames['characters'], frames['voice_actors'], frames['reviews']))
+
+    if args.delta:
+        # Hashes are recorded once the changes have been written and loaded, so a failed run is redone
+        if loaded:
+            for delta in deltas.values():
+                detector.commit(delta)
+            for sink in (change_sinks or {}).values():
+                sink.commit()
+        else:
+            print("Database load failed: change hashes were not recorded, the next --delta run loads these rows again.")
+        if detector is not None:
+            detector.close()
+    return loaded
+
+
+def cmd_fetch(args):
+    """Fetch seasons, characters and reviews, then update the derived outputs (what main.py runs)."""
+    import checkpoint
+    # run_streaming drives the sync iterators, so --stream always uses the sync fetcher
+    af = make_fetcher(args, use_async=args.use_async and not args.stream)
+    if args.startup_only:
+        return
+    change_sinks = None
+    if args.stream:
+        import sinks
+        import streamingPipeline
+        # Extracted rows go straight to the CSV files, chunk by chunk
+        csv_sinks = {name: sinks.CsvSink(filename) for name, filename in OUTPUTS.items()}
+        if args.parquet:
+            import parquetSink
+            csv_sinks = {name: sinks.TeeSink(sink, parquetSink.ParquetSink(name)) for name, sink in csv_sinks.items()}
+        if args.delta:
+            import changeDetection
+            # Each chunk is also compared with the last run, its new or changed rows go to *_changes.csv;
+            # the hashes are recorded by load_outputs once the changes are loaded
+            detector = changeDetection.ChangeDetector("change_index.sqlite")
+            change_sinks = {}
+            for name, filename in OUTPUTS.items():
+                if os.path.exists(changes_file(filename)):
+                    os.remove(changes_file(filename))
+                change_sinks[name] = changeDetection.ChangeSink(detector, name, sinks.CsvSink(changes_file(filename)),
+                                                                defer_commit=True)
+            csv_sinks = {name: sinks.TeeSink(sink, change_sinks[name]) for name, sink in csv_sinks.items()}
+        streamingPipeline.run_streaming(af, args.years, args.seasons, csv_sinks, chunk_size=args.chunk_size,
+                                        incremental=args.incremental)
+        for sink in csv_sinks.values():
+            sink.close()
+    else:
+        if args.use_async:
+            import asyncio
+            all_anime_data = asyncio.run(af.fetch_all(years=args.years, seasons=args.seasons,
+                                                      incremental=args.incremental))
+        elif args.backfill:
+            import backfillPlanner
+            all_anime_data = backfillPlanner.BackfillPlanner(af, args.years, args.seasons).run(
+                incremental=args.incremental)
+        else:
+            all_anime_data = af.fetch_anime_data_multiple_seasons(years=args.years, seasons=args.seasons)
+            # In incremental mode anime that are still airing are re-fetched even if journaled
+            refresh_ids = checkpoint.airing_ids(all_anime_data) if args.incremental else None
+
+            af.fetch_all_character_data(all_anime_data['anime_id'], refresh_ids)
+            af.fetch_all_reviews_data(all_anime_data['anime_id'], refresh_ids)
+
+        af.save_to_csv(OUTPUTS['anime'], all_anime_data)
+        reviews = save_reviews(args, af)
+        af.save_to_csv(OUTPUTS['characters'], af.extract_character_info())
+        af.save_to_csv(OUTPUTS['voice_actors'], af.extract_VA_info())
+        if args.parquet:
+            af.save_to_parquet('anime', all_anime_data)
+            af.save_to_parquet('reviews', reviews)
+            af.save_to_parquet('characters', af.extract_character_info())
+            af.save_to_parquet('voice_actors', af.extract_VA_info())
+
+    finish_fetch(af)
+    export_outputs(args)
+    loaded = load_outputs(args, af.metrics, change_sinks) if args.load_db or args.delta else True
+    if change_sinks is not None:
+        detector.close()
+    finish_metrics(args, af.metrics)
+    if not loaded:
+        sys.exit("Database load failed.")
+
+
+def cmd_load_db(args):
+    """Bulk upsert the CSVs into the database."""
+    import metrics
+    # Imported before any work so that --startup-only measures what this subcommand loads
+    import pandas
+    import dbConnection
+    if args.startup_only:
+        return
+    run_metrics = metrics.Metrics()
+    loaded = load_outputs(args, run_metrics)
+    finish_metrics(args, run_metrics)
+    if not loaded:
+        sys.exit("Database load failed.")
+
+
+def cmd_export(args):
+    """Write Parquet datasets and update the derived outputs from the CSVs, without fetching."""
+    import pandas as pd
+    if args.startup_only:
+        return
+    if args.parquet:
+        import parquetSink
+        for name, filename in OUTPUTS.items():
+            parquetSink.save_to_parquet(name, pd.read_csv(filename), append=False)
+    export_outputs(args)
+
+
+# The option groups are built anew for every subcommand: parents= shares the Action objects, and
+# set_defaults on one subcommand (see apply_config) would change the defaults of all the others
+def run_options():
+    """Options of every subcommand."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--years', type=int, nargs='+', default=None,
+                        help="years to work on (default: the current season's)")
+    parser.add_argument('--seasons', nargs='+', default=None, choices=['winter', 'spring', 'summer', 'fall'],
+                        help="seasons to work on (default: the current one)")
+    parser.add_argument('--metrics-json', default="metrics.json",
+                        help="file the latency, status code and time-per-phase metrics are written to")
+    # Imports what the subcommand needs and stops, see benchmarks/bench_cli_startup.py
+    parser.add_argument('--startup-only', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+
+def fetch_options():
+    """Options of the subcommands that fetch from the API."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help="always go to the network instead of the local response cache")
+    parser.add_argument('--checkpoint-dir', default="checkpoints",
+                        help="directory of the journal used to resume character and review fetches")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only fetch characters/reviews of new anime and anime that are still airing")
+    parser.add_argument('--review-pages', type=int, default=None,
+                        help="read at most this many pages of reviews per anime (default: all)")
+    parser.add_argument('--max-reviews', type=int, default=None,
+                        help="keep at most this many reviews per anime (default: all)")
+    parser.add_argument('--reviews-since', default=None,
+                        help="skip reviews older than this date (YYYY-MM-DD), for incremental runs")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="also serve Prometheus metrics on this port while the run is going")
+    parser.add_argument('--metrics-host', default="127.0.0.1",
+                        help="address the metrics are served on ('0.0.0.0' for remote scrapers)")
+    parser.add_argument('--archive', default=None,
+                        help="record every raw API response as gzip NDJSON under this directory")
+    parser.add_argument('--replay', default=None,
+                        help="answer every request from an archive recorded with --archive instead of the API")
+    parser.add_argument('--base-url', default=None,
+                        help="Jikan API base URL, e.g. a local stubJikanServer.py (default: the public API)")
+    parser.add_argument('--parquet', action='store_true',
+                        help="also write typed Parquet datasets under parquet/")
+    return parser
+
+
+def anime_options():
+    """Options choosing the anime the characters/reviews subcommands work on."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--anime-csv', default=OUTPUTS['anime'],
+                        help="every anime listed in this file is fetched")
+    parser.add_argument('--ids', type=int, nargs='+', default=None, help="anime ids to use instead")
+    return parser
+
+
+def export_options():
+    """Options of the outputs derived from the CSVs."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--search-index', default=None,
+                        help="add new or changed synopses and reviews to this full-text index")
+    parser.add_argument('--similar', action='store_true',
+                        help="write the top-10 similar anime of every anime to similar_anime.csv")
+    parser.add_argument('--aggregates', default="aggregates.sqlite",
+                        help="dashboard aggregates updated with the new/changed rows ('' to skip)")
+    return parser
+
+
+def load_options():
+    """Options of the database load."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--delta', action='store_true',
+                        help="compare the CSVs with the last run: write *_changes.csv and load only changed rows")
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Fetch anime, character and review data from the Jikan API.",
+        epilog=f"Settings are read from --config (default {DEFAULT_CONFIG} if it exists); flags override them.")
+    parser.add_argument('--config', default=None, help="TOML or JSON run config")
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    seasons = commands.add_parser('seasons', parents=[run_options(), fetch_options()], help=cmd_seasons.__doc__)
+    seasons.add_argument('--backfill', action='store_true', help="fetch every page of every season on a worker pool")
+    seasons.set_defaults(handler=cmd_seasons)
+
+    characters = commands.add_parser('characters', parents=[run_options(), fetch_options(), anime_options()],
+                                     help=cmd_characters.__doc__)
+    characters.set_defaults(handler=cmd_characters)
+
+    reviews = commands.add_parser('reviews', parents=[run_options(), fetch_options(), anime_options()],
+                                  help=cmd_reviews.__doc__)
+    reviews.set_defaults(handler=cmd_reviews)
+
+    fetch = commands.add_parser('fetch', parents=[run_options(), fetch_options(), export_options(), load_options()],
+                                help=cmd_fetch.__doc__)
+    fetch.add_argument('--async', dest='use_async', action='store_true',
+                       help="use the asyncio fetcher with a pooled HTTP session (ignored with --stream)")
+    fetch.add_argument('--stream', action='store_true',
+                       help="write the CSVs chunk by chunk instead of holding every season in memory")
+    fetch.add_argument('--backfill', action='store_true',
+                       help="fetch all seasons on a worker pool, listing continuing shows only once")
+    fetch.add_argument('--load-db', action='store_true',
+                       help="bulk upsert the anime, character, voice actor and review CSVs into the database")
+    fetch.add_argument('--chunk-size', type=int, default=50,
+                       help="number of anime whose characters/reviews are fetched per chunk in --stream mode")
+    fetch.set_defaults(handler=cmd_fetch)
+
+    redrive = commands.add_parser('redrive', parents=[run_options(), fetch_options()], help=cmd_redrive.__doc__)
+    redrive.add_argument('--async', dest='use_async', action='store_true',
+                         help="use the asyncio fetcher with a pooled HTTP session")
+    redrive.set_defaults(handler=cmd_redrive)
+
+    load_db = commands.add_parser('load-db', parents=[run_options(), load_options()], help=cmd_load_db.__doc__)
+    load_db.set_defaults(handler=cmd_load_db, load_db=True)
+
+    export = commands.add_parser('export', parents=[run_options(), export_options()], help=cmd_export.__doc__)
+    export.add_argument('--parquet', action='store_true', help="write the CSVs as Parquet datasets under parquet/")
+    export.set_defaults(handler=cmd_export)
+    return parser, commands.choices
+
+
+# Function to use the config file's settings as the defaults of each subcommand
+def apply_config(parser, subparsers, path):
+    config = load_config(path)
+    sections = config.get('command', {})
+    shared = {key.replace('-', '_'): value for key, value in config.items() if key != 'command'}
+    known = {name: {action.dest for action in subparser._actions} for name, subparser in subparsers.items()}
+    # A shared setting only has to mean something to one of the subcommands
+    for key in shared:
+        if not any(key in dests for dests in known.values()):
+            parser.error(f"{path}: unknown setting '{key}'")
+    for name, settings in sections.items():
+        if name not in subparsers:
+            parser.error(f"{path}: unknown subcommand [command.{name}]")
+        for key in settings:
+            if key.replace('-', '_') not in known[name]:
+                parser.error(f"{path}: unknown setting '{key}' in [command.{name}]")
+    for name, subparser in subparsers.items():
+        settings = dict(shared, **{key.replace('-', '_'): value for key, value in sections.get(name, {}).items()})
+        subparser.set_defaults(**{key: value for key, value in settings.items() if key in known[name]})
+
+
+def main(argv=None):
+    parser, subparsers = build_parser()
+    argv = sys.argv[1:] if argv is None else argv
+    config_path = parser.parse_known_args(argv)[0].config
+    if config_path is None and os.path.exists(DEFAULT_CONFIG):
+        config_path = DEFAULT_CONFIG
+    if config_path is not None:
+        apply_config(parser, subparsers, config_path)
+    args = parser.parse_args(argv)
+    if args.years is None or args.seasons is None:
+        year, season = current_season()
+        args.years = args.years or [year]
+        args.seasons = args.seasons or [season]
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
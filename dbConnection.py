@@ -1,19 +1,43 @@
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+import io
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from dbSchema import TABLES, TABLE_KEYS, INDEXES
+from metrics import Metrics
 
 # Load environment variables from a .env file
 load_dotenv()
 
 class DBConnection:
-    def __init__(self):
+    def __init__(self, min_connections=1, max_connections=5, acquire_timeout=30, health_check=True, metrics=None):
         self.dbname = os.getenv("DB_NAME")
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
         self.host = os.getenv("DB_HOST")
         self.port = os.getenv("DB_PORT")
+        # Connections are pooled and shared by every method (and every worker thread) of this object
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        # ThreadedConnectionPool fails immediately when exhausted, the semaphore makes callers wait instead
+        self.slots = threading.BoundedSemaphore(max_connections)
+        # Time spent writing and rows written per table end up in this metrics.Metrics
+        self.metrics = metrics if metrics is not None else Metrics()
 
-    # Function to connect to the database
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Function to open a standalone connection outside the pool
     def connect_to_db(self):
         try:
             conn = psycopg2.connect(dbname=self.dbname, user=self.user, password=self.password, host=self.host, port=self.port)
@@ -23,13 +47,94 @@ class DBConnection:
             print(f"Error connecting to database: {e}")
             return None
     
-    # Function to insert data into a table, avoiding duplicate records
-    def insert_data(self, table_name, data):
-        """Insert data into the database, avoiding duplicates."""
-        conn = self.connect_to_db()
+    # Function to create the connection pool on first use
+    def _get_pool(self):
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(self.min_connections, self.max_connections,
+                                                   dbname=self.dbname, user=self.user, password=self.password,
+                                                   host=self.host, port=self.port)
+                print("Connection pool created.")
+            return self.pool
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Check that a pooled connection is still usable."""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # Function to borrow a healthy connection from the pool
+    def acquire(self):
+        """Borrow a pooled connection, waiting up to acquire_timeout seconds; returns None on failure."""
+        if not self.slots.acquire(timeout=self.acquire_timeout):
+            print(f"Error connecting to database: no free connection after {self.acquire_timeout}s")
+            return None
+        try:
+            pool = self._get_pool()
+            # A connection the server dropped is discarded and replaced once
+            for attempt in range(2):
+                conn = pool.getconn()
+                if not self.health_check or self._is_healthy(conn):
+                    return conn
+                pool.putconn(conn, close=True)
+            raise PoolError("no healthy connection available")
+        except psycopg2.Error as e:
+            self.slots.release()
+            print(f"Error connecting to database: {e}")
+            return None
+
+    # Function to give a borrowed connection back to the pool
+    def release(self, conn):
         if conn is None:
             return
+        try:
+            # The pool rolls back any transaction left open and drops broken connections
+            self.pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with block."""
+        conn = self.acquire()
+        if conn is None:
+            raise PoolError("Could not get a database connection")
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every pooled connection."""
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+
+    # Function to insert data into a table, avoiding duplicate records
+    def insert_data(self, table_name, data, bulk=False, batch_size=5000):
+        """Insert data into the database, avoiding duplicates.
+
+        With bulk=True the rows are loaded through COPY and merged with ON CONFLICT,
+        which also updates rows whose values (score, members, ...) have changed.
+        Returns the number of rows written, or None if the insert failed.
+        """
+        if bulk:
+            # The anime DataFrame calls the key anime_id, the table calls it mal_id
+            return self.bulk_upsert(table_name, data.rename(columns={'anime_id': 'mal_id'}), batch_size=batch_size)
+        conn = self.acquire()
+        if conn is None:
+            return None
         
+        written = None
+        start = time.perf_counter()
         try:
             with conn.cursor() as cur:
                 for index, row in data.iterrows():
@@ -49,18 +154,93 @@ class DBConnection:
                 # Commit the changes only once after the loop
                 conn.commit()
                 print("Data insertion complete.")
+                self.metrics.add_rows(table_name, len(data), time.perf_counter() - start)
+                written = len(data)
         except psycopg2.Error as e:
             print(f"Error inserting data: {e}")
             conn.rollback()
         finally:
-            conn.close()
+            self.metrics.add_time('db_write', time.perf_counter() - start)
+            self.release(conn)
+        return written
+
+    # Function to bulk load data through COPY into a staging table and merge it with ON CONFLICT
+    def bulk_upsert(self, table_name, data, conflict_columns=('mal_id',), batch_size=5000):
+        """Insert new rows and update changed ones, COPYing batch_size rows at a time.
+
+        Returns the number of rows merged, or None if nothing was loaded (no connection or a database error).
+        """
+        conn = self.acquire()
+        if conn is None:
+            return None
+
+        # ON CONFLICT cannot touch the same row twice in one statement, so keep the last copy of each key
+        data = data.drop_duplicates(subset=list(conflict_columns), keep='last')
+        columns = list(data.columns)
+        column_list = ', '.join(columns)
+        staging = f"{table_name}_staging"
+        conflict = ', '.join(conflict_columns)
+        value_columns = [c for c in columns if c not in conflict_columns]
+        if value_columns:
+            updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in value_columns)
+            # Only rewrite rows whose values actually changed
+            changed = ' OR '.join(f"{table_name}.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in value_columns)
+            on_conflict = f"DO UPDATE SET {updates} WHERE {changed}"
+        else:
+            on_conflict = "DO NOTHING"
+        merge_query = f"""
+            INSERT INTO {table_name} ({column_list})
+            SELECT {column_list} FROM {staging}
+            ON CONFLICT ({conflict}) {on_conflict}
+        """
+
+        merged = 0
+        start = time.perf_counter()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE TEMP TABLE {staging} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP;")
+                for offset in range(0, len(data), batch_size):
+                    batch = self._copy_ready(data.iloc[offset:offset + batch_size])
+                    buffer = io.StringIO()
+                    batch.to_csv(buffer, index=False, header=False)
+                    buffer.seek(0)
+                    cur.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+                    cur.execute(merge_query)
+                    merged += cur.rowcount
+                    cur.execute(f"TRUNCATE {staging};")
+            # Commit the changes only once after every batch is merged
+            conn.commit()
+            elapsed = time.perf_counter() - start
+            rate = len(data) / elapsed if elapsed > 0 else 0.0
+            print(f"Bulk upsert into {table_name}: {len(data)} rows in {elapsed:.2f}s ({rate:.0f} rows/s), "
+                  f"{merged} inserted or updated.")
+            self.metrics.add_rows(table_name, len(data), elapsed)
+        except psycopg2.Error as e:
+            print(f"Error bulk loading data: {e}")
+            conn.rollback()
+            merged = None
+        finally:
+            self.metrics.add_time('db_write', time.perf_counter() - start)
+            self.release(conn)
+        return merged
+
+    @staticmethod
+    def _copy_ready(batch):
+        """Write integral float columns (ints that pandas widened because of nulls) without the '.0'."""
+        batch = batch.copy()
+        for column in batch.select_dtypes(include='float').columns:
+            values = batch[column].dropna()
+            if (values == values.round()).all():
+                batch[column] = batch[column].astype('Int64')
+        return batch
 
     # Function to create a table
     def create_table(self, table_name):
-        conn = self.connect_to_db()
+        conn = self.acquire()
         if conn is None:
-            return
+            return False
         
+        created = False
         try:
             with conn.cursor() as cur:
                 create_table_query = f"""
@@ -89,8 +269,79 @@ class DBConnection:
                 cur.execute(f"CREATE INDEX IF NOT EXISTS idx_mal_id ON {table_name}(mal_id);")
                 print(f"Table {table_name} created successfully with indexing.")
             conn.commit()
+            created = True
         except psycopg2.Error as e:
             print(f"Error creating table: {e}")
             conn.rollback()
         finally:
-            conn.close()
+            self.release(conn)
+        return created
+
+    # Function to create the character, voice actor and review tables next to the anime table
+    def create_schema(self, anime_table="anime_data"):
+        """Create the anime table and the normalized tables that reference it, with their indexes.
+
+        Returns whether every table exists afterwards.
+        """
+        if not self.create_table(anime_table):
+            return False
+        conn = self.acquire()
+        if conn is None:
+            return False
+
+        created = False
+        try:
+            with conn.cursor() as cur:
+                for table_name, create_table_query in TABLES.items():
+                    cur.execute(create_table_query.format(anime_table=anime_table))
+                for index_query in INDEXES:
+                    cur.execute(index_query)
+                print(f"Tables {', '.join(TABLES)} created successfully with indexing.")
+            conn.commit()
+            created = True
+        except psycopg2.Error as e:
+            print(f"Error creating schema: {e}")
+            conn.rollback()
+        finally:
+            self.release(conn)
+        return created
+
+    # Function to load extract_character_info output into characters and anime_characters
+    def load_characters(self, character_data, batch_size=5000):
+        """Upsert the characters and their role in each anime; returns whether both tables were loaded."""
+        character_data = character_data.dropna(subset=['anime_id', 'character_id'])
+        characters = character_data[['character_id', 'name', 'favorites']]
+        roles = character_data[['anime_id', 'character_id', 'role']]
+        # The roles reference the characters, so they are not loaded if the characters failed
+        return (self.bulk_upsert('characters', characters, TABLE_KEYS['characters'], batch_size) is not None and
+                self.bulk_upsert('anime_characters', roles, TABLE_KEYS['anime_characters'], batch_size) is not None)
+
+    # Function to load extract_VA_info output into voice_actors and character_voice_actors
+    def load_voice_actors(self, va_data, batch_size=5000):
+        """Upsert the voice actors and which characters they voice; returns whether both tables were loaded."""
+        va_data = va_data.dropna(subset=['character_id', 'voice_actor_id'])
+        voice_actors = va_data[['voice_actor_id', 'voice_actor_name']].rename(columns={'voice_actor_name': 'name'})
+        links = va_data[['character_id', 'voice_actor_id', 'voice_actor_language']].rename(
+            columns={'voice_actor_language': 'language'})
+        return (self.bulk_upsert('voice_actors', voice_actors, TABLE_KEYS['voice_actors'], batch_size) is not None and
+                self.bulk_upsert('character_voice_actors', links, TABLE_KEYS['character_voice_actors'],
+                                 batch_size) is not None)
+
+    # Function to load extract_reviews_info output into reviews
+    def load_reviews(self, reviews_data, batch_size=5000):
+        """Upsert the reviews; the first tag of each review is stored as tag. Returns whether they were loaded."""
+        reviews = reviews_data.dropna(subset=['review_id']).rename(columns={'tags': 'tag'})
+        return self.bulk_upsert('reviews', reviews, TABLE_KEYS['reviews'], batch_size) is not None
+
+    # Function to load every extracted dataset, parents before the tables that reference them
+    def load_all(self, anime_data, character_data, va_data, reviews_data, anime_table="anime_data", batch_size=5000):
+        """Load anime, characters, voice actors and reviews in foreign-key order.
+
+        Returns True only if every table was loaded; it stops at the first table that fails, since the
+        tables after it reference its rows.
+        """
+        if self.insert_data(anime_table, anime_data, bulk=True, batch_size=batch_size) is None:
+            return False
+        return (self.load_characters(character_data, batch_size) and
+                self.load_voice_actors(va_data, batch_size) and
+                self.load_reviews(reviews_data, batch_size))
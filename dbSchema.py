@@ -0,0 +1,63 @@
+# Table definitions for the normalized character, voice actor and review data.
+# Every anime reference points at the anime table's mal_id; {anime_table} is filled in by
+# DBConnection.create_schema. Tables are listed parents first so foreign keys always resolve.
+
+TABLES = {
+    'characters': """
+        CREATE TABLE IF NOT EXISTS characters (
+            character_id BIGINT PRIMARY KEY,
+            name VARCHAR(255),
+            favorites BIGINT
+        );
+    """,
+    'anime_characters': """
+        CREATE TABLE IF NOT EXISTS anime_characters (
+            anime_id BIGINT NOT NULL REFERENCES {anime_table}(mal_id) ON DELETE CASCADE,
+            character_id BIGINT NOT NULL REFERENCES characters(character_id) ON DELETE CASCADE,
+            role VARCHAR(50),
+            PRIMARY KEY (anime_id, character_id)
+        );
+    """,
+    'voice_actors': """
+        CREATE TABLE IF NOT EXISTS voice_actors (
+            voice_actor_id BIGINT PRIMARY KEY,
+            name VARCHAR(255)
+        );
+    """,
+    'character_voice_actors': """
+        CREATE TABLE IF NOT EXISTS character_voice_actors (
+            character_id BIGINT NOT NULL REFERENCES characters(character_id) ON DELETE CASCADE,
+            voice_actor_id BIGINT NOT NULL REFERENCES voice_actors(voice_actor_id) ON DELETE CASCADE,
+            language VARCHAR(50),
+            PRIMARY KEY (character_id, voice_actor_id)
+        );
+    """,
+    'reviews': """
+        CREATE TABLE IF NOT EXISTS reviews (
+            review_id BIGINT PRIMARY KEY,
+            anime_id BIGINT NOT NULL REFERENCES {anime_table}(mal_id) ON DELETE CASCADE,
+            score FLOAT,
+            is_spoiler BOOLEAN,
+            is_preliminary BOOLEAN,
+            episodes_watched BIGINT,
+            tag VARCHAR(50),
+            review_text TEXT
+        );
+    """,
+}
+
+# The primary key of each table doubles as the ON CONFLICT target of its loader
+TABLE_KEYS = {
+    'characters': ('character_id',),
+    'anime_characters': ('anime_id', 'character_id'),
+    'voice_actors': ('voice_actor_id',),
+    'character_voice_actors': ('character_id', 'voice_actor_id'),
+    'reviews': ('review_id',),
+}
+
+# Composite primary keys only index their leading column, so the join columns get their own indexes
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_anime_characters_character_id ON anime_characters(character_id);",
+    "CREATE INDEX IF NOT EXISTS idx_character_voice_actors_voice_actor_id ON character_voice_actors(voice_actor_id);",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_anime_id ON reviews(anime_id);",
+]
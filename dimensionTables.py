@@ -0,0 +1,131 @@
+import pandas as pd
+
+# Names and languages are stored once per id; the fact tables only hold integer keys and categoricals.
+# MAL ids fit in 32 bits, so keys are stored as (nullable) int32.
+ID_DTYPE = 'int32'
+NULLABLE_ID_DTYPE = 'Int32'
+NAME_DTYPE = 'string'
+
+
+class CastTables:
+    def __init__(self):
+        """Deduplicated characters and voice actors with integer-keyed fact tables.
+
+        characters:             character_id -> name
+        voice_actors:           voice_actor_id -> name
+        anime_characters:       (anime_id, character_id, role, favorites)
+        character_voice_actors: (character_id, voice_actor_id, language)
+
+        The fact tables keep the row order of extract_character_info/extract_VA_info, so
+        to_character_info() and to_va_info() give the flat frames back. favorites stays on the fact
+        rows, since a character shared by two anime can be fetched at different counts.
+        """
+        self.characters = pd.DataFrame({'name': pd.Series(dtype=NAME_DTYPE)},
+                                       index=pd.Index([], dtype=ID_DTYPE, name='character_id'))
+        self.voice_actors = pd.DataFrame({'name': pd.Series(dtype=NAME_DTYPE)},
+                                         index=pd.Index([], dtype=ID_DTYPE, name='voice_actor_id'))
+        self.anime_characters = pd.DataFrame({
+            'anime_id': pd.Series(dtype=NULLABLE_ID_DTYPE),
+            'character_id': pd.Series(dtype=NULLABLE_ID_DTYPE),
+            'role': pd.Series(dtype='category'),
+            'favorites': pd.Series(dtype=NULLABLE_ID_DTYPE),
+        })
+        self.character_voice_actors = pd.DataFrame({
+            'character_id': pd.Series(dtype=NULLABLE_ID_DTYPE),
+            'voice_actor_id': pd.Series(dtype=NULLABLE_ID_DTYPE),
+            'language': pd.Series(dtype='category'),
+        })
+        # Whether favorites came in as floats (read back from a CSV written with nulls): the flat frame
+        # is rebuilt with the same dtype, so its CSV has 5.0 where the source had 5.0 and 5 where it had 5
+        self.float_favorites = False
+
+    @classmethod
+    def from_extracted(cls, character_info, va_info):
+        """Build the tables from extract_character_info and extract_VA_info output."""
+        tables = cls()
+        tables.add(character_info, va_info)
+        return tables
+
+    # Function to intern one more chunk (a season, a streaming chunk) into the tables
+    def add(self, character_info, va_info):
+        """Add extracted rows; a character or voice actor seen again keeps its latest name."""
+        characters = character_info.dropna(subset=['character_id'])
+        characters = pd.DataFrame({'name': characters['name'].astype(NAME_DTYPE).to_numpy()}, index=pd.Index(characters['character_id'].astype(ID_DTYPE), name='character_id'))
+        self.characters = _merge_dimension(self.characters, characters)
+
+        voiced = va_info.dropna(subset=['voice_actor_id'])
+        voice_actors = pd.DataFrame({'name': voiced['voice_actor_name'].astype(NAME_DTYPE).to_numpy()},
+                                    index=pd.Index(voiced['voice_actor_id'].astype(ID_DTYPE), name='voice_actor_id'))
+        self.voice_actors = _merge_dimension(self.voice_actors, voice_actors)
+
+        self.float_favorites = self.float_favorites or pd.api.types.is_float_dtype(character_info['favorites'])
+        self.anime_characters = _append_facts(self.anime_characters, pd.DataFrame({
+            'anime_id': character_info['anime_id'].astype(NULLABLE_ID_DTYPE).array,
+            'character_id': character_info['character_id'].astype(NULLABLE_ID_DTYPE).array,
+            'role': character_info['role'].to_numpy(),
+            'favorites': character_info['favorites'].astype(NULLABLE_ID_DTYPE).array,
+        }), 'role')
+        self.character_voice_actors = _append_facts(self.character_voice_actors, pd.DataFrame({
+            'character_id': va_info['character_id'].astype(NULLABLE_ID_DTYPE).array,
+            'voice_actor_id': va_info['voice_actor_id'].astype(NULLABLE_ID_DTYPE).array,
+            'language': va_info['voice_actor_language'].to_numpy(),
+        }), 'language')
+        return self
+
+    # Function to rebuild the flat frame extract_character_info returns
+    def to_character_info(self):
+        facts = self.anime_characters
+        positions = _positions(self.characters, facts['character_id'])
+        favorites = facts['favorites']
+        # Integers as extract_character_info gives them, unless the source was float or nulls widen them
+        if self.float_favorites or favorites.isna().any():
+            favorites = favorites.astype('float64')
+        else:
+            favorites = favorites.astype('int64')
+        return pd.DataFrame({
+            'anime_id': facts['anime_id'].astype('Int64').to_numpy(),
+            'character_id': facts['character_id'].astype('Int64').to_numpy(),
+            'name': _take(self.characters['name'], positions),
+            'role': facts['role'].astype(object).to_numpy(),
+            'favorites': favorites.to_numpy(),
+        })
+
+    # Function to rebuild the flat frame extract_VA_info returns
+    def to_va_info(self):
+        facts = self.character_voice_actors
+        positions = _positions(self.voice_actors, facts['voice_actor_id'])
+        return pd.DataFrame({
+            'character_id': facts['character_id'].astype('Int64').to_numpy(),
+            'voice_actor_id': pd.array(facts['voice_actor_id'], dtype='Int64'),
+            'voice_actor_name': _take(self.voice_actors['name'], positions),
+            'voice_actor_language': facts['language'].astype(object).to_numpy(),
+        })
+
+    def memory_usage(self):
+        """Return the deep memory footprint in bytes of every table."""
+        return {name: int(getattr(self, name).memory_usage(deep=True, index=True).sum())
+                for name in ('characters', 'voice_actors', 'anime_characters', 'character_voice_actors')}
+
+
+def _positions(dimension, keys):
+    """Row of the dimension holding each key, -1 for null or unknown keys."""
+    return dimension.index.get_indexer(keys.astype('Int64').fillna(-1).astype('int64'))
+
+
+def _take(column, positions):
+    values = column.to_numpy(dtype=object, na_value=None)[positions]
+    values[positions == -1] = None
+    return values
+
+
+def _merge_dimension(current, new):
+    combined = pd.concat([current, new])
+    return combined[~combined.index.duplicated(keep='last')]
+
+
+def _append_facts(current, new, category_column):
+    # Categories are unioned first, otherwise concat falls back to object strings
+    categories = current[category_column].cat.categories.union(pd.Index(new[category_column].dropna().unique()))
+    current = current.astype({category_column: pd.CategoricalDtype(categories)})
+    new = new.astype({category_column: pd.CategoricalDtype(categories)})
+    return pd.concat([current, new], ignore_index=True)
@@ -1,66 +1,214 @@
 from jikanpy import Jikan
+import numpy as np
 import pandas as pd
 import json
 import time
+from operator import itemgetter
 from jikanpy.exceptions import APIException
+from rateLimiter import RateLimiter, RequestScheduler
+from progress import ProgressReporter
+from retryPolicy import RetryPolicy, CircuitBreaker, DeadLetters
+from reviewStore import ReviewLimits, merge_reviews, take_reviews
+from metrics import Metrics, timed
+from dimensionTables import CastTables
+from requestCoalescer import RequestCoalescer
+
+JIKAN_BASE_URL = "https://api.jikan.moe/v4"
+
+# Columns of extract_anime_info, and the fields read around the joined genres column
+ANIME_COLUMNS = ['anime_id', 'title', 'title_english', 'synopsis', 'genres', 'status', 'score', 'scored_by',
+                 'type', 'source', 'episodes', 'popularity', 'members', 'rank', 'favorites', 'season', 'year']
+ANIME_HEAD_FIELDS = itemgetter('mal_id', 'title', 'title_english', 'synopsis')
+ANIME_TAIL_FIELDS = itemgetter('status', 'score', 'scored_by', 'type', 'source', 'episodes', 'popularity',
+                               'members', 'rank', 'favorites', 'season', 'year')
+
+# Columns of extract_reviews_info, extract_character_info and extract_VA_info
+REVIEW_COLUMNS = ['anime_id', 'review_id', 'score', 'is_spoiler', 'is_preliminary', 'episodes_watched', 'tags',
+                  'review_text']
+CHARACTER_COLUMNS = ['anime_id', 'character_id', 'name', 'role', 'favorites']
+VA_COLUMNS = ['character_id', 'voice_actor_id', 'voice_actor_name', 'voice_actor_language']
+
+# Function to build the APIException for an error response, keeping its Retry-After header
+def api_error(status, payload, endpoint, headers):
+    if headers.get('Retry-After') is not None:
+        return APIException(status, payload, endpoint=endpoint, retry_after=headers['Retry-After'])
+    return APIException(status, payload, endpoint=endpoint)
+
+# Function to list the pages left after `page` from a season response's pagination metadata
+def remaining_pages(response, page):
+    """Return the page numbers still to fetch, or None when the response has no pagination."""
+    pagination = response.get('pagination') or {}
+    if pagination.get('last_visible_page') is not None:
+        return list(range(page + 1, pagination['last_visible_page'] + 1))
+    if pagination.get('has_next_page') is False:
+        return []
+    return None
 
 class AnimeFetcher:
-    def __init__(self, year, season):
-        self.jikan = Jikan()
+    def __init__(self, year, season, rate_limiter=None, max_workers=3, base_url=None, cache=None, checkpoint=None,
+                 retry_policy=None, dead_letters=None, review_limits=None, review_store=None, metrics=None,
+                 archive=None, replay=None, coalescer=None):
+        # base_url can point at a local stub server (see stubJikanServer.py) instead of the live API
+        self.jikan = Jikan(selected_base=base_url or JIKAN_BASE_URL)
         self.year = year
         self.season = season
         self.anime_data = None
         self.character_data = None
         self.reviews_data = None
+        # One limiter shared by every request this fetcher makes
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.scheduler = RequestScheduler(self.rate_limiter, max_workers=max_workers)
+        # Optional responseCache.ResponseCache; None always goes to the network
+        self.cache = cache
+        # Optional checkpoint.CheckpointJournal used to resume character/review fetches
+        self.checkpoint = checkpoint
+        # Failed requests are retried with backoff; a burst of failures pauses the shared limiter
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breaker = CircuitBreaker(self.rate_limiter)
+        # Ids that still failed after every retry, see redrive_dead_letters
+        self.dead_letters = dead_letters if dead_letters is not None else DeadLetters()
+        # How many review pages/reviews to read per anime (reviewStore.ReviewLimits, no caps by default)
+        self.review_limits = review_limits if review_limits is not None else ReviewLimits()
+        # Optional reviewStore.ReviewTextStore; review bodies then live on disk instead of in reviews_data
+        self.review_store = review_store
+        # Latency, status codes and time per phase; pass one Metrics to the fetcher and DBConnection
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.metrics.watch(self.rate_limiter, cache)
+        # Optional payloadArchive.PayloadArchive recording every response fetched from the API
+        self.archive = archive
+        # Optional payloadArchive.PayloadArchive answering every request instead of the network
+        self.replay = replay
+        # Identical requests of the run (an anime in two seasons, a re-driven id) share one call
+        self.coalescer = coalescer if coalescer is not None else RequestCoalescer()
+        self.metrics.watch(coalescer=self.coalescer)
+
+    # Function to request an endpoint, sharing the call with identical requests in flight or already answered
+    def _request(self, endpoint, params=None):
+        """Request an endpoint such as 'anime/1/characters' and return the decoded JSON."""
+        return self.coalescer.call(endpoint, params, lambda: self._request_with_retries(endpoint, params))
+
+    # Function to send a request, retrying 429s, 5xx and connection errors with backoff
+    def _request_with_retries(self, endpoint, params=None):
+        if self.replay is not None:
+            # Replays skip the rate limit: nothing goes over the network
+            return self.replay.replay(endpoint, params)
+        attempt = 1
+        while True:
+            try:
+                return self._send(endpoint, params)
+            except Exception as e:
+                if not self.retry_policy.is_retryable(e):
+                    raise
+                self.circuit_breaker.record_failure(e)
+                if attempt >= self.retry_policy.max_attempts:
+                    raise
+                delay = self.retry_policy.delay(attempt, e)
+                print(f"Retrying {endpoint} in {delay:.1f}s (attempt {attempt} failed: {e})")
+                self.retry_policy.record_retry()
+                time.sleep(delay)
+                attempt += 1
+
+    # Function to send one GET request to the Jikan API within the rate budget
+    def _send(self, endpoint, params=None):
+        """Send a single request, answered from the cache when possible."""
+        entry = self.cache.lookup(endpoint, params) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            # Archived like a network response, so a replay of this run has every response it used
+            if self.archive is not None:
+                self.archive.record(endpoint, params, entry.payload)
+            return entry.payload
+        # A stale entry is revalidated with its ETag/Last-Modified instead of re-downloaded
+        headers = self.cache.conditional_headers(entry) if entry is not None else None
+        self.rate_limiter.acquire()
+        url = f"{self.jikan.base}/{endpoint}"
+        start = time.perf_counter()
+        response = self.jikan.session.get(url, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.metrics.observe_request(endpoint, response.status_code, time.perf_counter() - start)
+            self.cache.revalidate(endpoint, params, response.headers)
+            self.circuit_breaker.record_success()
+            if self.archive is not None:
+                self.archive.record(endpoint, params, entry.payload)
+            return entry.payload
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {'error': response.text}
+        self.metrics.observe_request(endpoint, response.status_code, time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise api_error(response.status_code, payload, endpoint, response.headers)
+        self.circuit_breaker.record_success()
+        if self.cache is not None:
+            self.cache.store(endpoint, params, payload, response.headers)
+        if self.archive is not None:
+            self.archive.record(endpoint, params, payload)
+        return payload
+
+    # Function to fetch one page of a season; it touches no fetcher state, so pages can be fetched in parallel
+    def fetch_season_page(self, year, season, page):
+        """Return the raw response (data and pagination) of one page of a season."""
+        return self._request(f"seasons/{year}/{season}", params={'page': page})
+
+    # Function to fetch one season page, dead-lettering it if it still fails after every retry
+    def _season_page_or_none(self, year, season, page):
+        try:
+            anime_data = self.fetch_season_page(year, season, page)
+        except (APIException, OSError) as e:
+            # Retries are exhausted; keep the page so redrive_dead_letters can fetch it again
+            print(f"Error fetching data from page {page}: {e}")
+            self.dead_letters.add('seasons', (year, season, page), e)
+            return None
+        self.dead_letters.discard('seasons', (year, season, page))
+        return anime_data
+
+    # Function to yield the anime records of a season one page at a time
+    def iter_season_pages(self, year, season, first_page=1, last_page=None):
+        """Yield the list of anime records of every page of a season, starting at first_page.
+
+        The first response's pagination tells how many pages there are, so the others are fetched
+        concurrently on the scheduler and no request is spent on the empty page past the end.
+        """
+        page = first_page
+        while last_page is None or page <= last_page:
+            anime_data = self._season_page_or_none(year, season, page)
+            if anime_data is None or not anime_data['data']:
+                break  # Stop if the page failed or there are no more anime data
+            print(f"Fetched data from page {page}")
+            yield anime_data['data']
+            pages = remaining_pages(anime_data, page)
+            if pages is None:
+                page += 1  # No pagination metadata, move to the next page
+                continue
+            if last_page is not None:
+                pages = [p for p in pages if p <= last_page]
+            # A failed page is dead-lettered and skipped, the pages after it are still known
+            for page, anime_data in self.scheduler.map(lambda p: self._season_page_or_none(year, season, p), pages):
+                if anime_data is not None and anime_data['data']:
+                    print(f"Fetched data from page {page}")
+                    yield anime_data['data']
+            break
 
     #fetch anime data perseason for every page of that season
     def fetch_anime_data_per_season(self):
         """Fetch anime data for a specific season and year from the Jikan API."""
-        page = 1
         all_anime_data = []  # List to hold all anime data from multiple pages
-        while True:
-            try:
-                anime_data = self.jikan.seasons(year=self.year, season=self.season, page=page)
-                if not anime_data['data']:
-                    break  # Stop if there are no more anime data
-                all_anime_data.extend(anime_data['data'])  # Collect all data
-                print(f"Fetched data from page {page}")
-                # Add a delay of 1 seconds before fetching the next page
-                time.sleep(0.8)
-                page += 1  # Move to the next page
-            except Exception as e:
-                print(f"Error fetching data from page {page}: {e}")
-                break  # Exit if there's an error
-            #print the total number of anime data fetched
+        for page_data in self.iter_season_pages(self.year, self.season):
+            all_anime_data.extend(page_data)  # Collect all data
+        #print the total number of anime data fetched
         print(f"Total anime data fetched: {len(all_anime_data)}")
         self.anime_data = {'data': all_anime_data}  # Set the anime_data attribute
 
-    def extract_anime_info(self):
+    @timed('extraction')
+    def extract_anime_info(self, anime_data=None):
         """Extract relevant anime information into a DataFrame."""
-        anime_list = []
-        for anime in self.anime_data['data']:
-            genres = ', '.join([genre['name'] for genre in anime['genres']])
-            anime_list.append({
-                'anime_id': anime['mal_id'],
-                'title': anime['title'],
-                'title_english': anime['title_english'],
-                'synopsis': anime['synopsis'],
-                'genres': genres,
-                'status': anime['status'],
-                'score': anime['score'],
-                'scored_by': anime['scored_by'],
-                'type': anime['type'],
-                'source': anime['source'],
-                'episodes': anime['episodes'],
-                'popularity': anime['popularity'],
-                'members': anime['members'],
-                'rank': anime['rank'],
-                'favorites': anime['favorites'],
-                'season': anime['season'],
-                'year': anime['year']
-            })
-        # Create a DataFrame from the list of dictionaries
-        anime_df = pd.DataFrame(anime_list)
+        anime_data = anime_data if anime_data is not None else self.anime_data
+        # One pass over the records pulls every field into a row tuple, in ANIME_COLUMNS order
+        anime_rows = [
+            (*ANIME_HEAD_FIELDS(anime), ', '.join([genre['name'] for genre in anime['genres']]), *ANIME_TAIL_FIELDS(anime))
+            for anime in anime_data['data']
+        ]
+        # Create a DataFrame from the row tuples
+        anime_df = pd.DataFrame(anime_rows, columns=ANIME_COLUMNS)
         return anime_df
     
     
@@ -68,7 +216,7 @@ class AnimeFetcher:
     #make a function to Fetch anime data for multiple year and season
     def fetch_anime_data_multiple_seasons(self, years, seasons):
         """Fetch anime data for multiple years and seasons and save it to CSV."""
-        all_anime_data = pd.DataFrame()  # Initialize an empty DataFrame to hold all seasons' data
+        all_records = []  # Raw anime records of every season, turned into a DataFrame once at the end
 
         for y in years:
             for s in seasons:
@@ -76,12 +224,19 @@ class AnimeFetcher:
                 self.year = y
                 self.season = s
                 self.fetch_anime_data_per_season()
-                # Extract anime info for this season
-                anime_df = self.extract_anime_info()
-                # Check if anime_df is not empty before concatenating
-                if not anime_df.empty:
-                    all_anime_data = pd.concat([all_anime_data, anime_df], ignore_index=True)
-                # time.sleep(1)  # Pause for 3 seconds between requests
+                all_records.extend(self.anime_data['data'])
+        # Extract anime info for all seasons in one pass
+        self.anime_data = {'data': all_records}
+        all_anime_data = self.extract_anime_info()
+        all_anime_data = self._finalize_anime_data(all_anime_data)
+        self.anime_data = all_anime_data
+        print("All season data fetched.")
+        print("total data fetched: ", len(self.anime_data))
+        return all_anime_data
+
+    # Function to fix the dtypes of the combined anime data of all seasons
+    def _finalize_anime_data(self, all_anime_data):
+        """Normalize nulls and integer columns of the combined anime DataFrame."""
         # Turn NaN and null values into 0
         all_anime_data = all_anime_data.fillna(0)
         # Change the data type of specific columns from float to int
@@ -92,9 +247,6 @@ class AnimeFetcher:
         })
         # Change the 0 value to null value
         all_anime_data = all_anime_data.replace(0, None)
-        self.anime_data = all_anime_data
-        print("All season data fetched.")
-        print("total data fetched: ", len(self.anime_data))
         return all_anime_data
     
     def fecth_character_data(self, mal_id):
@@ -102,126 +254,250 @@ class AnimeFetcher:
         #create a dataframe to hold the character data
         #insert the mal_id into the dataframe
         try:
-            character_data = self.jikan.anime(mal_id, extension='characters')
-            time.sleep(0.8)  # Add a delay of 1 second before fetching the next character data
-            return character_data['data']
-        except APIException as e:
+            character_data = self._request(f"anime/{mal_id}/characters")
+        except (APIException, OSError) as e:
             print(f"Error fetching character data for {mal_id}: {e}")
+            self.dead_letters.add('characters', mal_id, e)
             return None
+        self.dead_letters.discard('characters', mal_id)
+        return character_data['data']
     
-    def fetch_all_character_data(self, mal_ids):
+    def fetch_all_character_data(self, mal_ids, refresh_ids=None):
         """Fetch character data for multiple anime using the Jikan API."""
-        all_character_data = pd.DataFrame()  # Initialize an empty DataFrame to hold all character data
-        data_fetched = 0
-        for mal_id in mal_ids:
-            character_data = self.fecth_character_data(mal_id)
-            data_fetched += 1
-            print(f"Fetched character data {data_fetched} out of {len(self.anime_data)}")
-            if character_data is not None:
-                character_df = pd.DataFrame(character_data)
-                character_df['mal_id'] = mal_id
-                all_character_data = pd.concat([all_character_data, character_df], ignore_index=True)
+        results = self._fetch_resource('characters', self.fecth_character_data, mal_ids, refresh_ids)
+        all_character_data = self._collect_resource(results, 'mal_id')
         self.character_data = all_character_data   
         return all_character_data
 
     def fetch_reviews_data(self, mal_id):
-        """Fetch reviews data for a specific anime using the Jikan API."""
+        """Fetch reviews data for a specific anime using the Jikan API, page by page within self.review_limits."""
+        reviews = []
+        page = 1
         try:
-            reviews_data = self.jikan.anime(mal_id, extension='reviews')
-            time.sleep(0.8)  # Add a delay of 1 second before fetching the next reviews data
-            return reviews_data['data']
-        except APIException as e:
+            while True:
+                reviews_data = self._request(f"anime/{mal_id}/reviews", params={'page': page} if page > 1 else None)
+                if not take_reviews(reviews, reviews_data, page, self.review_limits, self.review_store):
+                    break
+                page += 1
+        except (APIException, OSError) as e:
+            # A partly fetched anime is dropped as a whole, re-driving it starts from page 1
             print(f"Error fetching reviews data for {mal_id}: {e}")
+            self.dead_letters.add('reviews', mal_id, e)
             return None
+        self.dead_letters.discard('reviews', mal_id)
+        return self._with_journaled_reviews(mal_id, reviews)
+
+    # Function to keep the reviews older than review_limits.since that an earlier run journaled
+    def _with_journaled_reviews(self, mal_id, reviews):
+        """Merge freshly fetched reviews with the journaled ones of the same anime, keyed by review id."""
+        if self.review_limits.since is None or self.checkpoint is None:
+            return reviews
+        previous = self.checkpoint.results('reviews', [mal_id])
+        return merge_reviews(reviews, previous[0][1] if previous else [])
         
-    def fetch_all_reviews_data(self, mal_ids):
+    def fetch_all_reviews_data(self, mal_ids, refresh_ids=None):
         """Fetch reviews data for multiple anime using the Jikan API."""
-        all_reviews_data = pd.DataFrame()
-        data_fetched = 0
-        for mal_id in mal_ids:
-            reviews_data = self.fetch_reviews_data(mal_id)
-            data_fetched += 1
-            print(f"Fetched reviews data {data_fetched} out of {len(self.anime_data)}")
-            if reviews_data is not None:
-                reviews_df = pd.DataFrame(reviews_data)
-                reviews_df['anime_id'] = mal_id
-                all_reviews_data = pd.concat([all_reviews_data, reviews_df], ignore_index=True)
+        results = self._fetch_resource('reviews', self.fetch_reviews_data, mal_ids, refresh_ids)
+        all_reviews_data = self._collect_resource(results, 'anime_id')
         self.reviews_data = all_reviews_data
         return all_reviews_data
+
+    # Function to retry everything in the dead-letter list
+    def redrive_dead_letters(self):
+        """Fetch the dead-lettered season pages, characters and reviews again.
+
+        Returns {'anime': ..., 'characters': ..., 'reviews': ...} with what was recovered, in the same
+        form as fetch_anime_data_multiple_seasons and fetch_all_*_data; ids failing again stay listed.
+        """
+        records = []
+        for year, season, page in self.dead_letters.ids('seasons'):
+            # Only a failed first page leaves the rest of the season unknown
+            for page_data in self.iter_season_pages(year, season, first_page=page,
+                                                    last_page=None if page == 1 else page):
+                records.extend(page_data)
+        recovered = {'anime': self.extract_anime_info({'data': records})}
+        if records:
+            recovered['anime'] = self._finalize_anime_data(recovered['anime'])
+        # The ids are passed as refresh ids too: they are fetched whatever the journal holds
+        character_ids = self.dead_letters.ids('characters')
+        review_ids = self.dead_letters.ids('reviews')
+        recovered['characters'] = self._collect_resource(
+            self._fetch_resource('characters', self.fecth_character_data, character_ids, character_ids), 'mal_id')
+        recovered['reviews'] = self._collect_resource(
+            self._fetch_resource('reviews', self.fetch_reviews_data, review_ids, review_ids), 'anime_id')
+        return recovered
+
+    # Function to fetch one resource for every anime, resuming from the checkpoint journal if there is one
+    def _fetch_resource(self, resource, fetch_one, mal_ids, refresh_ids=None):
+        """Return (mal_id, records) pairs for mal_ids; refresh_ids are re-fetched even if journaled."""
+        mal_ids = list(mal_ids)
+        pending = mal_ids
+        if self.checkpoint is not None:
+            pending = self.checkpoint.pending(resource, mal_ids, refresh_ids)
+            print(f"Checkpoint: {len(mal_ids) - len(pending)} of {len(mal_ids)} anime already have {resource} data")
+        results = []
+        progress = ProgressReporter(f"Fetched {resource} data", len(pending))
+        # Requests run concurrently on the scheduler, results come back in input order
+        for mal_id, records in self.scheduler.map(fetch_one, pending):
+            progress.update()
+            if self.checkpoint is not None and records is not None:
+                self.checkpoint.record(resource, mal_id, records)
+            results.append((mal_id, records))
+        if self.checkpoint is not None:
+            return self.checkpoint.results(resource, mal_ids)
+        return results
+
+    # Function to combine the per-anime records of one resource into a single DataFrame
+    def _collect_resource(self, results, id_column):
+        """Build one DataFrame from (mal_id, records) pairs, tagging each row with the anime id."""
+        # Growing a DataFrame with pd.concat per anime copies everything fetched so far on every
+        # iteration, so the raw records are buffered in a list and materialized once instead.
+        all_records = []
+        anime_ids = []
+        for mal_id, records in results:
+            if records is not None:
+                all_records.extend(records)
+                anime_ids.extend([mal_id] * len(records))
+        all_data = pd.DataFrame(all_records)
+        if all_records:
+            all_data[id_column] = anime_ids
+        return all_data
+
+    # Function to fetch a resource chunk by chunk so only one chunk of raw records is in memory
+    def _iter_resource(self, resource, fetch_one, id_column, mal_ids, chunk_size, refresh_ids=None):
+        mal_ids = list(mal_ids)
+        for start in range(0, len(mal_ids), chunk_size):
+            chunk = mal_ids[start:start + chunk_size]
+            chunk_df = self._collect_resource(self._fetch_resource(resource, fetch_one, chunk, refresh_ids), id_column)
+            if not chunk_df.empty:
+                yield chunk_df
+
+    def iter_character_data(self, mal_ids, chunk_size=50, refresh_ids=None):
+        """Yield raw character DataFrames for mal_ids, chunk_size anime at a time."""
+        return self._iter_resource('characters', self.fecth_character_data, 'mal_id', mal_ids, chunk_size, refresh_ids)
+
+    def iter_reviews_data(self, mal_ids, chunk_size=50, refresh_ids=None):
+        """Yield raw review DataFrames for mal_ids, chunk_size anime at a time."""
+        return self._iter_resource('reviews', self.fetch_reviews_data, 'anime_id', mal_ids, chunk_size, refresh_ids)
     
-    def extract_reviews_info(self):
+    @timed('extraction')
+    def extract_reviews_info(self, reviews_data=None):
         """Extract relevant reviews information into a DataFrame, with 'tags' as individual values."""
-        
+        reviews_data = reviews_data if reviews_data is not None else self.reviews_data
+        if reviews_data.empty:
+            # No anime had reviews (or every fetch failed): nothing to extract
+            return pd.DataFrame(columns=REVIEW_COLUMNS)
+        # Extract the first tag of every review in a single list comprehension
+        tags = [x[0] if isinstance(x, list) and len(x) > 0 else None for x in reviews_data['tags'].tolist()]
+        if 'review' in reviews_data.columns:
+            review_text = reviews_data['review']
+        else:
+            review_text = pd.Series(None, index=reviews_data.index, dtype=object)
+        missing = review_text.isna()
+        if self.review_store is not None and missing.any():
+            # The bodies were written to the review store while fetching; read them back for this frame only
+            review_text = review_text.copy()
+            review_text[missing] = self.review_store.get_many(reviews_data.loc[missing, 'mal_id'].tolist())
         reviewsInformation = {
-            'anime_id': self.reviews_data['anime_id'],
-            'review_id': self.reviews_data['mal_id'],
-            'score': self.reviews_data['score'],
-            'is_spoiler': self.reviews_data['is_spoiler'],
-            'is_preliminary': self.reviews_data['is_preliminary'],
-            'episodes_watched': self.reviews_data['episodes_watched'],
-            'tags': self.reviews_data['tags'].apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else None),  # Extract first value
-            'review_text': self.reviews_data['review']
+            'anime_id': reviews_data['anime_id'],
+            'review_id': reviews_data['mal_id'],
+            'score': reviews_data['score'],
+            'is_spoiler': reviews_data['is_spoiler'],
+            'is_preliminary': reviews_data['is_preliminary'],
+            'episodes_watched': reviews_data['episodes_watched'],
+            'tags': pd.Series(tags, index=reviews_data.index),
+            'review_text': review_text
         }
 
         reviewsInformation = pd.DataFrame(reviewsInformation)
         return reviewsInformation
 
         
-    def extract_character_info(self):
+    @timed('extraction')
+    def extract_character_info(self, character_data=None):
         """Extract relevant character information into a DataFrame."""
+        character_data = character_data if character_data is not None else self.character_data
+        if character_data.empty:
+            return pd.DataFrame(columns=CHARACTER_COLUMNS)
+        # Read id and name out of each nested character dict in the same pass
+        character_ids = []
+        names = []
+        for character in character_data['character'].tolist():
+            if isinstance(character, dict):
+                character_ids.append(character.get('mal_id'))
+                names.append(character.get('name'))
+            else:
+                character_ids.append(None)
+                names.append(None)
         characterInformation = {
-            'anime_id': self.character_data['mal_id'],
-            'character_id': self.character_data['character'].apply(lambda x: x['mal_id'] if isinstance(x, dict) and 'mal_id' in x else None),
-            'name': self.character_data['character'].apply(lambda x: x['name'] if isinstance(x, dict) and 'name' in x else None),
-            'role': self.character_data['role'], 
-            'favorites': self.character_data['favorites']
+            'anime_id': character_data['mal_id'],
+            'character_id': pd.Series(character_ids, index=character_data.index),
+            'name': pd.Series(names, index=character_data.index),
+            'role': character_data['role'], 
+            'favorites': character_data['favorites']
         }
         characterInformation = pd.DataFrame(characterInformation)
         return characterInformation
     
-    def extract_VA_info(self):
+    @timed('extraction')
+    def extract_VA_info(self, character_data=None):
         """Extract relevant VA information into a DataFrame."""
+        character_data = character_data if character_data is not None else self.character_data
+        if character_data.empty:
+            return pd.DataFrame(columns=VA_COLUMNS)
 
-        VAInformation = {
-            'character_id': self.character_data['character'].apply(lambda x: x['mal_id'] if isinstance(x, dict) and 'mal_id' in x else None),
-            'voice_actor_info': self.character_data['voice_actors'].apply(
-                lambda x: [(actor['person']['mal_id'], actor['person']['name'], actor['language'])
-                        for actor in x if isinstance(actor, dict) and 'person' in actor and 'mal_id' in actor['person'] and 'language' in actor]
-                if isinstance(x, list) else []),
-            
-        }
-
-        # Create the DataFrame from the extracted information
-        VA_df = pd.DataFrame(VAInformation)
-
-        # Explode the voice actor info into separate columns
-        VA_df = VA_df.explode('voice_actor_info')
-
-        # Split the tuples into separate columns
-        VA_df[['voice_actor_id', 'voice_actor_name', 'voice_actor_language']] = pd.DataFrame(
-            VA_df['voice_actor_info'].tolist(), index=VA_df.index)
+        # Flatten character -> voice_actors straight into columns, one row per (character, voice actor)
+        character_ids = []
+        voice_actor_ids = []
+        voice_actor_names = []
+        voice_actor_languages = []
+        for character, voice_actors in zip(character_data['character'].tolist(), character_data['voice_actors'].tolist()):
+            character_id = character.get('mal_id') if isinstance(character, dict) else None
+            voiced = False
+            if isinstance(voice_actors, list):
+                for actor in voice_actors:
+                    if isinstance(actor, dict) and 'person' in actor and 'mal_id' in actor['person'] and 'language' in actor:
+                        character_ids.append(character_id)
+                        voice_actor_ids.append(actor['person']['mal_id'])
+                        voice_actor_names.append(actor['person']['name'])
+                        voice_actor_languages.append(actor['language'])
+                        voiced = True
+            if not voiced:
+                # Characters without a voice actor still get one row with empty voice actor columns
+                character_ids.append(character_id)
+                voice_actor_ids.append(None)
+                voice_actor_names.append(np.nan)
+                voice_actor_languages.append(np.nan)
 
-        # Drop the original 'voice_actor_info' column
-        VA_df.drop(columns=['voice_actor_info'], inplace=True)
-
-        # Convert voice_actor_id to integer to remove the .0 issue
-        VA_df['voice_actor_id'] = VA_df['voice_actor_id'].astype('Int64')
-
-        # Reset index if needed
-        VA_df.reset_index(drop=True, inplace=True)
-
-        # Select only the relevant columns
-        VA_df = VA_df[['character_id', 'voice_actor_id', 'voice_actor_name', 'voice_actor_language']]
+        VA_df = pd.DataFrame({
+            'character_id': character_ids,
+            # Integer dtype that allows nulls, to remove the .0 issue
+            'voice_actor_id': pd.array(voice_actor_ids, dtype='Int64'),
+            'voice_actor_name': voice_actor_names,
+            'voice_actor_language': voice_actor_languages,
+        })
 
         return VA_df
 
+    # Function to hold the character and VA information as deduplicated dimension tables
+    def extract_cast_tables(self, character_data=None):
+        """Return a CastTables of the character data; far smaller than the two flat frames on large runs."""
+        character_data = character_data if character_data is not None else self.character_data
+        return CastTables.from_extracted(self.extract_character_info(character_data),
+                                         self.extract_VA_info(character_data))
+
     #create a function to save the fetched anime data to a JSON file
     def save_to_json(self, filename):
         """Save the fetched anime data to a JSON file."""
         if self.anime_data is not None:
+            anime_data = self.anime_data
+            if isinstance(anime_data, pd.DataFrame):
+                # After fetch_anime_data_multiple_seasons anime_data is the extracted DataFrame;
+                # to_json turns its NaN and numpy values into plain JSON
+                anime_data = {'data': json.loads(anime_data.to_json(orient='records'))}
             with open(filename,
                         'w') as file:
-                    json.dump(self.anime_data, file, indent=4)
+                    json.dump(anime_data, file, indent=4)
             print(f"Data has been saved to {filename}.")
 
     #create a fuction that turn extracted data into a csv file
@@ -232,6 +508,14 @@ class AnimeFetcher:
             print(f"All season data has been saved to {filename}.")
         else:
             print("No anime data to save.")
+
+    #create a function that writes extracted data to a typed, partitioned Parquet dataset
+    def save_to_parquet(self, dataset, data, root="parquet", append=False):
+        """Save extracted data ('anime', 'characters', 'voice_actors' or 'reviews') as Parquet, replacing
+        the earlier snapshot (only its year/season partitions in data for 'anime')."""
+        # pyarrow is only needed by this output format, so it is imported on use
+        import parquetSink
+        parquetSink.save_to_parquet(dataset, data, root=root, append=append)
             
     
     # def extract_VA_info(self):
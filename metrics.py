@@ -0,0 +1,285 @@
+import functools
+import json
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+# Phases wall-clock time is split into; rate_limit_sleep is read from the RateLimiter
+PHASES = ('rate_limit_sleep', 'network', 'extraction', 'db_write')
+
+
+# Function to collapse the ids in an endpoint so that every anime shares one series
+def endpoint_label(endpoint):
+    """Turn 'anime/5114/reviews' into 'anime/{id}/reviews' and 'seasons/2024/summer' into 'seasons/{year}/{season}'."""
+    if endpoint.startswith('seasons/'):
+        return 'seasons/{year}/{season}'
+    return re.sub(r'/\d+(?=/|$)', '/{id}', endpoint)
+
+
+def finite(value):
+    return None if math.isinf(value) else value
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS, keep_samples=False):
+        """Cumulative-bucket histogram, in the Prometheus sense.
+
+        With keep_samples every observation is kept too, so quantiles are exact instead of bucket bounds.
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.samples = [] if keep_samples else None
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+        if self.samples is not None:
+            self.samples.append(value)
+
+    def cumulative(self):
+        """Return (upper bound, observations <= bound) pairs."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    # Function to estimate a quantile from the buckets (upper bound of the bucket holding it)
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        if self.samples is not None:
+            ordered = sorted(self.samples)
+            return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 4)
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+        return self.buckets[-1]
+
+
+class Metrics:
+    def __init__(self, keep_samples=False):
+        """Counters and timers of one run, shared by the fetchers and DBConnection.
+
+        keep_samples keeps every request latency for exact percentiles (benchmarks); a long run
+        should rely on the histogram buckets.
+        """
+        self.keep_samples = keep_samples
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.latency = {}
+        self.status_counts = {}
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        # table -> [rows written, seconds spent writing them]
+        self.rows_written = {}
+        # Set by the fetcher so their own counters end up in the same report
+        self.rate_limiter = None
+        self.cache = None
+        self.coalescer = None
+        self.server = None
+
+    def watch(self, rate_limiter=None, cache=None, coalescer=None):
+        """Include a RateLimiter's sleep time, a ResponseCache's hit ratio and a RequestCoalescer's counts in the report."""
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        if cache is not None:
+            self.cache = cache
+        if coalescer is not None:
+            self.coalescer = coalescer
+
+    # Function to record one request sent to the API
+    def observe_request(self, endpoint, status, seconds):
+        label = endpoint_label(endpoint)
+        with self.lock:
+            if label not in self.latency:
+                self.latency[label] = Histogram(keep_samples=self.keep_samples)
+            self.latency[label].observe(seconds)
+            key = (label, int(status))
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+            self.phase_seconds['network'] += seconds
+
+    def add_time(self, phase, seconds):
+        with self.lock:
+            self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, phase):
+        """Add the time spent in a with block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_rows(self, table, rows, seconds):
+        """Record rows written to a table and how long the write took."""
+        with self.lock:
+            written = self.rows_written.setdefault(table, [0, 0.0])
+            written[0] += rows
+            written[1] += seconds
+
+    def to_dict(self):
+        """Return every metric as plain JSON-serializable values."""
+        with self.lock:
+            phases = dict(self.phase_seconds)
+            if self.rate_limiter is not None:
+                phases['rate_limit_sleep'] = self.rate_limiter.time_waiting
+            requests = {}
+            for (label, status), count in sorted(self.status_counts.items()):
+                requests.setdefault(label, {})[str(status)] = count
+            latency = {label: {
+                'count': histogram.count,
+                'sum_seconds': round(histogram.sum, 4),
+                'mean_seconds': round(histogram.sum / histogram.count, 4) if histogram.count else 0.0,
+                # Bucket bounds unless samples are kept, None past the last finite bucket
+                'p50_seconds': finite(histogram.quantile(0.5)),
+                'p95_seconds': finite(histogram.quantile(0.95)),
+                'p99_seconds': finite(histogram.quantile(0.99)),
+                'buckets': {('+Inf' if math.isinf(bound) else str(bound)): total
+                            for bound, total in histogram.cumulative()},
+            } for label, histogram in sorted(self.latency.items())}
+            rows = {table: {
+                'rows': written[0],
+                'seconds': round(written[1], 3),
+                'rows_per_second': round(written[0] / written[1], 1) if written[1] > 0 else 0.0,
+            } for table, written in sorted(self.rows_written.items())}
+        return {
+            'wall_seconds': round(time.monotonic() - self.started, 3),
+            # Summed over every worker, so with concurrent requests a phase can exceed wall time
+            'phase_seconds': {phase: round(seconds, 3) for phase, seconds in phases.items()},
+            'requests': requests,
+            'latency': latency,
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'coalescing': self.coalescer.stats() if self.coalescer is not None else None,
+            'rows_written': rows,
+        }
+
+    # Function to render the metrics in the Prometheus text exposition format
+    def to_prometheus(self):
+        data = self.to_dict()
+        lines = [
+            "# HELP jikan_request_duration_seconds Latency of requests sent to the Jikan API.",
+            "# TYPE jikan_request_duration_seconds histogram",
+        ]
+        for label, histogram in data['latency'].items():
+            for bound, total in histogram['buckets'].items():
+                lines.append(f'jikan_request_duration_seconds_bucket{{endpoint="{label}",le="{bound}"}} {total}')
+            lines.append(f'jikan_request_duration_seconds_sum{{endpoint="{label}"}} {histogram["sum_seconds"]}')
+            lines.append(f'jikan_request_duration_seconds_count{{endpoint="{label}"}} {histogram["count"]}')
+        lines += ["# HELP jikan_requests_total Requests sent to the Jikan API by status code.",
+                  "# TYPE jikan_requests_total counter"]
+        for label, statuses in data['requests'].items():
+            for status, count in statuses.items():
+                lines.append(f'jikan_requests_total{{endpoint="{label}",status="{status}"}} {count}')
+        lines += ["# HELP pipeline_phase_seconds_total Time spent per phase, summed over workers.",
+                  "# TYPE pipeline_phase_seconds_total counter"]
+        for phase, seconds in data['phase_seconds'].items():
+            lines.append(f'pipeline_phase_seconds_total{{phase="{phase}"}} {seconds}')
+        lines += ["# HELP pipeline_wall_seconds Seconds since the run started.",
+                  "# TYPE pipeline_wall_seconds gauge",
+                  f"pipeline_wall_seconds {data['wall_seconds']}"]
+        if data['cache'] is not None:
+            lines += ["# HELP jikan_cache_hit_ratio Share of lookups answered by the response cache.",
+                      "# TYPE jikan_cache_hit_ratio gauge",
+                      f"jikan_cache_hit_ratio {data['cache']['hit_ratio']}"]
+        if data['coalescing'] is not None:
+            lines += ["# HELP jikan_requests_coalesced_total Requests answered by an identical request of the run.",
+                      "# TYPE jikan_requests_coalesced_total counter",
+                      f'jikan_requests_coalesced_total{{how="in_flight"}} {data["coalescing"]["joined_in_flight"]}',
+                      f'jikan_requests_coalesced_total{{how="completed"}} {data["coalescing"]["reused_completed"]}']
+        lines += ["# HELP db_rows_written_total Rows written to the database per table.",
+                  "# TYPE db_rows_written_total counter"]
+        for table, written in data['rows_written'].items():
+            lines.append(f'db_rows_written_total{{table="{table}"}} {written["rows"]}')
+        lines += ["# HELP db_rows_written_per_second Write throughput per table.",
+                  "# TYPE db_rows_written_per_second gauge"]
+        for table, written in data['rows_written'].items():
+            lines.append(f'db_rows_written_per_second{{table="{table}"}} {written["rows_per_second"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, filename):
+        """Write the metrics to a JSON file."""
+        with open(filename, 'w') as file:
+            json.dump(self.to_dict(), file, indent=4)
+        print(f"Metrics have been saved to {filename}.")
+
+    # Function to expose the metrics over HTTP while the run is going
+    def serve(self, port=9108, host='127.0.0.1'):
+        """Serve /metrics (Prometheus text) and /metrics.json on a background thread; returns the port.
+
+        Only local clients can connect by default; pass host='0.0.0.0' to let a remote Prometheus scrape it.
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.to_dict()), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{host}:{self.server.server_address[1]}/metrics")
+        return self.server.server_address[1]
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+
+    def report(self):
+        """Print where the time of the run went."""
+        data = self.to_dict()
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in data['phase_seconds'].items())
+        print(f"Wall time {data['wall_seconds']:.2f}s; {phases}")
+        for label, histogram in data['latency'].items():
+            statuses = ", ".join(f"{status}: {count}" for status, count in data['requests'].get(label, {}).items())
+            print(f"  {label}: {histogram['count']} requests ({statuses}), mean {histogram['mean_seconds']}s, "
+                  f"p95 <= {histogram['p95_seconds']}s")
+        if data['cache'] is not None:
+            print(f"  cache hit ratio {data['cache']['hit_ratio']}")
+        if data['coalescing'] is not None:
+            print(f"  {data['coalescing']['saved']} of {data['coalescing']['requests']} requests coalesced")
+        for table, written in data['rows_written'].items():
+            print(f"  {table}: {written['rows']} rows at {written['rows_per_second']} rows/s")
+
+
+# Decorator adding the running time of a method to a phase of self.metrics
+def timed(phase):
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.metrics.add_time(phase, time.perf_counter() - start)
+        return wrapper
+    return decorate
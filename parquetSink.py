@@ -0,0 +1,141 @@
+import os
+import shutil
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Low-cardinality text columns are dictionary encoded: stored once per row group, read back as categoricals
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# Explicit schema of every dataset written by save_to_csv, so dtypes survive a round trip
+SCHEMAS = {
+    'anime': pa.schema([
+        ('anime_id', pa.int64()), ('title', pa.string()), ('title_english', pa.string()),
+        ('synopsis', pa.string()), ('genres', CATEGORY), ('status', CATEGORY), ('score', pa.float64()),
+        ('scored_by', pa.int64()), ('type', CATEGORY), ('source', CATEGORY), ('episodes', pa.int64()),
+        ('popularity', pa.int64()), ('members', pa.int64()), ('rank', pa.int64()), ('favorites', pa.int64()),
+        ('season', pa.string()), ('year', pa.int64()),
+    ]),
+    'characters': pa.schema([
+        ('anime_id', pa.int64()), ('character_id', pa.int64()), ('name', pa.string()),
+        ('role', CATEGORY), ('favorites', pa.int64()),
+    ]),
+    'voice_actors': pa.schema([
+        ('character_id', pa.int64()), ('voice_actor_id', pa.int64()), ('voice_actor_name', pa.string()),
+        ('voice_actor_language', CATEGORY),
+    ]),
+    'reviews': pa.schema([
+        ('anime_id', pa.int64()), ('review_id', pa.int64()), ('score', pa.float64()),
+        ('is_spoiler', pa.bool_()), ('is_preliminary', pa.bool_()), ('episodes_watched', pa.int64()),
+        ('tags', CATEGORY), ('review_text', pa.string()),
+    ]),
+}
+
+# Datasets split into year=/season= directories
+PARTITIONS = {
+    'anime': ['year', 'season'],
+}
+
+# Directory name pyarrow gives the partition of a null year or season
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _partitioning(dataset):
+    columns = PARTITIONS.get(dataset)
+    if not columns:
+        return None
+    schema = SCHEMAS[dataset]
+    return ds.partitioning(pa.schema([schema.field(c) for c in columns]), flavor='hive')
+
+
+# Function to coerce an extracted DataFrame to the dataset schema
+def to_arrow(dataset, data):
+    """Convert extract_* output (or a CSV read back) into an Arrow table with the dataset schema."""
+    schema = SCHEMAS[dataset]
+    columns = {}
+    for field in schema:
+        values = data[field.name] if field.name in data.columns else pd.Series([None] * len(data), dtype=object)
+        if pa.types.is_integer(field.type):
+            # Nullable integers: no more 539539.0 for ids that pandas widened to float
+            values = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif pa.types.is_floating(field.type):
+            values = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif pa.types.is_boolean(field.type):
+            values = values.astype('boolean')
+        else:
+            values = values.astype(object).where(values.notna(), None)
+        if pa.types.is_dictionary(field.type):
+            columns[field.name] = pa.array(values, type=pa.string(), from_pandas=True).dictionary_encode()
+        else:
+            columns[field.name] = pa.array(values, type=field.type, from_pandas=True)
+    return pa.table(columns, schema=schema)
+
+
+# Function to list the directories the rows of data are written to
+def _partition_dirs(dataset, data, root):
+    base = os.path.join(root, dataset)
+    columns = PARTITIONS.get(dataset)
+    if not columns:
+        return {base}
+    keys = to_arrow(dataset, data).select(columns).group_by(columns).aggregate([]).to_pylist()
+    return {os.path.join(base, *(f"{c}={NULL_PARTITION if key[c] is None else key[c]}" for c in columns))
+            for key in keys}
+
+
+def _write(dataset, data, root, append):
+    ds.write_dataset(
+        to_arrow(dataset, data), os.path.join(root, dataset), format='parquet', partitioning=_partitioning(dataset),
+        # A unique name per write keeps earlier files when appending
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore' if append else 'delete_matching',
+    )
+
+
+# Function to write (or append) a dataset as Parquet
+def save_to_parquet(dataset, data, root="parquet", append=False):
+    """Write extracted data under root/dataset, partitioned by year/season where configured.
+
+    By default data is a snapshot: it replaces the dataset, or only the year/season partitions it has rows
+    for in a partitioned one. With append=True it is added next to the existing files instead.
+    """
+    if data.empty:
+        print(f"No {dataset} data to save.")
+        return
+    _write(dataset, data, root, append)
+    print(f"{len(data)} {dataset} rows have been saved to {os.path.join(root, dataset)}.")
+
+
+# Function to read a dataset back, loading only the requested columns
+def load_parquet(dataset, root="parquet", columns=None, filters=None):
+    """Read root/dataset into a DataFrame; filters use pyarrow's [('year', '>=', 2020), ...] form."""
+    table = pq.read_table(os.path.join(root, dataset), columns=columns, filters=filters,
+                          partitioning=_partitioning(dataset) or 'hive', schema=SCHEMAS[dataset])
+    # Integer columns come back as nullable Int64 instead of float64 when they contain nulls
+    return table.to_pandas(types_mapper=lambda t: pd.Int64Dtype() if pa.types.is_integer(t) else None)
+
+
+class ParquetSink:
+    def __init__(self, dataset, root="parquet"):
+        """Sink for streamingPipeline.run_streaming that appends each chunk to a Parquet dataset.
+
+        What an earlier run wrote is replaced: a dataset (or partition) is cleared before its first chunk.
+        """
+        self.dataset = dataset
+        self.root = root
+        self.rows = 0
+        # Directories this sink has written to, later chunks are appended to them
+        self.written = set()
+
+    def write(self, data):
+        if data.empty:
+            return
+        for path in _partition_dirs(self.dataset, data, self.root) - self.written:
+            shutil.rmtree(path, ignore_errors=True)
+            self.written.add(path)
+        _write(self.dataset, data, self.root, append=True)
+        self.rows += len(data)
+
+    def close(self):
+        print(f"{self.rows} rows have been saved to {os.path.join(self.root, self.dataset)}.")
@@ -0,0 +1,100 @@
+import glob
+import gzip
+import json
+import os
+import re
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from jikanpy.exceptions import APIException
+from responseCache import ResponseCache
+
+
+# Function to name the partition of an endpoint, one per kind of request
+def endpoint_kind(endpoint):
+    """Turn 'anime/5114/reviews' into 'anime_reviews' and 'seasons/2024/summer' into 'seasons'."""
+    if endpoint.startswith('seasons/'):
+        return 'seasons'
+    return re.sub(r'_+', '_', re.sub(r'[^a-z]+', '_', endpoint.lower())).strip('_') or 'root'
+
+
+class PayloadArchive:
+    def __init__(self, root="archive", until=None):
+        """Raw Jikan responses as gzip NDJSON under root/<endpoint kind>/date=YYYY-MM-DD/.
+
+        record() appends every response fetched from the API. replay() answers a request from the
+        latest recorded response instead, optionally ignoring partitions dated after `until`.
+        """
+        self.root = root
+        self.until = str(until)[:10] if until is not None else None
+        self.lock = threading.Lock()
+        # (kind, date) -> open gzip writer of this run
+        self.writers = {}
+        # kind -> {request key: zlib-compressed payload}, loaded on first replay of that kind
+        self.index = {}
+        self.recorded = 0
+        self.replayed = 0
+
+    # Function to append one response to today's partition of its endpoint
+    def record(self, endpoint, params, payload):
+        day = datetime.now(timezone.utc).date().isoformat()
+        kind = endpoint_kind(endpoint)
+        line = json.dumps({
+            'endpoint': endpoint, 'params': params or None,
+            'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'payload': payload,
+        }) + "\n"
+        with self.lock:
+            writer = self.writers.get((kind, day))
+            if writer is None:
+                directory = os.path.join(self.root, kind, f"date={day}")
+                os.makedirs(directory, exist_ok=True)
+                # One file per run and partition, so concurrent runs never write to the same file
+                writer = gzip.open(os.path.join(directory, f"part-{uuid.uuid4().hex}.ndjson.gz"), 'at',
+                                   encoding='utf-8')
+                self.writers[(kind, day)] = writer
+            writer.write(line)
+            self.recorded += 1
+
+    # Function to read every recorded response of one endpoint kind, oldest partition first
+    def _load(self, kind):
+        if kind in self.index:
+            return self.index[kind]
+        entries = {}
+        for directory in sorted(glob.glob(os.path.join(self.root, kind, "date=*"))):
+            if self.until is not None and directory.rsplit("date=", 1)[1] > self.until:
+                continue
+            for path in sorted(glob.glob(os.path.join(directory, "*.ndjson.gz")), key=os.path.getmtime):
+                try:
+                    with gzip.open(path, 'rt', encoding='utf-8') as file:
+                        for line in file:
+                            entry = json.loads(line)
+                            key = ResponseCache.make_key(entry['endpoint'], entry['params'])
+                            # Later responses win; kept compressed since a full history can be large
+                            entries[key] = zlib.compress(json.dumps(entry['payload']).encode('utf-8'))
+                except (EOFError, OSError, ValueError) as e:
+                    # A file cut short by a crash still gives back the lines before the damage
+                    print(f"Archive file {path} is truncated, read up to the damage: {e}")
+        self.index[kind] = entries
+        return entries
+
+    def replay(self, endpoint, params=None):
+        """Return the latest archived response of a request; raises APIException 404 if it was never recorded."""
+        kind = endpoint_kind(endpoint)
+        with self.lock:
+            entries = self._load(kind)
+        data = entries.get(ResponseCache.make_key(endpoint, params))
+        if data is None:
+            raise APIException(404, {'error': 'not in the payload archive'}, endpoint=endpoint)
+        self.replayed += 1
+        return json.loads(zlib.decompress(data))
+
+    def close(self):
+        """Finish the gzip files written by this run."""
+        with self.lock:
+            for writer in self.writers.values():
+                writer.close()
+            self.writers = {}
+
+    def report(self):
+        print(f"Payload archive {self.root}: {self.recorded} responses recorded, {self.replayed} replayed")
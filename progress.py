@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+# Function to format a number of seconds as h:mm:ss
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter:
+    def __init__(self, phase, total=0):
+        """Thread-safe progress counter printing done/total, throughput and ETA for one phase."""
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_total(self, count):
+        """Grow the phase when new work is discovered while it runs."""
+        with self.lock:
+            self.total += count
+
+    def update(self, count=1):
+        """Mark count tasks as done and print the progress line."""
+        with self.lock:
+            self.done += count
+            elapsed = time.monotonic() - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            remaining = max(self.total - self.done, 0)
+            eta = format_duration(remaining / rate) if rate > 0 else "?"
+            print(f"[{self.phase}] {self.done}/{self.total} done, {rate:.2f}/s, ETA {eta}")
+
+    def finish(self):
+        """Print how long the phase took."""
+        elapsed = time.monotonic() - self.started
+        print(f"[{self.phase}] finished {self.done} tasks in {format_duration(elapsed)}")
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Jikan's published limits: 3 requests per second and 60 requests per minute
+JIKAN_PER_SECOND = 3
+JIKAN_PER_MINUTE = 60
+
+
+class TokenBucket:
+    def __init__(self, limit, period, burst=1):
+        """A bucket allowing at most `limit` requests in any window of `period` seconds."""
+        # A full bucket plus everything it refills during one window must not exceed the quota,
+        # so the refill rate is whatever is left of the limit after the initial burst.
+        self.capacity = burst if burst < limit else 1
+        self.period = period
+        self.rate = (limit - self.capacity) / period if limit > self.capacity else limit / period
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    # Function to add the tokens earned since the last update
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    # Function to tell how long to wait before a token is available (0 means available now)
+    def wait_time(self, now):
+        """Return the seconds until one token can be taken from the bucket."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Remove one token from the bucket."""
+        self.tokens -= 1
+
+
+class RateLimiter:
+    def __init__(self, per_second=JIKAN_PER_SECOND, per_minute=JIKAN_PER_MINUTE, burst=1):
+        """Thread-safe limiter enforcing a per-second and a per-minute quota at the same time."""
+        self.per_second = per_second
+        self.per_minute = per_minute
+        self.buckets = [TokenBucket(per_second, 1.0, burst), TokenBucket(per_minute, 60.0, burst)]
+        self.lock = threading.Lock()
+        self.started = None
+        self.requests = 0
+        self.time_waiting = 0.0
+        # Set by pause(): no request is allowed before this time, whatever the buckets hold
+        self.paused_until = 0.0
+
+    # Function to reserve a token from every bucket, returns the seconds to sleep first (0 if none)
+    def reserve(self):
+        """Take a token if one is available in every bucket, otherwise return the wait time."""
+        with self.lock:
+            now = time.monotonic()
+            wait = max([bucket.wait_time(now) for bucket in self.buckets] + [self.paused_until - now])
+            if wait > 0:
+                return wait
+            for bucket in self.buckets:
+                bucket.take()
+            if self.started is None:
+                self.started = now
+            self.requests += 1
+            return 0.0
+
+    # Function to hold back every caller of this limiter, e.g. after a 429 with Retry-After
+    def pause(self, seconds):
+        """Allow no request for the next `seconds` seconds (an earlier, longer pause is kept)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    # Function to block the calling thread until a request is allowed
+    def acquire(self):
+        """Block until a request fits inside the per-second and per-minute budget."""
+        while True:
+            wait = self.reserve()
+            if wait == 0:
+                return
+            with self.lock:
+                self.time_waiting += wait
+            time.sleep(wait)
+
+    # Function to wait for a request slot without blocking the event loop
+    async def acquire_async(self):
+        """Coroutine version of acquire, sharing the same budget with threaded callers."""
+        while True:
+            wait = self.reserve()
+            if wait == 0:
+                return
+            with self.lock:
+                self.time_waiting += wait
+            await asyncio.sleep(wait)
+
+    # Function to report the achieved throughput against the allowed throughput
+    def throughput(self):
+        """Return a dict with the achieved and allowed requests per second."""
+        elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+        achieved = self.requests / elapsed if elapsed > 0 else 0.0
+        # Over a long run the per-minute quota is the binding one
+        allowed = min(self.per_second, self.per_minute / 60.0)
+        return {
+            'requests': self.requests,
+            'elapsed_seconds': round(elapsed, 2),
+            'time_waiting_seconds': round(self.time_waiting, 2),
+            'achieved_rps': round(achieved, 3),
+            'allowed_rps': round(allowed, 3),
+        }
+
+    def report(self):
+        """Print the throughput summary."""
+        stats = self.throughput()
+        print(f"Requests: {stats['requests']} in {stats['elapsed_seconds']}s, "
+              f"achieved {stats['achieved_rps']} req/s of {stats['allowed_rps']} req/s allowed "
+              f"({stats['time_waiting_seconds']}s spent waiting on the rate limit)")
+
+
+class RequestScheduler:
+    def __init__(self, rate_limiter, max_workers=3):
+        """Run calls on a thread pool so that as many requests as the rate budget allows are in flight."""
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+
+    # Function to run fn over every item concurrently, yielding (item, result) in input order
+    def map(self, fn, items):
+        """Apply fn to every item on the worker pool, yielding (item, result) pairs in input order."""
+        items = list(items)
+        if self.max_workers <= 1:
+            for item in items:
+                yield item, fn(item)
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(fn, item) for item in items]
+            for item, future in zip(items, futures):
+                yield item, future.result()
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from responseCache import ResponseCache
+
+
+class RequestCoalescer:
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024, skip=('/reviews',)):
+        """Share one network call between identical requests (same endpoint and params) of a run.
+
+        A request already in flight is joined instead of sent again. The responses of recent completed
+        requests are handed out again from a small memo of at most max_entries responses and max_bytes of
+        JSON (0 turns it off); endpoints ending with one of skip (review pages, large and read once) are
+        never memoized. Failures are never remembered, so a failed request is sent again by the next caller.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.skip = tuple(skip)
+        self.lock = threading.Lock()
+        # key -> concurrent.futures.Future of the thread sending it
+        self.in_flight = {}
+        # key -> asyncio.Future of the task sending it
+        self.in_flight_async = {}
+        # key -> (response, size of its JSON), least recently used first
+        self.completed = OrderedDict()
+        self.memo_bytes = 0
+        self.requests = 0
+        self.sent = 0
+        self.joined = 0
+        self.reused = 0
+
+    # Function to look a request up, returns (True, response) if it was already answered
+    def _completed(self, key):
+        if key in self.completed:
+            self.completed.move_to_end(key)
+            self.reused += 1
+            return True, self.completed[key][0]
+        return False, None
+
+    # Function to size a response for the memo, None if it is not memoized; called without the lock held
+    def _memo_size(self, endpoint, response):
+        if self.max_entries <= 0 or self.max_bytes <= 0 or endpoint.endswith(self.skip):
+            return None
+        size = len(json.dumps(response, default=str))
+        return size if size <= self.max_bytes else None
+
+    def _remember(self, key, response, size):
+        if size is None:
+            return
+        if key in self.completed:
+            self.memo_bytes -= self.completed.pop(key)[1]
+        self.completed[key] = (response, size)
+        self.memo_bytes += size
+        while len(self.completed) > self.max_entries or self.memo_bytes > self.max_bytes:
+            self.memo_bytes -= self.completed.popitem(last=False)[1][1]
+
+    # Function to send a request through send(), unless an identical one is in flight or was answered
+    def call(self, endpoint, params, send):
+        """Return send()'s response, sharing it with every identical request."""
+        key = ResponseCache.make_key(endpoint, params)
+        with self.lock:
+            self.requests += 1
+            found, response = self._completed(key)
+            if found:
+                return response
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.in_flight[key] = future
+                self.sent += 1
+            else:
+                self.joined += 1
+        if not owner:
+            # Raises the sender's exception as well
+            return future.result()
+        try:
+            response = send()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        # Encoding the response to size it would hold up every other worker if done under the lock
+        size = self._memo_size(endpoint, response)
+        with self.lock:
+            del self.in_flight[key]
+            self._remember(key, response, size)
+        future.set_result(response)
+        return response
+
+    async def call_async(self, endpoint, params, send):
+        """Async version of call(); send is a coroutine function."""
+        key = ResponseCache.make_key(endpoint, params)
+        with self.lock:
+            self.requests += 1
+            found, response = self._completed(key)
+            if found:
+                return response
+            future = self.in_flight_async.get(key)
+            owner = future is None
+            if owner:
+                future = asyncio.get_running_loop().create_future()
+                self.in_flight_async[key] = future
+                self.sent += 1
+            else:
+                self.joined += 1
+        if not owner:
+            # shield: a joiner being cancelled must not cancel the request other tasks wait on
+            return await asyncio.shield(future)
+        try:
+            response = await send()
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight_async[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Nobody may be waiting; retrieving the exception keeps asyncio from logging it
+                future.exception()
+            raise
+        size = self._memo_size(endpoint, response)
+        with self.lock:
+            del self.in_flight_async[key]
+            self._remember(key, response, size)
+        future.set_result(response)
+        return response
+
+    def clear(self):
+        """Forget the completed responses, e.g. before re-fetching data that may have changed."""
+        with self.lock:
+            self.completed.clear()
+            self.memo_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'sent': self.sent,
+                'joined_in_flight': self.joined,
+                'reused_completed': self.reused,
+                'saved': self.joined + self.reused,
+                'memo_entries': len(self.completed),
+                'memo_bytes': self.memo_bytes,
+            }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Request coalescing: {stats['requests']} requests, {stats['sent']} sent, "
+              f"{stats['saved']} saved ({stats['joined_in_flight']} joined in flight, "
+              f"{stats['reused_completed']} reused)")
@@ -0,0 +1,167 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import date
+from urllib.parse import urlencode
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+# Last month of each season, used to tell finished seasons from airing ones
+SEASON_END_MONTH = {'winter': 3, 'spring': 6, 'summer': 9, 'fall': 12}
+
+CacheEntry = namedtuple('CacheEntry', ['payload', 'etag', 'last_modified', 'fresh'])
+
+
+# Function to pick how long a response stays fresh, based on the endpoint it came from
+def default_ttl(endpoint, params=None):
+    """Return the time-to-live in seconds for a Jikan endpoint."""
+    match = re.fullmatch(r'seasons/(\d+)/(\w+)', endpoint)
+    if match:
+        year, season = int(match.group(1)), match.group(2).lower()
+        end_month = SEASON_END_MONTH.get(season, 12)
+        today = date.today()
+        # A season is settled a month after its last month is over
+        settled = (year, end_month + 1) if end_month < 12 else (year + 1, 1)
+        finished = (today.year, today.month) > settled
+        return 4 * WEEK if finished else 6 * HOUR
+    if endpoint.endswith('/characters'):
+        return WEEK
+    if endpoint.endswith('/reviews'):
+        return DAY
+    return HOUR
+
+
+class ResponseCache:
+    def __init__(self, path="jikan_cache.sqlite", max_bytes=512 * 1024 * 1024, ttl=default_ttl):
+        """On-disk cache of Jikan responses keyed by endpoint + params, with TTLs and LRU eviction."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                payload BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                last_access REAL,
+                size INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access);")
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def make_key(endpoint, params=None):
+        """Build the cache key for an endpoint and its query parameters."""
+        if not params:
+            return endpoint
+        return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+    # Function to look up a cached response, fresh or stale
+    def lookup(self, endpoint, params=None):
+        """Return a CacheEntry for the request, or None if nothing is cached."""
+        key = self.make_key(endpoint, params)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            fresh = row[3] > now
+            if fresh:
+                self.hits += 1
+                self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+            else:
+                self.misses += 1
+        return CacheEntry(json.loads(zlib.decompress(row[0])), row[1], row[2], fresh)
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Headers asking the server to answer 304 if a stale entry is still current."""
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    # Function to store a fresh response
+    def store(self, endpoint, params, payload, headers=None):
+        """Cache a decoded response together with its validators."""
+        headers = headers or {}
+        key = self.make_key(endpoint, params)
+        blob = zlib.compress(json.dumps(payload).encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, etag, last_modified, expires_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, blob, headers.get('ETag'), headers.get('Last-Modified'),
+                 now + self.ttl(endpoint, params), now, len(blob)))
+            self._evict()
+            self.conn.commit()
+
+    # Function to extend a stale entry after the server confirmed it has not changed (HTTP 304)
+    def revalidate(self, endpoint, params, headers=None):
+        """Mark a stale entry as fresh again, keeping its payload."""
+        headers = headers or {}
+        key = self.make_key(endpoint, params)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (now + self.ttl(endpoint, params), now, headers.get('ETag'), headers.get('Last-Modified'), key))
+            self.conn.commit()
+            self.revalidated += 1
+            # Served from cache after all, so count it as a hit instead of a miss
+            self.hits += 1
+            self.misses -= 1
+
+    # Function to drop the least recently used entries once the cache is over its size limit
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self):
+        """Return the hit/miss counters of this run."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def report(self):
+        """Print the cache counters."""
+        stats = self.stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['revalidated']} revalidated, hit ratio {stats['hit_ratio']}")
+
+    def close(self):
+        self.conn.close()
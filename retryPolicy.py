@@ -0,0 +1,176 @@
+import collections
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from jikanpy.exceptions import APIException
+
+# Statuses worth retrying: timeouts, rate limiting and server-side failures
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+# Function to turn a Retry-After header (seconds or an HTTP date) into seconds to wait
+def parse_retry_after(value):
+    """Return the delay asked for by a Retry-After header, or None if it is missing or unreadable."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0, transient_errors=(OSError,)):
+        """Exponential backoff with full jitter for failed requests.
+
+        APIExceptions with a status in RETRYABLE_STATUS and the transient_errors (connection resets,
+        timeouts) are retried up to max_attempts in total; anything else fails straight away.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.transient_errors = tuple(transient_errors)
+        # Retries scheduled so far; worker threads add to it concurrently
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def is_retryable(self, error):
+        if isinstance(error, APIException):
+            return error.status_code in RETRYABLE_STATUS
+        return isinstance(error, self.transient_errors)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    # Function to work out how long to wait before the given retry (attempt starts at 1)
+    def delay(self, attempt, error=None):
+        """Return the backoff before retrying, never shorter than the server's Retry-After."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = retry_after_of(error)
+        if retry_after is not None:
+            return max(backoff, retry_after)
+        return backoff
+
+
+# Function to read the Retry-After delay that _request attaches to an APIException
+def retry_after_of(error):
+    if isinstance(error, APIException):
+        return parse_retry_after(error.relevant_params.get('retry_after'))
+    return None
+
+
+class CircuitBreaker:
+    def __init__(self, rate_limiter, window=20, threshold=0.5, cooldown=2.0, max_cooldown=60.0):
+        """Pause every request of a rate limiter while the recent error rate is too high.
+
+        The last `window` outcomes are kept; when at least half of them are known and the share of
+        failures reaches `threshold`, the limiter is paused for `cooldown` seconds. Each trip in a row
+        doubles the pause (up to max_cooldown); a success after a trip resets it.
+        """
+        self.rate_limiter = rate_limiter
+        self.outcomes = collections.deque(maxlen=window)
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def error_rate(self):
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def record_success(self):
+        with self.lock:
+            self.outcomes.append(True)
+            self.cooldown = self.base_cooldown
+
+    # Function to count a failure and trip the breaker when the error rate climbs
+    def record_failure(self, error=None):
+        """Count a failed request; a Retry-After pauses every worker since the quota is shared."""
+        retry_after = retry_after_of(error)
+        with self.lock:
+            self.outcomes.append(False)
+            pause = retry_after or 0.0
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.outcomes.maxlen // 2 and failures / len(self.outcomes) >= self.threshold:
+                self.trips += 1
+                pause = max(pause, self.cooldown)
+                print(f"Circuit breaker: {failures} of the last {len(self.outcomes)} requests failed, "
+                      f"pausing requests for {pause:.1f}s")
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                # Start over so the pause is judged on the requests made after it
+                self.outcomes.clear()
+        if pause:
+            self.rate_limiter.pause(pause)
+
+
+class DeadLetters:
+    def __init__(self, path=None):
+        """Ids whose requests failed for good, kept so they can be re-driven later.
+
+        With a path the list is saved as JSON after every change and survives restarts.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        # resource -> {key: last error}; a key is a mal_id, or [year, season, page] for season pages
+        self.entries = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                for resource, failed in json.load(file).items():
+                    self.entries[resource] = {self._key(key): error for key, error in failed}
+
+    @staticmethod
+    def _key(key):
+        return tuple(key) if isinstance(key, list) else key
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({resource: [[list(key) if isinstance(key, tuple) else key, error]
+                                  for key, error in failed.items()]
+                       for resource, failed in self.entries.items()}, file)
+        os.replace(tmp_path, self.path)
+
+    def add(self, resource, key, error):
+        """Record that key of resource failed permanently with error."""
+        with self.lock:
+            self.entries.setdefault(resource, {})[self._key(key)] = str(error)
+            self._save()
+        print(f"Dead letter: {resource} {key} failed permanently ({error})")
+
+    def discard(self, resource, key):
+        """Forget key once it has been fetched successfully."""
+        with self.lock:
+            if self.entries.get(resource, {}).pop(self._key(key), None) is not None:
+                self._save()
+
+    def ids(self, resource):
+        """Return the failed keys of a resource, oldest first."""
+        with self.lock:
+            return list(self.entries.get(resource, {}))
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(failed) for failed in self.entries.values())
+
+    def report(self):
+        """Print how many ids failed for good, per resource."""
+        with self.lock:
+            counts = {resource: len(failed) for resource, failed in self.entries.items() if failed}
+        if counts:
+            print("Dead letters: " + ", ".join(f"{count} {resource}" for resource, count in counts.items()))
+        else:
+            print("Dead letters: none")
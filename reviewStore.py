@@ -0,0 +1,157 @@
+import os
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+# Caps on how many reviews are fetched per anime; None means no cap.
+# since is an ISO date ('2024-01-31'): older reviews are skipped and paging stops at the first one.
+ReviewLimits = namedtuple('ReviewLimits', ['max_pages', 'max_reviews', 'since'], defaults=[None, None, None])
+
+# Fields of a review record kept in memory, the ones extract_reviews_info reads plus the date
+REVIEW_FIELDS = ('mal_id', 'score', 'is_spoiler', 'is_preliminary', 'episodes_watched', 'tags', 'date')
+
+# Every entry is a review_id, the size of the compressed text, then the zlib-compressed text
+HEADER = struct.Struct('<qI')
+
+
+class ReviewTextStore:
+    def __init__(self, path="review_text.store"):
+        """Append-only file of zlib-compressed review bodies, looked up by review_id."""
+        self.path = path
+        self.lock = threading.Lock()
+        # review_id -> (offset, size) of its latest compressed text
+        self.index = {}
+        # review_id -> crc32 of its latest compressed text, for the entries written or read so far
+        self.checksums = {}
+        self._load()
+        self.file = open(path, 'ab')
+        # Entries before this offset are on disk and readable through self.reader without a flush
+        self.flushed = self.file.tell()
+        self.reader = None
+
+    # Function to index the store by walking the entry headers (later entries win)
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as file:
+            offset = 0
+            end = os.path.getsize(self.path)
+            while offset + HEADER.size <= end:
+                file.seek(offset)
+                review_id, size = HEADER.unpack(file.read(HEADER.size))
+                if offset + HEADER.size + size > end:
+                    break
+                self.index[review_id] = (offset + HEADER.size, size)
+                offset += HEADER.size + size
+            if offset < end:
+                # An entry cut short by a crash: drop it so the next append starts cleanly
+                file.truncate(offset)
+
+    def put(self, review_id, text):
+        """Append the text of a review; an unchanged text already stored is not written again."""
+        review_id = int(review_id)
+        data = zlib.compress((text or '').encode('utf-8'))
+        checksum = zlib.crc32(data)
+        with self.lock:
+            # A re-fetched review is compared by size and checksum; only stored texts of the same size are read
+            known = self.index.get(review_id)
+            if known is not None and known[1] == len(data) and self._checksum(review_id) == checksum:
+                return
+            self.file.seek(0, os.SEEK_END)
+            offset = self.file.tell()
+            self.file.write(HEADER.pack(review_id, len(data)) + data)
+            self.index[review_id] = (offset + HEADER.size, len(data))
+            self.checksums[review_id] = checksum
+
+    def _checksum(self, review_id):
+        if review_id not in self.checksums:
+            self.checksums[review_id] = zlib.crc32(self._read(review_id))
+        return self.checksums[review_id]
+
+    # Function to read one compressed text through the shared read handle, flushing only if it is still buffered
+    def _read(self, review_id):
+        offset, size = self.index[review_id]
+        if offset + size > self.flushed:
+            self.file.flush()
+            self.flushed = self.file.tell()
+        if self.reader is None:
+            self.reader = open(self.path, 'rb')
+        self.reader.seek(offset)
+        return self.reader.read(size)
+
+    def get(self, review_id):
+        """Return the text of a review, or None if it was never stored."""
+        with self.lock:
+            if review_id not in self.index:
+                return None
+            return zlib.decompress(self._read(review_id)).decode('utf-8')
+
+    # Function to read many texts with a single open of the store
+    def get_many(self, review_ids):
+        """Return the texts of review_ids in order, None for ids that were never stored."""
+        texts = []
+        with self.lock:
+            for review_id in review_ids:
+                if review_id not in self.index:
+                    texts.append(None)
+                    continue
+                texts.append(zlib.decompress(self._read(review_id)).decode('utf-8'))
+        return texts
+
+    def __contains__(self, review_id):
+        return review_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def flush(self):
+        """Write buffered entries to disk."""
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.flushed = self.file.tell()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+            if self.reader is not None:
+                self.reader.close()
+                self.reader = None
+
+
+# Function to keep the reviews of one response that fit the limits, returns whether to read the next page
+def take_reviews(reviews, response, page, limits, store=None):
+    """Append the reviews of a response page to reviews, slimmed to REVIEW_FIELDS.
+
+    With a store the review bodies are written to it and left out of the records; without one they
+    stay in the 'review' field as before.
+    """
+    for review in response['data']:
+        if limits.since is not None and review.get('date') and review['date'][:10] < str(limits.since)[:10]:
+            # Reviews come newest first, everything after this one is older still
+            return False
+        if limits.max_reviews is not None and len(reviews) >= limits.max_reviews:
+            return False
+        record = {field: review.get(field) for field in REVIEW_FIELDS}
+        if store is not None:
+            store.put(review['mal_id'], review.get('review'))
+        else:
+            record['review'] = review.get('review')
+        reviews.append(record)
+    if limits.max_reviews is not None and len(reviews) >= limits.max_reviews:
+        return False
+    if limits.max_pages is not None and page >= limits.max_pages:
+        return False
+    return bool(response.get('pagination', {}).get('has_next_page')) and bool(response['data'])
+
+
+# Function to add the reviews an earlier fetch kept to the ones just fetched
+def merge_reviews(reviews, previous):
+    """Return reviews followed by the records of previous whose review id is not in reviews.
+
+    Used when review_limits.since stops paging early: the older reviews are not fetched again but kept.
+    """
+    fetched = {review['mal_id'] for review in reviews}
+    return reviews + [review for review in previous if review['mal_id'] not in fetched]
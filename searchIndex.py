@@ -0,0 +1,314 @@
+import argparse
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+import pandas as pd
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+# Too common in synopses and reviews to say anything about a document
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or she so that the their
+them they this to was were will with you your not no do does did been being than then there these those
+""".split())
+
+TOKEN = re.compile(r'\w+')
+
+
+# Function to split text into the terms that are indexed and searched
+def tokenize(text):
+    """Lower-case words of a text, without accents, stopwords and single characters."""
+    if not isinstance(text, str) or not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [token for token in TOKEN.findall(text) if len(token) > 1 and token not in STOPWORDS]
+
+
+def _value(value):
+    """numpy scalars and NaN to what sqlite3 can bind."""
+    if value is None or pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+class SearchIndex:
+    def __init__(self, path="search_index.sqlite"):
+        """On-disk inverted index over anime synopses and review text, ranked with BM25.
+
+        Only terms, their counts per document and the fields used as filters are stored; the raw text
+        stays in the CSVs/review store. Adding a document again replaces it, and a document whose
+        text and fields did not change is skipped, so new fetches can be indexed as they come.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                kind TEXT,
+                source_id INTEGER,
+                anime_id INTEGER,
+                score REAL,
+                is_spoiler INTEGER,
+                length INTEGER,
+                digest BLOB,
+                UNIQUE (kind, source_id)
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                term_id INTEGER PRIMARY KEY,
+                kind TEXT,
+                term TEXT,
+                df INTEGER,
+                UNIQUE (kind, term)
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER,
+                doc_id INTEGER,
+                tf INTEGER,
+                PRIMARY KEY (term_id, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+            CREATE TABLE IF NOT EXISTS collection (
+                kind TEXT PRIMARY KEY,
+                docs INTEGER,
+                total_length INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS anime (
+                anime_id INTEGER PRIMARY KEY,
+                title TEXT,
+                year INTEGER,
+                season TEXT,
+                score REAL
+            );
+            CREATE TABLE IF NOT EXISTS anime_genres (
+                genre TEXT,
+                anime_id INTEGER,
+                PRIMARY KEY (genre, anime_id)
+            ) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+        # (kind, term) -> term_id, filled as documents are written
+        self.term_ids = {}
+
+    # Function to look up or create the ids of the terms of one document
+    def _term_ids(self, kind, terms):
+        ids = {}
+        for term in terms:
+            term_id = self.term_ids.get((kind, term))
+            if term_id is None:
+                row = self.conn.execute("SELECT term_id FROM terms WHERE kind = ? AND term = ?", (kind, term)).fetchone()
+                if row is None:
+                    term_id = self.conn.execute("INSERT INTO terms (kind, term, df) VALUES (?, ?, 0)",
+                                                (kind, term)).lastrowid
+                else:
+                    term_id = row[0]
+                self.term_ids[(kind, term)] = term_id
+            ids[term] = term_id
+        return ids
+
+    # Function to write a batch of documents of one kind, replacing older versions of them
+    def _index_documents(self, kind, documents):
+        """documents are (source_id, anime_id, score, is_spoiler, text); returns (indexed, unchanged)."""
+        indexed = unchanged = 0
+        df_changes = Counter()
+        docs_change = length_change = 0
+        with self.lock, self.conn:
+            for source_id, anime_id, score, is_spoiler, text in documents:
+                digest = hashlib.blake2b(repr((anime_id, score, is_spoiler, text)).encode('utf-8'),
+                                         digest_size=8).digest()
+                old = self.conn.execute("SELECT doc_id, length, digest FROM docs WHERE kind = ? AND source_id = ?",
+                                        (kind, source_id)).fetchone()
+                if old is not None and old[2] == digest:
+                    unchanged += 1
+                    continue
+                if old is not None:
+                    # Take the old version's terms out of the document frequencies before replacing it
+                    for (term_id,) in self.conn.execute("SELECT term_id FROM postings WHERE doc_id = ?", (old[0],)):
+                        df_changes[term_id] -= 1
+                    self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (old[0],))
+                    self.conn.execute("DELETE FROM docs WHERE doc_id = ?", (old[0],))
+                    docs_change -= 1
+                    length_change -= old[1]
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                doc_id = self.conn.execute(
+                    "INSERT INTO docs (kind, source_id, anime_id, score, is_spoiler, length, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kind, source_id, anime_id, score, is_spoiler, length, digest)).lastrowid
+                term_ids = self._term_ids(kind, counts)
+                self.conn.executemany("INSERT INTO postings (term_id, doc_id, tf) VALUES (?, ?, ?)",
+                                      [(term_ids[term], doc_id, tf) for term, tf in counts.items()])
+                for term in counts:
+                    df_changes[term_ids[term]] += 1
+                docs_change += 1
+                length_change += length
+                indexed += 1
+            self.conn.executemany("UPDATE terms SET df = df + ? WHERE term_id = ?",
+                                  [(change, term_id) for term_id, change in df_changes.items() if change])
+            self.conn.execute(
+                "INSERT INTO collection (kind, docs, total_length) VALUES (?, ?, ?) ON CONFLICT (kind) "
+                "DO UPDATE SET docs = docs + excluded.docs, total_length = total_length + excluded.total_length",
+                (kind, docs_change, length_change))
+        return indexed, unchanged
+
+    # Function to index the output of extract_anime_info (title, English title and synopsis)
+    def add_anime(self, anime_info):
+        """Index anime rows and store their year, season, score and genres for the filters."""
+        anime_info = anime_info.drop_duplicates(subset=['anime_id'], keep='last')
+        rows = []
+        genres = []
+        documents = []
+        for anime in anime_info.itertuples(index=False):
+            anime_id = int(anime.anime_id)
+            rows.append((anime_id, _value(anime.title), _value(anime.year), _value(anime.season), _value(anime.score)))
+            if isinstance(anime.genres, str):
+                genres += [(genre.strip(), anime_id) for genre in anime.genres.split(',') if genre.strip()]
+            text = ' '.join(t for t in (anime.title, anime.title_english, anime.synopsis) if isinstance(t, str))
+            documents.append((anime_id, anime_id, _value(anime.score), None, text))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO anime (anime_id, title, year, season, score) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (anime_id) DO UPDATE SET title = excluded.title, year = excluded.year, "
+                "season = excluded.season, score = excluded.score", rows)
+            self.conn.executemany("DELETE FROM anime_genres WHERE anime_id = ?", [(row[0],) for row in rows])
+            self.conn.executemany("INSERT OR IGNORE INTO anime_genres (genre, anime_id) VALUES (?, ?)", genres)
+        return self._report('anime', *self._index_documents('anime', documents))
+
+    # Function to index the output of extract_reviews_info, e.g. one chunk of iter_reviews_data at a time
+    def add_reviews(self, reviews_info):
+        """Index review_text of reviews rows; reviews already indexed with the same text are skipped."""
+        reviews_info = reviews_info.dropna(subset=['review_id']).drop_duplicates(subset=['review_id'], keep='last')
+        is_spoiler = reviews_info['is_spoiler'].map(lambda v: None if pd.isna(v) else int(v in (True, 'True', 'true')))
+        documents = [
+            (int(review_id), int(anime_id), _value(score), spoiler, text)
+            for review_id, anime_id, score, spoiler, text in zip(
+                reviews_info['review_id'], reviews_info['anime_id'], reviews_info['score'], is_spoiler,
+                reviews_info['review_text'])
+        ]
+        return self._report('review', *self._index_documents('review', documents))
+
+    def _report(self, kind, indexed, unchanged):
+        print(f"Search index: {indexed} {kind} documents indexed, {unchanged} unchanged")
+        return indexed
+
+    # Function to rank the documents of one kind against a query
+    def search(self, query, kind='review', year=None, season=None, genres=None, min_score=None, max_score=None,
+               is_spoiler=None, limit=10):
+        """Return the best `limit` matches as a DataFrame, best first.
+
+        kind is 'review' or 'anime'. year, season and genres (all of them must match) filter on the
+        anime; min_score/max_score on the review's score for reviews and the anime's score for anime.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        columns = ['anime_id', 'review_id', 'title', 'year', 'season', 'score', 'is_spoiler', 'rank']
+        if not terms:
+            return pd.DataFrame(columns=columns)
+        with self.lock:
+            stats = self.conn.execute("SELECT docs, total_length FROM collection WHERE kind = ?", (kind,)).fetchone()
+            found = self.conn.execute(
+                f"SELECT term_id, df FROM terms WHERE kind = ? AND df > 0 AND term IN ({', '.join('?' * len(terms))})",
+                [kind] + terms).fetchall()
+            if not stats or not stats[0] or not found:
+                return pd.DataFrame(columns=columns)
+            docs, total_length = stats
+            average_length = total_length / docs
+            weights = [(term_id, math.log(1 + (docs - df + 0.5) / (df + 0.5))) for term_id, df in found]
+
+            conditions = []
+            params = []
+            if year is not None:
+                conditions.append("a.year = ?")
+                params.append(int(year))
+            if season is not None:
+                conditions.append("a.season = ?")
+                params.append(season.lower())
+            if min_score is not None:
+                conditions.append("d.score >= ?")
+                params.append(min_score)
+            if max_score is not None:
+                conditions.append("d.score <= ?")
+                params.append(max_score)
+            if is_spoiler is not None:
+                conditions.append("d.is_spoiler = ?")
+                params.append(int(bool(is_spoiler)))
+            if genres:
+                genres = [genres] if isinstance(genres, str) else list(genres)
+                conditions.append(f"d.anime_id IN (SELECT anime_id FROM anime_genres WHERE genre IN "
+                                  f"({', '.join('?' * len(genres))}) GROUP BY anime_id HAVING COUNT(*) = ?)")
+                params += genres + [len(genres)]
+            where = "".join(f" AND {condition}" for condition in conditions)
+            rows = self.conn.execute(f"""
+                WITH query (term_id, idf) AS (VALUES {', '.join('(?, ?)' for _ in weights)})
+                SELECT d.anime_id, CASE WHEN d.kind = 'review' THEN d.source_id END, a.title, a.year, a.season,
+                       d.score, d.is_spoiler,
+                       SUM(q.idf * p.tf * {K1 + 1} / (p.tf + {K1} * (1 - {B} + {B} * d.length / ?))) AS rank
+                FROM query q
+                JOIN postings p ON p.term_id = q.term_id
+                JOIN docs d ON d.doc_id = p.doc_id
+                LEFT JOIN anime a ON a.anime_id = d.anime_id
+                WHERE 1 = 1{where}
+                GROUP BY d.doc_id
+                ORDER BY rank DESC
+                LIMIT ?
+            """, [value for weight in weights for value in weight] + [average_length] + params + [limit]).fetchall()
+        results = pd.DataFrame(rows, columns=columns)
+        results['year'] = results['year'].astype('Int64')
+        results['is_spoiler'] = results['is_spoiler'].map(lambda v: None if v is None else bool(v))
+        results['rank'] = results['rank'].round(4)
+        return results
+
+    def stats(self):
+        with self.lock:
+            collection = dict((kind, {'docs': docs, 'total_length': length}) for kind, docs, length in
+                              self.conn.execute("SELECT kind, docs, total_length FROM collection"))
+            collection['terms'] = self.conn.execute("SELECT COUNT(*) FROM terms WHERE df > 0").fetchone()[0]
+        return collection
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the local full-text index of synopses and reviews.")
+    parser.add_argument('--index', default="search_index.sqlite")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index the CSVs written by main.py (only new or changed rows)")
+    build.add_argument('--anime', default="anime_data.csv")
+    build.add_argument('--reviews', default="review_data.csv")
+    query = commands.add_parser('query', help="search the index")
+    query.add_argument('text')
+    query.add_argument('--kind', choices=['review', 'anime'], default='review')
+    query.add_argument('--year', type=int)
+    query.add_argument('--season')
+    query.add_argument('--genres', nargs='+')
+    query.add_argument('--min-score', type=float)
+    query.add_argument('--max-score', type=float)
+    query.add_argument('--spoilers', choices=['only', 'exclude'])
+    query.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    if args.command == 'build':
+        index.add_anime(pd.read_csv(args.anime))
+        # Read in chunks so the review text never has to fit in memory at once
+        for chunk in pd.read_csv(args.reviews, chunksize=5000):
+            index.add_reviews(chunk)
+    else:
+        start = time.perf_counter()
+        spoilers = {'only': True, 'exclude': False}.get(args.spoilers)
+        results = index.search(args.text, kind=args.kind, year=args.year, season=args.season, genres=args.genres,
+                               min_score=args.min_score, max_score=args.max_score, is_spoiler=spoilers,
+                               limit=args.limit)
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(results.to_string(index=False) if not results.empty else "No matches.")
+        print(f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    index.close()
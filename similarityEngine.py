@@ -0,0 +1,272 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+
+# Share of the similarity each signal contributes; every block similarity is in [0, 1], so the total is too
+WEIGHTS = {
+    'genres': 0.35,
+    'source': 0.1,
+    'type': 0.1,
+    'score': 0.1,
+    'members': 0.05,
+    'voice_actors': 0.15,
+    'characters': 0.15,
+}
+
+CATEGORICAL = ('genres', 'source', 'type')
+
+# Scores and log member counts are spread over a quarter turn, so the dot product of two encoded
+# values is cos(angle between them): 1 for equal values, falling as they move apart
+SCORE_SCALE = 10.0
+MEMBERS_SCALE = math.log1p(10_000_000)
+
+
+def _tokens(value, column):
+    if not isinstance(value, str) or not value:
+        return []
+    if column == 'genres':
+        return sorted({genre.strip() for genre in value.split(',') if genre.strip()})
+    return [value]
+
+
+def _angles(values, scale):
+    """Encode values as unit vectors on a quarter circle; nulls give zero vectors."""
+    theta = np.clip(np.asarray(values, dtype='float64') / scale, 0.0, 1.0) * (math.pi / 2)
+    encoded = np.stack([np.cos(theta), np.sin(theta)], axis=1)
+    encoded[np.isnan(theta)] = 0.0
+    return encoded
+
+
+class SimilarityEngine:
+    def __init__(self, k=10, weights=None, cache_path="similarity_cache.npz", batch_size=1024):
+        """Top-k similar anime from genres, source, type, score, members and shared cast.
+
+        Each anime is a weighted feature vector, so the feature part of the similarity of a batch of
+        anime is one matrix product; shared voice actors and characters are added from sparse
+        (anime, anime, weight) links. The top-k lists are cached in cache_path, and fit() only
+        recomputes the lists new or changed anime can affect.
+        """
+        self.k = k
+        self.weights = dict(WEIGHTS, **(weights or {}))
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.vocab = {column: [] for column in CATEGORICAL}
+        self.anime_ids = np.empty(0, dtype='int64')
+        self.fingerprints = np.empty(0, dtype='uint64')
+        self.neighbors = np.empty((0, k), dtype='int64')
+        self.scores = np.empty((0, k), dtype='float32')
+        self.last_fit = {}
+        if cache_path and os.path.exists(cache_path):
+            self._load()
+
+    def _load(self):
+        with np.load(self.cache_path) as cache:
+            settings = json.loads(str(cache['settings']))
+            if settings['k'] != self.k or settings['weights'] != self.weights:
+                print(f"Similarity cache {self.cache_path} was built with other settings, ignoring it")
+                return
+            self.vocab = {column: cache[f'vocab_{column}'].tolist() for column in CATEGORICAL}
+            self.anime_ids = cache['anime_ids']
+            self.fingerprints = cache['fingerprints']
+            self.neighbors = cache['neighbors']
+            self.scores = cache['scores']
+
+    def save(self):
+        if not self.cache_path:
+            return
+        np.savez(self.cache_path, settings=np.array(json.dumps({'k': self.k, 'weights': self.weights})),
+                 anime_ids=self.anime_ids, fingerprints=self.fingerprints, neighbors=self.neighbors,
+                 scores=self.scores, **{f'vocab_{column}': np.array(self.vocab[column], dtype=str)
+                                        for column in CATEGORICAL})
+
+    # Function to turn every anime into one row of weighted feature blocks
+    def _encode(self, anime):
+        blocks = []
+        for column in CATEGORICAL:
+            tokens = [_tokens(value, column) for value in anime[column].tolist()]
+            positions = {token: i for i, token in enumerate(self.vocab[column])}
+            for row in tokens:
+                for token in row:
+                    if token not in positions:
+                        # New categories get new columns; existing rows are 0 there, so cached lists stay valid
+                        positions[token] = len(self.vocab[column])
+                        self.vocab[column].append(token)
+            block = np.zeros((len(anime), len(self.vocab[column])), dtype='float32')
+            for i, row in enumerate(tokens):
+                if row:
+                    block[i, [positions[token] for token in row]] = 1.0 / math.sqrt(len(row))
+            blocks.append(block * math.sqrt(self.weights[column]))
+        blocks.append(_angles(anime['score'], SCORE_SCALE).astype('float32') * math.sqrt(self.weights['score']))
+        members = np.log1p(pd.to_numeric(anime['members'], errors='coerce').to_numpy(dtype='float64'))
+        blocks.append(_angles(members, MEMBERS_SCALE).astype('float32') * math.sqrt(self.weights['members']))
+        return np.hstack(blocks)
+
+    # Function to find the anime sharing voice actors or characters, as (row, row, weight) arrays
+    def _links(self, anime_ids, character_info, va_info):
+        """Return the link arrays and each anime's sorted cast ids (part of its fingerprint)."""
+        rows = pd.Series(np.arange(len(anime_ids)), index=anime_ids)
+        casts = {}
+        if character_info is None or character_info.empty:
+            return (np.empty(0, 'int64'), np.empty(0, 'int64'), np.empty(0, 'float32')), casts
+        characters = character_info[['anime_id', 'character_id']].dropna().astype('int64').drop_duplicates()
+        characters = characters[characters['anime_id'].isin(rows.index)]
+        incidences = {'characters': characters.rename(columns={'character_id': 'member'})}
+        if va_info is not None and not va_info.empty:
+            voiced = va_info[['character_id', 'voice_actor_id']].dropna().astype('int64')
+            voice_actors = characters.merge(voiced, on='character_id')[['anime_id', 'voice_actor_id']]
+            incidences['voice_actors'] = voice_actors.drop_duplicates().rename(columns={'voice_actor_id': 'member'})
+        links = []
+        for name, incidence in incidences.items():
+            casts[name] = incidence.groupby('anime_id')['member'].apply(lambda m: tuple(sorted(m)))
+            # Cosine of the anime's member sets: shared / sqrt(size_a * size_b)
+            sizes = incidence.groupby('anime_id').size()
+            pairs = incidence.merge(incidence, on='member', suffixes=('_a', '_b'))
+            pairs = pairs[pairs['anime_id_a'] != pairs['anime_id_b']]
+            shared = pairs.groupby(['anime_id_a', 'anime_id_b']).size().reset_index(name='shared')
+            weight = self.weights[name] * shared['shared'] / np.sqrt(
+                sizes.reindex(shared['anime_id_a']).to_numpy() * sizes.reindex(shared['anime_id_b']).to_numpy())
+            links.append(pd.DataFrame({'a': rows.reindex(shared['anime_id_a']).to_numpy(),
+                                       'b': rows.reindex(shared['anime_id_b']).to_numpy(), 'weight': weight}))
+        links = pd.concat(links).groupby(['a', 'b'], as_index=False)['weight'].sum()
+        return (links['a'].to_numpy('int64'), links['b'].to_numpy('int64'), links['weight'].to_numpy('float32')), casts
+
+    def _fingerprints(self, anime, casts):
+        fingerprints = []
+        for anime_id, genres, source, kind, score, members in zip(
+                anime['anime_id'], anime['genres'], anime['source'], anime['type'], anime['score'], anime['members']):
+            raw = repr((_tokens(genres, 'genres'), _tokens(source, 'source'), _tokens(kind, 'type'),
+                        None if pd.isna(score) else float(score), None if pd.isna(members) else int(members),
+                        [cast.get(anime_id, ()) for cast in casts.values()]))
+            fingerprints.append(int.from_bytes(hashlib.blake2b(raw.encode('utf-8'), digest_size=8).digest(), 'little'))
+        return np.array(fingerprints, dtype='uint64')
+
+    # Function to compute the similarity of some anime (rows) to others (columns)
+    def _similarity(self, features, links, rows, columns):
+        block = features[rows] @ features[columns].T
+        link_a, link_b, link_weight = links
+        if len(link_a):
+            row_position = np.full(len(features), -1)
+            row_position[rows] = np.arange(len(rows))
+            column_position = np.full(len(features), -1)
+            column_position[columns] = np.arange(len(columns))
+            a, b = row_position[link_a], column_position[link_b]
+            kept = (a >= 0) & (b >= 0)
+            np.add.at(block, (a[kept], b[kept]), link_weight[kept])
+        # An anime is not its own neighbor
+        block[rows[:, None] == columns[None, :]] = -np.inf
+        return block
+
+    def _top_k(self, block, column_ids):
+        """Best k (ids, scores) of every row of a similarity block, padded with -1/NaN."""
+        k = min(self.k, block.shape[1])
+        neighbors = np.full((len(block), self.k), -1, dtype='int64')
+        scores = np.full((len(block), self.k), np.nan, dtype='float32')
+        if k == 0:
+            return neighbors, scores
+        best = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(block, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        valid = np.isfinite(best_scores)
+        neighbors[:, :k] = np.where(valid, column_ids[best], -1)
+        scores[:, :k] = np.where(valid, best_scores, np.nan)
+        return neighbors, scores
+
+    # Function to bring the top-k lists up to date with the given anime and cast
+    def fit(self, anime_info, character_info=None, va_info=None):
+        """Compute the top-k lists, reusing cached lists that new or changed anime cannot have affected."""
+        anime = anime_info.drop_duplicates(subset=['anime_id'], keep='last').reset_index(drop=True)
+        anime_ids = anime['anime_id'].to_numpy('int64')
+        features = self._encode(anime)
+        links, casts = self._links(anime_ids, character_info, va_info)
+        fingerprints = self._fingerprints(anime, casts)
+
+        cached = pd.Series(np.arange(len(self.anime_ids)), index=self.anime_ids)
+        old_rows = cached.reindex(anime_ids).to_numpy()
+        is_new = np.isnan(old_rows)
+        old_rows = np.where(is_new, 0, old_rows).astype('int64')
+        if len(self.anime_ids):
+            changed = ~is_new & (self.fingerprints[old_rows] != fingerprints)
+            old_neighbors, old_scores = self.neighbors[old_rows], self.scores[old_rows]
+        else:
+            changed = np.zeros(len(anime), dtype=bool)
+            old_neighbors = np.full((len(anime), self.k), -1, dtype='int64')
+            old_scores = np.full((len(anime), self.k), np.nan, dtype='float32')
+        affected = np.flatnonzero(is_new | changed)
+        # Lists holding a changed or removed anime may lose it, so they are recomputed in full
+        stale_ids = set(anime_ids[changed].tolist()) | (set(self.anime_ids.tolist()) - set(anime_ids.tolist()))
+        holds_stale = np.isin(old_neighbors, list(stale_ids)).any(axis=1) if stale_ids else np.zeros(len(anime), bool)
+        full = np.flatnonzero(is_new | changed | holds_stale)
+        merge = np.flatnonzero(~(is_new | changed | holds_stale))
+
+        neighbors = np.full((len(anime), self.k), -1, dtype='int64')
+        scores = np.full((len(anime), self.k), np.nan, dtype='float32')
+        everything = np.arange(len(anime))
+        for start in range(0, len(full), self.batch_size):
+            rows = full[start:start + self.batch_size]
+            neighbors[rows], scores[rows] = self._top_k(self._similarity(features, links, rows, everything), anime_ids)
+        if len(merge):
+            neighbors[merge], scores[merge] = old_neighbors[merge], old_scores[merge]
+        if len(merge) and len(affected):
+            # Unaffected lists only need the new/changed anime as extra candidates
+            for start in range(0, len(merge), self.batch_size):
+                rows = merge[start:start + self.batch_size]
+                block = np.hstack([np.where(np.isnan(scores[rows]), -np.inf, scores[rows]),
+                                   self._similarity(features, links, rows, affected)])
+                candidates = np.hstack([neighbors[rows], np.broadcast_to(anime_ids[affected], (len(rows), len(affected)))])
+                best, best_scores = self._top_k(block, np.arange(block.shape[1]))
+                neighbors[rows] = np.where(best >= 0, np.take_along_axis(candidates, np.maximum(best, 0), axis=1), -1)
+                scores[rows] = best_scores
+
+        self.anime_ids, self.fingerprints, self.neighbors, self.scores = anime_ids, fingerprints, neighbors, scores
+        self.last_fit = {'anime': len(anime), 'recomputed': len(full),
+                         'merged': len(merge) if len(affected) else 0,
+                         'reused': 0 if len(affected) else len(merge)}
+        print(f"Similarity: {self.last_fit['recomputed']} lists recomputed, {self.last_fit['merged']} updated "
+              f"with new/changed anime, {self.last_fit['reused']} reused from the cache")
+        self.save()
+        return self
+
+    def similar(self, anime_id):
+        """Return the neighbors of one anime as a DataFrame, most similar first."""
+        rows = np.flatnonzero(self.anime_ids == anime_id)
+        if not len(rows):
+            return pd.DataFrame(columns=['neighbor_id', 'similarity'])
+        found = self.neighbors[rows[0]] >= 0
+        return pd.DataFrame({'neighbor_id': self.neighbors[rows[0]][found],
+                             'similarity': self.scores[rows[0]][found].round(4)})
+
+    def to_frame(self):
+        """Every list as (anime_id, rank, neighbor_id, similarity) rows."""
+        found = self.neighbors >= 0
+        return pd.DataFrame({
+            'anime_id': np.repeat(self.anime_ids, self.k)[found.ravel()],
+            'rank': np.tile(np.arange(1, self.k + 1), len(self.anime_ids))[found.ravel()],
+            'neighbor_id': self.neighbors[found],
+            'similarity': self.scores[found].round(4),
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top-k similar anime from the CSVs written by main.py.")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--cache', default="similarity_cache.npz")
+    parser.add_argument('--anime', type=int, nargs='*', help="print the neighbors of these anime ids")
+    parser.add_argument('--output', default="similar_anime.csv")
+    args = parser.parse_args()
+
+    anime_data = pd.read_csv("anime_data.csv")
+    titles = anime_data.drop_duplicates('anime_id').set_index('anime_id')['title']
+    engine = SimilarityEngine(k=args.k, cache_path=args.cache).fit(
+        anime_data, pd.read_csv("cahracter_information.csv"), pd.read_csv("voice_actor_information.csv"))
+    engine.to_frame().to_csv(args.output, index=False)
+    print(f"Similar anime have been saved to {args.output}.")
+    for anime_id in args.anime or []:
+        print(f"{titles.get(anime_id, anime_id)}:")
+        for neighbor_id, similarity in engine.similar(anime_id).itertuples(index=False):
+            print(f"  {similarity:.3f}  {titles.get(neighbor_id, neighbor_id)}")
@@ -0,0 +1,40 @@
+# Output sinks that accept extracted DataFrames chunk by chunk, so nothing has to be held until the end
+
+
+class CsvSink:
+    def __init__(self, filename):
+        """Append-only CSV writer: the first chunk truncates the file and writes the header."""
+        self.filename = filename
+        self.rows = 0
+        self.started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, data):
+        """Append one DataFrame chunk to the file."""
+        if data.empty:
+            return
+        data.to_csv(self.filename, mode='a' if self.started else 'w', header=not self.started, index=False)
+        self.started = True
+        self.rows += len(data)
+
+    def close(self):
+        print(f"{self.rows} rows have been saved to {self.filename}.")
+
+
+class TeeSink:
+    def __init__(self, *sinks):
+        """Forward every chunk to several sinks, e.g. a CSV file and a Parquet dataset."""
+        self.sinks = sinks
+
+    def write(self, data):
+        for sink in self.sinks:
+            sink.write(data)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,34 @@
+from checkpoint import airing_ids
+
+# Keys of the sinks dict passed to run_streaming
+DATASETS = ('anime', 'characters', 'voice_actors', 'reviews')
+
+
+# Function to run the whole fetch with bounded memory, handing every chunk to the sinks as it arrives
+def run_streaming(fetcher, years, seasons, sinks, chunk_size=50, incremental=False):
+    """Fetch season by season and chunk by chunk, writing extracted rows to sinks[dataset].
+
+    Only one season of anime records and one chunk of character/review records are held at a time,
+    so peak memory does not grow with the number of seasons requested.
+    """
+    total_anime = 0
+    for y in years:
+        for s in seasons:
+            print(f"Streaming data for {y} {s}...")
+            records = [anime for page in fetcher.iter_season_pages(y, s) for anime in page]
+            if not records:
+                continue
+            anime_df = fetcher._finalize_anime_data(fetcher.extract_anime_info({'data': records}))
+            del records
+            sinks['anime'].write(anime_df)
+            total_anime += len(anime_df)
+
+            mal_ids = list(anime_df['anime_id'])
+            refresh_ids = airing_ids(anime_df) if incremental else None
+            for character_df in fetcher.iter_character_data(mal_ids, chunk_size, refresh_ids):
+                sinks['characters'].write(fetcher.extract_character_info(character_df))
+                sinks['voice_actors'].write(fetcher.extract_VA_info(character_df))
+            for reviews_df in fetcher.iter_reviews_data(mal_ids, chunk_size, refresh_ids):
+                sinks['reviews'].write(fetcher.extract_reviews_info(reviews_df))
+    print(f"Streaming finished, total anime fetched: {total_anime}")
+    return total_anime
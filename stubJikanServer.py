@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+
+# Local stand-in for the Jikan v4 API, used to exercise the fetchers without touching the network.
+# It only serves the endpoints AnimeFetcher uses and answers 429 when a client breaks the quotas.
+# Records come from SyntheticFixtures or, for benchmarks on realistic payloads, from CsvFixtures.
+
+
+class QuotaWindow:
+    def __init__(self, per_second, per_minute):
+        """Sliding-window counter that mirrors Jikan's per-second and per-minute quotas."""
+        self.limits = [(per_second, 1.0), (per_minute, 60.0)]
+        self.history = deque()
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Record a request and return False if it exceeds either quota."""
+        with self.lock:
+            now = time.monotonic()
+            while self.history and now - self.history[0] > 60.0:
+                self.history.popleft()
+            for limit, window in self.limits:
+                if sum(1 for t in self.history if now - t <= window) >= limit:
+                    self.rejected += 1
+                    return False
+            self.history.append(now)
+            self.accepted += 1
+            return True
+
+
+SEASON_NAMES = ['winter', 'spring', 'summer', 'fall']
+
+
+def make_anime(mal_id, year, season):
+    """Build a minimal anime record with the fields extract_anime_info reads."""
+    return {
+        'mal_id': mal_id, 'title': f"Anime {mal_id}", 'title_english': None,
+        'synopsis': f"Synopsis of anime {mal_id}.", 'genres': [{'name': 'Action'}, {'name': 'Drama'}],
+        'status': 'Finished Airing', 'score': 7.5, 'scored_by': 1000, 'type': 'TV',
+        'source': 'Manga', 'episodes': 12, 'popularity': mal_id, 'members': 5000,
+        'rank': mal_id, 'favorites': 10, 'season': season, 'year': year,
+    }
+
+
+class SyntheticFixtures:
+    def __init__(self, anime_per_season=50, characters_per_anime=5, reviews_per_anime=3):
+        """Generated records: every season, anime and review count is whatever was asked for."""
+        self.anime_per_season = anime_per_season
+        self.characters_per_anime = characters_per_anime
+        self.reviews_per_anime = reviews_per_anime
+
+    def season(self, year, season):
+        base_id = year * 10 + SEASON_NAMES.index(season)
+        return [make_anime(base_id * 1000 + i, year, season) for i in range(self.anime_per_season)]
+
+    def characters(self, mal_id):
+        return [{
+            'character': {'mal_id': mal_id * 10 + i, 'name': f"Character {mal_id * 10 + i}"},
+            'role': 'Main' if i == 0 else 'Supporting',
+            'favorites': i,
+            'voice_actors': [{'person': {'mal_id': 500 + i, 'name': f"Actor {500 + i}"}, 'language': 'Japanese'}],
+        } for i in range(self.characters_per_anime)]
+
+    def reviews(self, mal_id):
+        # Newest first, one review per day going back from 2024-12-31
+        return [{
+            'mal_id': mal_id * 100 + i, 'score': 8, 'is_spoiler': False, 'is_preliminary': False,
+            'episodes_watched': None, 'tags': ['Recommended'], 'review': f"Review {i} of anime {mal_id}.",
+            'date': (date(2024, 12, 31) - timedelta(days=i)).isoformat() + "T00:00:00+00:00",
+        } for i in range(self.reviews_per_anime)]
+
+
+# Anime ids of other seasons are shifted by this much, so real MAL ids (all below it) stay unique
+SEASON_ID_STRIDE = 1000000
+
+
+def _value(value):
+    """Turn the NaN of an empty CSV cell back into the null Jikan would send."""
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _int(value):
+    """Integer field that pandas read as float because of empty cells."""
+    value = _value(value)
+    return None if value is None else int(value)
+
+
+class CsvFixtures:
+    def __init__(self, directory=".", anime_file="anime_data.csv", character_file="cahracter_information.csv",
+                 va_file="voice_actor_information.csv", reviews_file="review_data.csv"):
+        """Records rebuilt in the Jikan response shape from the CSV files main.py writes.
+
+        The CSVs hold one fetched season. Every season requested is served that same season; seasons
+        other than the one in the files get their anime ids shifted by SEASON_ID_STRIDE, so a backfill
+        over many seasons sees distinct anime with the real characters and reviews behind them.
+        """
+        anime = pd.read_csv(os.path.join(directory, anime_file))
+        characters = pd.read_csv(os.path.join(directory, character_file))
+        voice_actors = pd.read_csv(os.path.join(directory, va_file))
+        reviews = pd.read_csv(os.path.join(directory, reviews_file))
+        seasons = anime.dropna(subset=['year', 'season'])
+        self.home = (int(seasons['year'].mode()[0]), seasons['season'].mode()[0]) if not seasons.empty else None
+
+        self.anime = [{
+            'mal_id': int(row.anime_id), 'title': _value(row.title), 'title_english': _value(row.title_english),
+            'synopsis': _value(row.synopsis),
+            'genres': [{'name': name} for name in str(row.genres).split(', ')] if _value(row.genres) else [],
+            'status': _value(row.status), 'score': _value(row.score), 'scored_by': _int(row.scored_by),
+            'type': _value(row.type), 'source': _value(row.source), 'episodes': _int(row.episodes),
+            'popularity': _int(row.popularity), 'members': _int(row.members), 'rank': _int(row.rank),
+            'favorites': _int(row.favorites), 'season': _value(row.season),
+            'year': _int(row.year),
+        } for row in anime.itertuples(index=False)]
+
+        voiced = {}
+        # A character listed under several anime repeats its voice actors once per anime
+        for row in voice_actors.dropna(subset=['voice_actor_id']).drop_duplicates().itertuples(index=False):
+            voiced.setdefault(int(row.character_id), []).append({
+                'person': {'mal_id': int(row.voice_actor_id), 'name': _value(row.voice_actor_name)},
+                'language': _value(row.voice_actor_language),
+            })
+        self.character_map = {}
+        for row in characters.dropna(subset=['character_id']).itertuples(index=False):
+            self.character_map.setdefault(int(row.anime_id), []).append({
+                'character': {'mal_id': int(row.character_id), 'name': _value(row.name)},
+                'role': _value(row.role), 'favorites': _int(row.favorites),
+                'voice_actors': voiced.get(int(row.character_id), []),
+            })
+
+        self.review_map = {}
+        for row in reviews.dropna(subset=['review_id']).itertuples(index=False):
+            records = self.review_map.setdefault(int(row.anime_id), [])
+            # The CSV has no dates: newest first, one day apart
+            records.append({
+                'mal_id': int(row.review_id), 'score': _value(row.score), 'is_spoiler': bool(row.is_spoiler),
+                'is_preliminary': bool(row.is_preliminary), 'episodes_watched': _int(row.episodes_watched),
+                'tags': [row.tags] if _value(row.tags) else [], 'review': _value(row.review_text),
+                'date': (date(2024, 12, 31) - timedelta(days=len(records))).isoformat() + "T00:00:00+00:00",
+            })
+
+    def _offset(self, year, season):
+        if (year, season) == self.home:
+            return 0
+        return (year * 4 + SEASON_NAMES.index(season)) * SEASON_ID_STRIDE
+
+    def season(self, year, season):
+        offset = self._offset(year, season)
+        return [dict(anime, mal_id=anime['mal_id'] + offset) for anime in self.anime]
+
+    def characters(self, mal_id):
+        return self.character_map.get(mal_id % SEASON_ID_STRIDE, [])
+
+    def reviews(self, mal_id):
+        return self.review_map.get(mal_id % SEASON_ID_STRIDE, [])
+
+
+class StubJikanHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        if status == 200:
+            # Answer conditional requests the way Jikan does, with an ETag and 304 Not Modified
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            headers = dict(headers or {}, ETag=etag)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_page(self, records, page, per_page):
+        last_page = max(1, -(-len(records) // per_page))
+        self._send(200, {'pagination': {'last_visible_page': last_page, 'has_next_page': page < last_page},
+                         'data': records[(page - 1) * per_page:page * per_page]})
+
+    def do_GET(self):
+        server = self.server
+        if server.latency or server.latency_jitter:
+            time.sleep(server.latency + server.random.uniform(0, server.latency_jitter))
+        if not server.quota.allow():
+            self._send(429, {'status': 429, 'type': 'RateLimitException', 'message': 'You are being rate limited'},
+                       headers={'Retry-After': '1'})
+            return
+        if server.error_rate and server.random.random() < server.error_rate:
+            # Injected failure, as Jikan does when MyAnimeList is slow to answer
+            server.errors += 1
+            self._send(server.error_status, {'status': server.error_status, 'type': 'UpstreamException',
+                                             'message': 'Injected error'})
+            return
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip('/')
+        page = max(1, int(query.get('page', ['1'])[0]))
+        match = re.fullmatch(r'/v4/seasons/(\d+)/(\w+)', path)
+        if match and match.group(2) in SEASON_NAMES:
+            self._send_page(server.fixtures.season(int(match.group(1)), match.group(2)), page, server.anime_per_page)
+            return
+        match = re.fullmatch(r'/v4/anime/(\d+)/characters', path)
+        if match:
+            self._send(200, {'data': server.fixtures.characters(int(match.group(1)))})
+            return
+        match = re.fullmatch(r'/v4/anime/(\d+)/reviews', path)
+        if match:
+            self._send_page(server.fixtures.reviews(int(match.group(1))), page, server.reviews_per_page)
+            return
+        self._send(404, {'status': 404, 'type': 'BadResponseException', 'message': 'Resource does not exist'})
+
+
+# Function to start the stub server on a background thread
+def start_stub_server(port=0, per_second=3, per_minute=60, latency=0.0,
+                      anime_per_season=50, anime_per_page=25, characters_per_anime=5, reviews_per_anime=3,
+                      reviews_per_page=20, fixtures=None, latency_jitter=0.0, error_rate=0.0, error_status=500,
+                      seed=0):
+    """Start the stub server and return (server, base_url); call server.shutdown() when done.
+
+    fixtures defaults to SyntheticFixtures built from the *_per_anime/season counts; pass CsvFixtures to
+    serve real records. Every request sleeps latency plus up to latency_jitter seconds, and error_rate
+    of the requests that pass the quotas fail with error_status.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubJikanHandler)
+    server.daemon_threads = True
+    server.quota = QuotaWindow(per_second, per_minute)
+    server.latency = latency
+    server.latency_jitter = latency_jitter
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.errors = 0
+    server.random = random.Random(seed)
+    server.fixtures = fixtures if fixtures is not None else SyntheticFixtures(
+        anime_per_season, characters_per_anime, reviews_per_anime)
+    server.anime_per_page = anime_per_page
+    server.reviews_per_page = reviews_per_page
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v4"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the Jikan API.")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--per-second', type=int, default=3)
+    parser.add_argument('--per-minute', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures', default=None,
+                        help="directory holding the CSVs written by main.py, served instead of generated records")
+    args = parser.parse_args()
+    fixtures = CsvFixtures(args.fixtures) if args.fixtures else None
+    server, base_url = start_stub_server(args.port, args.per_second, args.per_minute, args.latency,
+                                         fixtures=fixtures, latency_jitter=args.latency_jitter,
+                                         error_rate=args.error_rate)
+    print(f"Stub Jikan server listening on {base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()